@@ -0,0 +1,294 @@
+import copy
+import datetime
+import threading
+import time
+import numpy as np
+from dts_file_reader import slice
+from DTSDataViewer.experiment import Experiment
+
+# excitation of the simulated sensors when the replayed file does not record one
+simulated_excitation_volts = 10.0
+
+
+class RingBuffer:
+    """
+    Fixed size (channels, capacity) buffer of the most recent samples of a stream
+    """
+
+    def __init__(self, channels, capacity, dtype=np.float64):
+        self.data = np.zeros((channels, capacity), dtype=dtype)
+        self.capacity = capacity
+        # next column to write and samples written since the start
+        self.write_index = 0
+        self.total = 0
+
+    def write(self, block):
+        """
+        Append a (channels, samples) block, overwriting the oldest samples
+        """
+        samples = block.shape[1]
+        if samples >= self.capacity:
+            self.data[:] = block[:, -self.capacity:]
+            self.write_index = 0
+        else:
+            first = min(samples, self.capacity - self.write_index)
+            self.data[:, self.write_index:self.write_index + first] = block[:, :first]
+            self.data[:, :samples - first] = block[:, first:]
+            self.write_index = (self.write_index + samples) % self.capacity
+        self.total += samples
+
+    def get_last(self, samples):
+        """
+        Copy of the most recent samples in time order, fewer if not that many were written
+        """
+        samples = min(samples, self.total, self.capacity)
+        start = (self.write_index - samples) % self.capacity
+        if start + samples <= self.capacity:
+            return self.data[:, start:start + samples].copy()
+
+        return np.concatenate((self.data[:, start:], self.data[:, :self.write_index]), axis=1)
+
+
+def find_trigger(data, threshold, previous_sample=None):
+    """
+    Index of the first sample of a block that rises above 'threshold', or None.
+    'previous_sample' is the last sample of the block before, so a crossing between blocks is found.
+    """
+    data = np.asarray(data)
+    if data.size == 0:
+        return None
+
+    before = np.empty_like(data)
+    before[0] = data[0] if previous_sample is None else previous_sample
+    before[1:] = data[:-1]
+    crossings = np.flatnonzero((data > threshold) & (before <= threshold))
+
+    return int(crossings[0]) if crossings.size else None
+
+
+class Device:
+    """
+    Acquisition backend. read() returns blocks of (channels, samples) scaled data in
+    channel_map order, or None when the device has no more data.
+    """
+
+    sample_rate_hz = None
+
+    def get_channel_templates(self):
+        """
+        Reader channels whose meta data describe the channels of a capture
+        """
+        raise NotImplementedError
+
+    def start(self):
+        pass
+
+    def read(self, samples):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def get_excitation_voltage(self):
+        return None
+
+
+class SimulatedDevice(Device):
+    """
+    Replays DTS data files as if they were acquired: blocks are returned at the sample rate of
+    the recording. Files follow each other, and start over with 'loop'.
+    Without 'real_time' blocks are returned as fast as they are read.
+    """
+
+    def __init__(self, data_file_paths, real_time: bool = True, loop: bool = True):
+        self.data_file_paths = [str(data_file_path) for data_file_path in data_file_paths]
+        if not self.data_file_paths:
+            raise ValueError("No data files to replay")
+        self.real_time = real_time
+        self.loop = loop
+
+        self.file_i = 0
+        self.channel_data = None
+        self.data = None
+        self.position = 0
+        self.samples_read = 0
+        self.start_time = None
+        self.open_file(0)
+
+    def open_file(self, file_i):
+        self.file_i = file_i
+        self.channel_data = slice.Reader().parse(self.data_file_paths[file_i])
+        self.data = np.vstack([channel.scaled_data for channel in self.channel_data])
+        self.position = 0
+
+        sample_rate_hz = self.channel_data[0].meta_data.sample_rate_hz
+        if self.sample_rate_hz is not None and sample_rate_hz != self.sample_rate_hz:
+            raise ValueError(f"{self.data_file_paths[file_i]} has a different sample rate")
+        self.sample_rate_hz = sample_rate_hz
+
+    def get_channel_templates(self):
+        return self.channel_data
+
+    def start(self):
+        self.samples_read = 0
+        self.start_time = time.monotonic()
+
+    def read(self, samples):
+        blocks = []
+        remaining = samples
+        while remaining > 0:
+            if self.position >= self.data.shape[1]:
+                if self.file_i + 1 < len(self.data_file_paths):
+                    self.open_file(self.file_i + 1)
+                elif self.loop:
+                    self.open_file(0)
+                else:
+                    break
+            block = self.data[:, self.position:self.position + remaining]
+            blocks.append(block)
+            self.position += block.shape[1]
+            remaining -= block.shape[1]
+
+        if not blocks:
+            return None
+
+        block = np.concatenate(blocks, axis=1) if len(blocks) > 1 else blocks[0].copy()
+        self.samples_read += block.shape[1]
+
+        # hold the block until the time its last sample would have been acquired
+        if self.real_time:
+            if self.start_time is None:
+                self.start()
+            delay = self.start_time + self.samples_read / self.sample_rate_hz - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        return block
+
+    def get_excitation_voltage(self):
+        return float(getattr(self.channel_data[0].meta_data, 'excitation_volts', simulated_excitation_volts))
+
+
+class Capture:
+    """
+    Pre and post trigger samples of one triggered acquisition
+    """
+
+    def __init__(self, data, sample_rate_hz, trigger_index, channel_templates):
+        self.data = data
+        self.sample_rate_hz = sample_rate_hz
+        # sample of data at which the trigger fired
+        self.trigger_index = trigger_index
+        self.channel_templates = channel_templates
+        self.captured_at = datetime.datetime.now()
+
+    def save(self, capture_path):
+        """
+        Save samples, acquisition details and the channel templates without their samples
+        to a numpy .npz file that load() reads back
+        """
+        channel_templates = np.empty(len(self.channel_templates), dtype=object)
+        for channel_i, template in enumerate(self.channel_templates):
+            channel = copy.copy(template)
+            channel.scaled_data = np.empty(0)
+            channel_templates[channel_i] = channel
+        np.savez(capture_path, data=self.data, sample_rate_hz=self.sample_rate_hz, trigger_index=self.trigger_index,
+                 captured_at=self.captured_at.isoformat(timespec='seconds'), channel_templates=channel_templates)
+
+    @classmethod
+    def load(cls, capture_path):
+        """
+        Capture saved by save(). The channel templates are pickled, so only open captures you trust.
+        """
+        with np.load(str(capture_path), allow_pickle=True) as capture_file:
+            capture = cls(capture_file['data'], float(capture_file['sample_rate_hz']),
+                          int(capture_file['trigger_index']), list(capture_file['channel_templates']))
+            capture.captured_at = datetime.datetime.fromisoformat(str(capture_file['captured_at']))
+
+        return capture
+
+    def to_experiment(self, data_file_path, **options) -> Experiment:
+        """
+        Experiment of the captured samples, without reading them back from disk. The channels are
+        copies of the device channel templates holding the captured samples. 'data_file_path' names
+        the experiment and its session sidecar; 'options' are those of Experiment.load().
+        """
+        channel_data = []
+        for channel_i, template in enumerate(self.channel_templates):
+            channel = copy.copy(template)
+            channel.scaled_data = self.data[channel_i]
+            channel.summary_data = slice.Channel.Summary()
+            channel_data.append(channel)
+
+        return Experiment.from_channel_data(channel_data, data_file_path, **options)
+
+
+class Acquisition:
+    """
+    Streams blocks from a device into a pre-trigger ring buffer and captures 'pre_trigger_ms' before
+    and 'post_trigger_ms' after the first sample of the trigger channel, machine primary by default,
+    that rises above 'trigger_threshold'. The latest samples can be read from another thread for display.
+    """
+
+    def __init__(self, device: Device, trigger_threshold: float, pre_trigger_ms: float = 500.0,
+                 post_trigger_ms: float = 1500.0, block_ms: float = 10.0, trigger_channel: int = None):
+        self.device = device
+        self.trigger_threshold = trigger_threshold
+        # row of machine primary in the channel_map order of the device blocks
+        self.trigger_channel = Experiment().channel_map['mach_rot_pri'] if trigger_channel is None else trigger_channel
+
+        sample_rate_hz = device.sample_rate_hz
+        self.pre_trigger_samples = int(sample_rate_hz * pre_trigger_ms / 1000.0)
+        self.post_trigger_samples = int(sample_rate_hz * post_trigger_ms / 1000.0)
+        self.block_samples = max(int(sample_rate_hz * block_ms / 1000.0), 1)
+
+        channels = len(device.get_channel_templates())
+        self.ring = RingBuffer(channels, self.pre_trigger_samples + self.post_trigger_samples + self.block_samples)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def get_latest(self, samples):
+        """
+        Most recent samples for display, safe to call while acquiring
+        """
+        with self.lock:
+            return self.ring.get_last(samples), self.ring.total
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """
+        Acquire until triggered and the post trigger samples are in, then return the Capture.
+        Returns None if stopped or the device ran out of data first.
+        """
+        trigger_position = None
+        previous_sample = None
+        self.device.start()
+        try:
+            while not self.stop_event.is_set():
+                block = self.device.read(self.block_samples)
+                if block is None:
+                    return None
+
+                with self.lock:
+                    self.ring.write(block)
+                    total = self.ring.total
+
+                if trigger_position is None:
+                    trigger_i = find_trigger(block[self.trigger_channel], self.trigger_threshold, previous_sample)
+                    previous_sample = block[self.trigger_channel, -1]
+                    if trigger_i is not None:
+                        trigger_position = total - block.shape[1] + trigger_i
+
+                if trigger_position is not None and total >= trigger_position + self.post_trigger_samples:
+                    # fewer pre trigger samples if the trigger came early
+                    pre_samples = min(self.pre_trigger_samples, trigger_position)
+                    with self.lock:
+                        data = self.ring.get_last(total - trigger_position + pre_samples)
+                    return Capture(data[:, :pre_samples + self.post_trigger_samples], self.device.sample_rate_hz,
+                                   pre_samples, self.device.get_channel_templates())
+        finally:
+            self.device.stop()
+
+        return None
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+def get_lag(reference, delayed, max_lag_samples=None):
+    """
+    Lag of 'delayed' behind 'reference' in samples, positive when 'delayed' comes later, and the
+    normalized correlation at that lag. The lag is that of the largest correlation magnitude, so a
+    series of the opposite sign is aligned too and its correlation is negative. The cross-correlation is computed with one real FFT of
+    both series, O(n log n), and the lag refined between samples with a parabola through the
+    correlation peak and its neighbours. Only lags within 'max_lag_samples' are considered.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    delayed = np.asarray(delayed, dtype=np.float64)
+    samples = min(reference.size, delayed.size)
+    if samples < 3:
+        return 0.0, 0.0
+    reference = reference[:samples] - reference[:samples].mean()
+    delayed = delayed[:samples] - delayed[:samples].mean()
+
+    # zero padded to at least twice the length so the circular correlation does not wrap
+    fft_size = 1 << int(np.ceil(np.log2(2 * samples - 1)))
+    correlation = np.fft.irfft(np.fft.rfft(delayed, fft_size) * np.conj(np.fft.rfft(reference, fft_size)), fft_size)
+
+    # lags -max_lag..max_lag in order
+    max_lag_samples = samples - 1 if max_lag_samples is None else int(min(max_lag_samples, samples - 1))
+    lags = np.arange(-max_lag_samples, max_lag_samples + 1)
+    correlation = correlation[lags % fft_size]
+
+    magnitude = np.abs(correlation)
+    peak_i = int(np.argmax(magnitude))
+    lag = float(lags[peak_i])
+    if 0 < peak_i < correlation.size - 1:
+        before, peak, after = magnitude[peak_i - 1:peak_i + 2]
+        curvature = before - 2 * peak + after
+        if curvature < 0:
+            lag += 0.5 * (before - after) / curvature
+
+    norm = np.sqrt(np.dot(reference, reference) * np.dot(delayed, delayed))
+    coefficient = float(correlation[peak_i] / norm) if norm > 0 else 0.0
+
+    return lag, coefficient
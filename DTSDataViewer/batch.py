@@ -0,0 +1,398 @@
+import csv
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from DTSDataViewer.catalog import Catalog
+from DTSDataViewer.experiment import Experiment, summary_signals
+from DTSDataViewer.header import read_header
+from DTSDataViewer.manifest import Manifest
+from DTSDataViewer.memory import format_bytes
+from DTSDataViewer.results import ResultsStore, get_summary_rows
+from DTSDataViewer.sweep import default_thresholds, sweep, sweep_fields
+
+logger = logging.getLogger(__name__)
+
+
+def read_peak_overrides(overrides_path):
+    """
+    Read a CSV of manual peak selections with columns: file, signal, peak_index.
+    'signal' is a summarized signal (head_rot_cor, mach_rot_pri or head_resultant; 'resultant' is
+    accepted for head_resultant). 'peak_index' is relative to all data as in the export summary.
+    Relative file paths are relative to the CSV.
+    Returns dict of data file path to list of (signal, peak_index).
+    """
+    overrides = {}
+    overrides_dir = os.path.dirname(os.path.abspath(overrides_path))
+
+    with open(overrides_path, newline='') as overrides_file:
+        for row_i, row in enumerate(csv.DictReader(overrides_file), start=2):
+            try:
+                data_file_path = os.path.join(overrides_dir, row['file'].strip())
+                signal = row['signal'].strip()
+                peak_index = int(row['peak_index'])
+            except (KeyError, AttributeError, ValueError):
+                raise ValueError(f"{overrides_path}:{row_i}: expected columns file, signal, peak_index")
+
+            if signal == 'resultant':
+                signal = 'head_resultant'
+            if signal not in summary_signals.values():
+                raise ValueError(f"{overrides_path}:{row_i}: invalid signal '{signal}'")
+
+            overrides.setdefault(data_file_path, []).append((signal, peak_index))
+
+    return overrides
+
+
+def apply_peak_overrides(data_file_path, overrides, export_path, window_anchor='rise_start'):
+    """
+    Load a data file, apply its peak selections and export it.
+    Returns summary rows for the results store.
+    """
+    # files are already processed in parallel, so load each one on a single thread
+    experiment = Experiment.load(data_file_path, workers=1)
+    logger.info("loaded %s, %s held", data_file_path, format_bytes(experiment.get_memory_bytes()))
+    for signal, peak_index in overrides:
+        experiment.set_user_selected_peak(signal, peak_index)
+    experiment.export(export_path, window_anchor=window_anchor)
+
+    return get_summary_rows(experiment)
+
+
+def reprocess(overrides_path, export_path, window_anchor='rise_start', workers=None, results_path=None,
+              results_batch_size=100):
+    """
+    Apply a CSV of peak selections to all files it lists in parallel and export them.
+    Summaries are also stored in the SQLite results database at 'results_path' if given,
+    'results_batch_size' files per transaction.
+    Returns dict of data file path to error message for files that failed.
+    """
+    overrides = read_peak_overrides(overrides_path)
+    failed = {}
+    results = ResultsStore(results_path) if results_path is not None else None
+    result_rows = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(apply_peak_overrides, data_file_path, file_overrides, export_path, window_anchor): data_file_path
+            for data_file_path, file_overrides in overrides.items()
+        }
+        for future in as_completed(futures):
+            data_file_path = futures[future]
+            try:
+                result_rows.extend(future.result())
+                logger.info("exported %s", data_file_path)
+            except Exception as e:
+                failed[data_file_path] = str(e)
+                logger.error("failed %s: %s", data_file_path, e)
+
+            if results is not None and len(result_rows) >= results_batch_size * len(summary_signals):
+                results.add_rows(result_rows)
+                result_rows = []
+
+    if results is not None:
+        results.add_rows(result_rows)
+        results.close()
+
+    logger.info("reprocessed %d of %d files", len(overrides) - len(failed), len(overrides))
+
+    return failed
+
+
+def export_events(data_file_path, export_path, window_anchor='rise_start', threshold=None, derived_signals=()):
+    """
+    Load a data file once and export every impact it holds, each to its own set of files.
+    'derived_signals' such as 'head_resultant_accel' are exported as extra columns and summaries.
+    Returns number of impacts exported.
+    """
+    experiment = Experiment.load(data_file_path, workers=1)
+    for signal in derived_signals:
+        experiment.add_derived(signal)
+    detected = experiment.detect_events(threshold=threshold)
+    logger.info("%s: %d events", data_file_path, len(detected))
+
+    for event_i in range(len(detected)):
+        experiment.select_event(event_i)
+        experiment.export(export_path, window_anchor=window_anchor)
+
+    return len(detected)
+
+
+def export_file(data_file_path, export_path, window_anchor='rise_start', derived_signals=()):
+    """
+    Load a data file and export it. Returns paths of the exported files.
+    """
+    experiment = Experiment.load(data_file_path, workers=1)
+    for signal in derived_signals:
+        experiment.add_derived(signal)
+
+    return experiment.export(export_path, window_anchor=window_anchor)
+
+
+def call_and_send(connection, function, args):
+    """
+    Process target of run_isolated(): send (True, result) or (False, error message) of 'function'
+    """
+    try:
+        outcome = (True, function(*args))
+    except Exception as e:
+        outcome = (False, str(e) or type(e).__name__)
+    connection.send(outcome)
+    connection.close()
+
+
+def run_isolated(function, *args, timeout=None):
+    """
+    Call 'function' in a new spawned process, so a file that crashes or hangs the reader fails only this call.
+    Raises TimeoutError, after the process is terminated, if it has not returned in 'timeout' seconds, and
+    RuntimeError if it raised or crashed. Spawned, the process inherits no locks held by threads of this one.
+    """
+    context = multiprocessing.get_context('spawn')
+    receive_connection, send_connection = context.Pipe(duplex=False)
+    process = context.Process(target=call_and_send, args=(send_connection, function, args), daemon=True)
+    process.start()
+    # the pipe reports end of file once the process holds the only send end and exits
+    send_connection.close()
+    try:
+        if not receive_connection.poll(timeout):
+            process.terminate()
+            raise TimeoutError(f"timed out after {timeout} s")
+        try:
+            returned, value = receive_connection.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError(f"worker process crashed, exit code {process.exitcode}")
+    finally:
+        receive_connection.close()
+        process.join()
+
+    if not returned:
+        raise RuntimeError(value)
+
+    return value
+
+
+def export_files(paths, export_path, manifest_path=None, window_anchor='rise_start', workers=None, max_attempts=3,
+                 catalog_filter=None, derived_signals=(), timeout=None):
+    """
+    Export DTS files in parallel, resumably. Every file is exported in a process of its own, see
+    run_isolated(), and an export that takes longer than 'timeout' seconds fails. The
+    outcome is appended to a manifest, by default manifest.jsonl in 'export_path'. Run again with the same
+    manifest, files completed with the same contents and outputs in place are not exported again,
+    failed files are tried again, once per run, and skipped once they failed 'max_attempts' times.
+    Files are known by their real path, and a file of the same size and modification time as when it
+    was recorded is not hashed again.
+    Returns dict of data file path to error message for files not exported.
+    """
+    # one export of a file however many names it is found under
+    data_files = {}
+    for data_file_path in find_data_files(paths, catalog_filter):
+        data_files.setdefault(Manifest.get_key(data_file_path), data_file_path)
+    data_files = list(data_files.values())
+    manifest_path = manifest_path if manifest_path is not None else os.path.join(export_path, 'manifest.jsonl')
+    os.makedirs(export_path, exist_ok=True)
+    if os.path.dirname(manifest_path):
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    manifest = Manifest(manifest_path)
+    failed = {}
+
+    def add_record(data_file_path, *args, **kwargs):
+        # a record that cannot be written costs a repeat of the file next run, not this run
+        try:
+            manifest.add(data_file_path, *args, **kwargs)
+        except Exception as e:
+            logger.error("%s: recording %s failed: %s", manifest_path, data_file_path, e)
+
+    def process(data_file_path):
+        try:
+            file_stat = os.stat(data_file_path)
+            file_hash = manifest.get_file_hash(data_file_path, file_stat)
+        except OSError as e:
+            add_record(data_file_path, None, 'failed', error=str(e))
+            return 'failed', str(e)
+
+        if manifest.get_completed(data_file_path, file_hash) is not None:
+            return 'done', None
+
+        failed_count = manifest.get_failed_count(data_file_path, file_hash)
+        if failed_count >= max_attempts:
+            error = f"failed {failed_count} times"
+            records = manifest.get_records(data_file_path, file_hash)
+            if records[-1]['status'] != 'skipped':
+                add_record(data_file_path, file_hash, 'skipped', error=error, file_stat=file_stat)
+            return 'skipped', error
+
+        try:
+            outputs = run_isolated(export_file, data_file_path, export_path, window_anchor, tuple(derived_signals),
+                                   timeout=timeout)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            add_record(data_file_path, file_hash, 'failed', error=error, file_stat=file_stat)
+            return 'failed', error
+
+        add_record(data_file_path, file_hash, 'completed', outputs=outputs, file_stat=file_stat)
+        return 'completed', None
+
+    counts = {'completed': 0, 'done': 0, 'failed': 0, 'skipped': 0}
+    with ThreadPoolExecutor(max_workers=workers if workers is not None else os.cpu_count()) as executor:
+        futures = {executor.submit(process, data_file_path): data_file_path for data_file_path in data_files}
+        for future in as_completed(futures):
+            data_file_path = futures[future]
+            status, error = future.result()
+            counts[status] += 1
+            if status == 'completed':
+                logger.info("exported %s", data_file_path)
+            elif status == 'failed':
+                failed[data_file_path] = error
+                logger.error("failed %s: %s", data_file_path, error)
+            elif status == 'skipped':
+                failed[data_file_path] = error
+                logger.warning("skipped %s: %s", data_file_path, error)
+
+    logger.info("exported %d files, %d done before, %d failed, %d skipped", counts['completed'], counts['done'],
+                counts['failed'], counts['skipped'])
+
+    return failed
+
+
+def inspect_file(data_file_path, header_only=False):
+    """
+    Header metadata of a data file and, unless 'header_only', its windows, export summary and
+    the differences between header and reader, see Header.get_mismatches().
+    With 'header_only' sample data is not decoded.
+    """
+    header = read_header(data_file_path)
+    info = header.to_dict()
+    if header_only:
+        return info
+
+    # only the windows need filtering for the summary
+    experiment = Experiment.load(data_file_path, fast_open=True, workers=1)
+    info['subject_id'] = experiment.get_id()
+    info['sample_rate_hz'] = experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz
+    info['sample_count'] = int(experiment.scaled_data.shape[1])
+    info['units'] = {key: experiment.get_channel(key).meta_data.eu for key in experiment.channel_map}
+    info['data_window'] = [int(experiment.data_window_start), int(experiment.data_window_end)]
+    info['summary'] = experiment.get_export_summary()
+    info['header_mismatches'] = header.get_mismatches(experiment.channel_data)
+    for mismatch in info['header_mismatches']:
+        logger.warning("%s: %s", data_file_path, mismatch)
+
+    return info
+
+
+def find_data_files(paths, catalog_filter=None):
+    """
+    DTS files given directly or found under given directories.
+    With 'catalog_filter', a dict of 'catalog_path' and Catalog.query() filters, directories are
+    listed from the catalog instead of walked and only files that match the filters are kept.
+    """
+    if catalog_filter is not None:
+        filters = dict(catalog_filter)
+        with Catalog(filters.pop('catalog_path')) as catalog:
+            matching = {row['path'] for row in catalog.query(**filters)}
+            data_files = []
+            for path in paths:
+                if os.path.isdir(path):
+                    data_files.extend(row['path'] for row in catalog.query(root_path=path, **filters))
+                elif os.path.realpath(path) in matching:
+                    data_files.append(path)
+        return data_files
+
+    data_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                data_files.extend(os.path.join(dir_path, f) for f in sorted(file_names) if f.lower().endswith('.dts'))
+        else:
+            data_files.append(path)
+
+    return data_files
+
+
+def screen_file(data_file_path):
+    """
+    Load a data file and screen its data quality.
+    Returns rows of (file, channel, metric, value, channel flagged) and the flag text.
+    """
+    experiment = Experiment.load(data_file_path, workers=1)
+    report = experiment.get_quality_report()
+    flagged = {channel for channel, check, value in report.flags}
+
+    return [
+        (data_file_path, channel, metric, value, channel in flagged)
+        for channel, metrics in report.metrics.items()
+        for metric, value in metrics.items()
+    ], report.get_flag_text()
+
+
+def screen_files(paths, output_path, workers=None, catalog_filter=None):
+    """
+    Screen data quality of DTS files in parallel and write all metrics to a CSV.
+    Returns list of files with flags.
+    """
+    data_files = find_data_files(paths, catalog_filter)
+    suspicious = []
+
+    with open(output_path, 'w', newline='') as output_file, ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(output_file)
+        writer.writerow(['file', 'channel', 'metric', 'value', 'channel_flagged'])
+
+        futures = {executor.submit(screen_file, data_file_path): data_file_path for data_file_path in data_files}
+        for future in as_completed(futures):
+            data_file_path = futures[future]
+            try:
+                rows, flags = future.result()
+            except Exception as e:
+                logger.error("failed %s: %s", data_file_path, e)
+                writer.writerow([data_file_path, '', 'error', str(e), True])
+                suspicious.append(data_file_path)
+                continue
+
+            writer.writerows(rows)
+            if flags:
+                suspicious.append(data_file_path)
+                logger.warning("%s: %s", data_file_path, "; ".join(flags))
+
+    logger.info("screened %d files, %d suspicious", len(data_files), len(suspicious))
+
+    return suspicious
+
+
+def sweep_file(data_file_path, thresholds=default_thresholds):
+    """
+    Load a data file and sweep the rise threshold of its summaries.
+    Returns rows of the sweep table.
+    """
+    experiment = Experiment.load(data_file_path, workers=1)
+
+    return sweep(experiment, thresholds)
+
+
+def sweep_files(paths, output_path, thresholds=default_thresholds, workers=None, catalog_filter=None):
+    """
+    Sweep the rise threshold of DTS files in parallel and write one tidy CSV,
+    a row per file, signal and threshold.
+    Returns dict of data file path to error message for files that failed.
+    """
+    data_files = find_data_files(paths, catalog_filter)
+    failed = {}
+
+    with open(output_path, 'w', newline='') as output_file, ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(output_file, fieldnames=sweep_fields)
+        writer.writeheader()
+
+        futures = {executor.submit(sweep_file, data_file_path, thresholds): data_file_path
+                   for data_file_path in data_files}
+        for future in as_completed(futures):
+            data_file_path = futures[future]
+            try:
+                writer.writerows(future.result())
+            except Exception as e:
+                failed[data_file_path] = str(e)
+                logger.error("failed %s: %s", data_file_path, e)
+
+    logger.info("swept %d of %d files", len(data_files) - len(failed), len(data_files))
+
+    return failed
@@ -0,0 +1,125 @@
+import collections
+import os
+import threading
+from concurrent.futures import Future
+from DTSDataViewer.experiment import Experiment, default_window_ms, default_pre_peak_fraction
+
+
+class ExperimentCache:
+    """
+    Thread safe LRU cache of loaded experiments keyed by data file path.
+    Concurrent requests for a file that is not cached share a single load.
+    With 'max_bytes' the cache stays under a memory budget, first by dropping derived arrays of
+    the least recently used experiments and then by evicting them.
+    """
+
+    def __init__(self, max_items: int = 8, compact: bool = False, max_bytes: int = None, fast_open: bool = False,
+                 window_ms: float = default_window_ms, pre_peak_fraction: float = default_pre_peak_fraction):
+
+        self.max_items = max_items
+        self.compact = compact
+        self.fast_open = fast_open
+        # window of experiments loaded from now on, already cached experiments keep theirs
+        self.window_ms = window_ms
+        self.pre_peak_fraction = pre_peak_fraction
+        self.max_bytes = max_bytes
+
+        # data file path -> experiment, least recently used first
+        self.experiments = collections.OrderedDict()
+        # data file path -> future of a load in progress
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(data_file_path):
+        """
+        Cache key of a data file
+        """
+        return os.path.realpath(str(data_file_path))
+
+    def get(self, data_file_path) -> Experiment:
+        """
+        Retrieve experiment, loading it if it is not cached
+        """
+        key = self.get_key(data_file_path)
+
+        with self.lock:
+            if key in self.experiments:
+                self.experiments.move_to_end(key)
+                return self.experiments[key]
+
+            future = self.pending.get(key)
+            is_loader = future is None
+            if is_loader:
+                future = Future()
+                self.pending[key] = future
+
+        if not is_loader:
+            return future.result()
+
+        try:
+            experiment = Experiment.load(data_file_path, compact=self.compact, fast_open=self.fast_open,
+                                         window_ms=self.window_ms, pre_peak_fraction=self.pre_peak_fraction)
+        except BaseException as e:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.pending[key]
+            self.experiments[key] = experiment
+            self.experiments.move_to_end(key)
+            while len(self.experiments) > self.max_items:
+                self.experiments.popitem(last=False)
+            self.enforce_budget()
+        future.set_result(experiment)
+
+        return experiment
+
+    def get_memory_usage(self):
+        """
+        Bytes held by each cached experiment by data file path
+        """
+        with self.lock:
+            return {key: experiment.get_memory_bytes() for key, experiment in self.experiments.items()}
+
+    def get_memory_bytes(self):
+        """
+        Total bytes held by cached experiments
+        """
+        return sum(self.get_memory_usage().values())
+
+    def enforce_budget(self):
+        """
+        Drop derived arrays, then evict experiments, least recently used first, until the cache
+        is within its memory budget. The most recently used experiment is always kept.
+        Call with the lock held.
+        """
+        if self.max_bytes is None:
+            return
+
+        total = sum(experiment.get_memory_bytes() for experiment in self.experiments.values())
+
+        for key in list(self.experiments.keys())[:-1]:
+            if total <= self.max_bytes:
+                return
+            total -= self.experiments[key].drop_derived()
+
+        for key in list(self.experiments.keys())[:-1]:
+            if total <= self.max_bytes:
+                return
+            total -= self.experiments[key].get_memory_bytes()
+            del self.experiments[key]
+
+    def __contains__(self, data_file_path):
+        with self.lock:
+            return self.get_key(data_file_path) in self.experiments
+
+    def __len__(self):
+        with self.lock:
+            return len(self.experiments)
+
+    def clear(self):
+        with self.lock:
+            self.experiments.clear()
@@ -0,0 +1,244 @@
+import datetime
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from DTSDataViewer.experiment import get_subject_id
+from DTSDataViewer.header import read_header
+
+logger = logging.getLogger(__name__)
+
+# columns of the files table after path
+catalog_fields = [
+    'file_name',
+    'subject_id',
+    'sample_rate_hz',
+    'channel_count',
+    'channels',
+    'timestamp',
+    'header_timestamp',
+    'mtime',
+    'size',
+    'error',
+]
+
+
+# formats of header timestamps that datetime.fromisoformat does not read
+timestamp_formats = [
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %I:%M %p',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d',
+    '%d-%b-%Y %H:%M:%S',
+    '%d-%b-%Y',
+    '%a %b %d %H:%M:%S %Y',
+]
+
+
+def parse_timestamp(value):
+    """
+    Naive local datetime of a timestamp string, ISO or one of timestamp_formats, or None if it is not one.
+    Timestamps with a time zone are converted to local time.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+        for timestamp_format in timestamp_formats:
+            try:
+                parsed = datetime.datetime.strptime(value, timestamp_format)
+                break
+            except ValueError:
+                continue
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+
+    return parsed
+
+
+def get_iso_timestamp(value, mtime):
+    """
+    Catalog timestamp, ISO date and time to the second: of the header timestamp 'value' where it can be read,
+    otherwise of the file modification time, so that timestamps compare in time order
+    """
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        parsed = datetime.datetime.fromtimestamp(mtime)
+
+    return parsed.isoformat(timespec='seconds')
+
+
+def walk_data_files(root_path):
+    """
+    Path, mtime and size of every DTS file under a directory, from directory entries without opening files
+    """
+    found = []
+    pending = [root_path]
+    while pending:
+        dir_path = pending.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.lower().endswith('.dts') and entry.is_file():
+                        stat = entry.stat()
+                        found.append((os.path.realpath(entry.path), stat.st_mtime, stat.st_size))
+        except OSError as e:
+            logger.warning("skipped %s: %s", dir_path, e)
+
+    return found
+
+
+def read_entry(data_file_path, mtime, size):
+    """
+    Catalog row of a data file from its header: (path, *catalog_fields)
+    """
+    file_name = os.path.basename(data_file_path)
+    try:
+        header = read_header(data_file_path)
+        # header timestamp where the setup has one that can be read, otherwise the file modification time
+        header_timestamp = header.get_timestamp()
+        return (data_file_path, file_name, get_subject_id(file_name), header.get_sample_rate_hz(),
+                len(header.channels),
+                json.dumps([channel.get('Description', channel.get('Name', '')) for channel in header.channels]),
+                get_iso_timestamp(header_timestamp, mtime), header_timestamp, mtime, size, None)
+    except Exception as e:
+        return (data_file_path, file_name, get_subject_id(file_name), None, None, None,
+                get_iso_timestamp(None, mtime), None, mtime, size, str(e))
+
+
+class Catalog:
+    """
+    SQLite index of the headers of the DTS files of a data tree, one row per file.
+    Files are read again only when their modification time or size changed. 'timestamp' is ISO
+    date and time, see get_iso_timestamp(); 'header_timestamp' is the header value as written.
+    A connection belongs to the thread that opened it.
+    """
+
+    def __init__(self, database_path):
+
+        self.database_path = str(database_path)
+        self.connection = sqlite3.connect(self.database_path)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, "
+                "file_name TEXT NOT NULL, "
+                "subject_id TEXT NOT NULL, "
+                "sample_rate_hz REAL, "
+                "channel_count INTEGER, "
+                "channels TEXT, "
+                "timestamp TEXT, "
+                "header_timestamp TEXT, "
+                "mtime REAL NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "error TEXT)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_subject_id ON files (subject_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_sample_rate_hz ON files (sample_rate_hz)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_timestamp ON files (timestamp)")
+
+    def update(self, root_path, workers: int = None):
+        """
+        Bring the index of the files under 'root_path' up to date. New and changed files have their
+        header read on a thread pool of 'workers' threads; files that are gone are removed.
+        Returns number of files read and number removed.
+        """
+        root_path = os.path.realpath(str(root_path))
+        known = {
+            row['path']: (row['mtime'], row['size'])
+            for row in self.connection.execute("SELECT path, mtime, size FROM files WHERE path LIKE ? ESCAPE '\\'",
+                                               (self.get_path_pattern(root_path),))
+        }
+
+        found = walk_data_files(root_path)
+        changed = [(path, mtime, size) for path, mtime, size in found if known.get(path) != (mtime, size)]
+        removed = set(known) - {path for path, mtime, size in found}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(lambda entry: read_entry(*entry), changed))
+
+        columns = ['path'] + catalog_fields
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO files ({','.join(columns)}) VALUES ({','.join('?' * len(columns))})", rows
+            )
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+
+        logger.info("catalog of %s: %d files, %d read, %d removed", root_path, len(found), len(changed), len(removed))
+
+        return len(changed), len(removed)
+
+    @staticmethod
+    def get_path_pattern(root_path):
+        """
+        LIKE pattern of the paths under a directory
+        """
+        escaped = root_path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return escaped.rstrip(os.sep) + os.sep + '%'
+
+    @staticmethod
+    def get_query_timestamp(value):
+        """
+        Datetime of a 'since' or 'until' filter value
+        """
+        parsed = parse_timestamp(value)
+        if parsed is None:
+            raise ValueError(f"Invalid timestamp: '{value}'")
+
+        return parsed
+
+    def query(self, subject_id=None, sample_rate_hz=None, since=None, until=None, root_path=None):
+        """
+        Catalog rows as dicts, filtered on any of subject id, sample rate, a timestamp range
+        ('since' and 'until' as ISO date or date and time strings, a date includes the whole day) and a directory
+        """
+        conditions = []
+        parameters = []
+        if subject_id is not None:
+            conditions.append("subject_id = ?")
+            parameters.append(subject_id)
+        if sample_rate_hz is not None:
+            conditions.append("sample_rate_hz = ?")
+            parameters.append(float(sample_rate_hz))
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(self.get_query_timestamp(since).isoformat(timespec='seconds'))
+        if until is not None:
+            until_timestamp = self.get_query_timestamp(until)
+            # a date includes the whole day
+            if len(until.strip()) == 10:
+                conditions.append("timestamp < ?")
+                until_timestamp += datetime.timedelta(days=1)
+            else:
+                conditions.append("timestamp <= ?")
+            parameters.append(until_timestamp.isoformat(timespec='seconds'))
+        if root_path is not None:
+            conditions.append("path LIKE ? ESCAPE '\\'")
+            parameters.append(self.get_path_pattern(os.path.realpath(str(root_path))))
+
+        sql = "SELECT * FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY path"
+
+        return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,244 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+
+import argparse
+import json
+import logging
+import sys
+
+
+def print_info(info):
+    """
+    Print file info of the inspect command as indented text
+    """
+    print(info['file'])
+    for name, value in info.items():
+        if name == 'file':
+            continue
+        if isinstance(value, dict):
+            print(f"  {name}:")
+            for key, item in value.items():
+                print(f"    {key}: {item}")
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            print(f"  {name}:")
+            for item in value:
+                print("    " + ", ".join(f"{key}={item_value}" for key, item_value in item.items()))
+        elif isinstance(value, list) and value and isinstance(value[0], str):
+            print(f"  {name}:")
+            for item in value:
+                print(f"    {item}")
+        else:
+            print(f"  {name}: {value}")
+
+
+def get_catalog_filter(args):
+    """
+    Catalog filter of batch.find_data_files() from the catalog options, None without a catalog
+    """
+    if args.catalog is None:
+        return None
+
+    return {'catalog_path': args.catalog, 'subject_id': args.subject, 'sample_rate_hz': args.sample_rate,
+            'since': args.since, 'until': args.until}
+
+
+def main(argv=None):
+    """
+    Command line entry point. Without a subcommand the GUI is started.
+    Subcommands import only what they need so that Qt is not loaded for them.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    parser = argparse.ArgumentParser(prog='dtsdataviewer', description='A data viewer for the DTS Sliceware data files.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='serve summaries and traces of a data directory over local HTTP')
+    serve_parser.add_argument('data_path', help='directory of DTS files')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--cache-size', type=int, default=8, help='number of loaded experiments to keep')
+    serve_parser.add_argument('--compact', action='store_true', help='store loaded data as float32')
+    serve_parser.add_argument('--max-memory-mb', type=float, default=None, help='memory budget of the experiment cache')
+
+    reprocess_parser = subparsers.add_parser('reprocess', help='apply a CSV of manual peak selections and export')
+    reprocess_parser.add_argument('overrides', help='CSV with columns file, signal, peak_index')
+    reprocess_parser.add_argument('export_path', help='directory for exported files')
+    reprocess_parser.add_argument('--anchor', choices=['rise_start', 'peak'], default='rise_start',
+                                  help='export window anchor')
+    reprocess_parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    reprocess_parser.add_argument('--results-db', default=None, help='also store summaries in this SQLite database')
+
+    # selection of files from a catalog, shared by the commands that take files or directories
+    catalog_filter_parser = argparse.ArgumentParser(add_help=False)
+    catalog_filter_parser.add_argument('--catalog', default=None, help='select files from this catalog index')
+    catalog_filter_parser.add_argument('--subject', default=None, help='catalog subject id')
+    catalog_filter_parser.add_argument('--sample-rate', type=float, default=None, help='catalog sample rate in Hz')
+    catalog_filter_parser.add_argument('--since', default=None, help='catalog timestamp from, ISO date')
+    catalog_filter_parser.add_argument('--until', default=None, help='catalog timestamp to, ISO date')
+
+    catalog_parser = subparsers.add_parser('catalog', help='index the headers of a data tree and query the index')
+    catalog_parser.add_argument('action', choices=['update', 'query'])
+    catalog_parser.add_argument('paths', nargs='*', help='directories to index or to limit a query to')
+    catalog_parser.add_argument('--db', default='catalog.sqlite', help='catalog index file')
+    catalog_parser.add_argument('--subject', default=None, help='subject id')
+    catalog_parser.add_argument('--sample-rate', type=float, default=None, help='sample rate in Hz')
+    catalog_parser.add_argument('--since', default=None, help='timestamp from, ISO date')
+    catalog_parser.add_argument('--until', default=None, help='timestamp to, ISO date')
+    catalog_parser.add_argument('--workers', type=int, default=None, help='number of threads reading headers')
+
+    qc_parser = subparsers.add_parser('qc', help='screen data quality of DTS files', parents=[catalog_filter_parser])
+    qc_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    qc_parser.add_argument('--output', default='qc.csv', help='CSV of all quality metrics')
+    qc_parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+
+    events_parser = subparsers.add_parser('export-events', help='export every impact of multi-impact recordings',
+                                          parents=[catalog_filter_parser])
+    events_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    events_parser.add_argument('export_path', help='directory for exported files')
+    events_parser.add_argument('--anchor', choices=['rise_start', 'peak'], default='rise_start',
+                               help='export window anchor')
+    events_parser.add_argument('--threshold', type=float, default=None,
+                               help='impact threshold in engineering units from the baseline, '
+                                    'default 10 baseline standard deviations of each recording')
+    events_parser.add_argument('--derived', nargs='+', default=[],
+                               help='derived signals to export, e.g. head_resultant_accel mach_rot_pri_angle')
+
+    export_parser = subparsers.add_parser('export', help='export DTS files, resuming an interrupted run',
+                                          parents=[catalog_filter_parser])
+    export_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    export_parser.add_argument('export_path', help='directory for exported files')
+    export_parser.add_argument('--manifest', default=None,
+                               help='checkpoint manifest, default manifest.jsonl in the export directory')
+    export_parser.add_argument('--anchor', choices=['rise_start', 'peak'], default='rise_start',
+                               help='export window anchor')
+    export_parser.add_argument('--max-attempts', type=int, default=3, help='attempts of a failing file over all runs')
+    export_parser.add_argument('--derived', nargs='+', default=[],
+                               help='derived signals to export, e.g. head_resultant_accel mach_rot_pri_angle')
+    export_parser.add_argument('--workers', type=int, default=None, help='number of files exported at once')
+    export_parser.add_argument('--timeout', type=float, default=None,
+                               help='seconds after which the export of a file is stopped and fails')
+
+    sweep_parser = subparsers.add_parser('sweep', help='sweep the rise threshold of the summaries',
+                                         parents=[catalog_filter_parser])
+    sweep_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    sweep_parser.add_argument('--thresholds', type=float, nargs='+', default=None,
+                              help='rise thresholds in baseline standard deviations, default 1 to 6 in steps of 0.5')
+    sweep_parser.add_argument('--output', default='sweep.csv', help='CSV with a row per file, signal and threshold')
+    sweep_parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+
+    cohort_parser = subparsers.add_parser('cohort', help='window files into one memory-mapped float32 .npy tensor',
+                                          parents=[catalog_filter_parser])
+    cohort_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    cohort_parser.add_argument('--output', default='cohort.npy',
+                               help='(trials, channels, samples) tensor, with a CSV of the trials next to it')
+    cohort_parser.add_argument('--anchor', choices=['rise_start', 'peak'], default='rise_start',
+                               help='window anchor')
+    cohort_parser.add_argument('--window-ms', type=float, default=None, help='window length, default 125 ms')
+    cohort_parser.add_argument('--pre-peak-fraction', type=float, default=None,
+                               help='part of the window before the peak, default 0.25')
+    cohort_parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+
+    inspect_parser = subparsers.add_parser('inspect', help='print metadata and summary of DTS files',
+                                           parents=[catalog_filter_parser])
+    inspect_parser.add_argument('paths', nargs='+', help='DTS files or directories to search for them')
+    inspect_parser.add_argument('--header-only', action='store_true', help='read the header only, no sample data')
+    inspect_parser.add_argument('--json', action='store_true', help='one JSON object per file')
+
+    # the GUI takes Qt arguments, so only parse when a subcommand is given
+    if not argv or argv[0] not in subparsers.choices:
+        if argv and argv[0] in ('-h', '--help'):
+            parser.print_help()
+            return
+        from DTSDataViewer import dtsdataviewer
+        dtsdataviewer.main()
+        return
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.command == 'serve':
+        from DTSDataViewer import server
+        server.serve(args.data_path, port=args.port, cache_size=args.cache_size, compact=args.compact,
+                     max_bytes=None if args.max_memory_mb is None else int(args.max_memory_mb * 1024 * 1024))
+
+    elif args.command == 'reprocess':
+        from DTSDataViewer import batch
+        failed = batch.reprocess(args.overrides, args.export_path, window_anchor=args.anchor, workers=args.workers,
+                                 results_path=args.results_db)
+        sys.exit(1 if failed else 0)
+
+    elif args.command == 'qc':
+        from DTSDataViewer import batch
+        for data_file_path in batch.screen_files(args.paths, args.output, workers=args.workers,
+                                                      catalog_filter=get_catalog_filter(args)):
+            print(data_file_path)
+
+    elif args.command == 'sweep':
+        from DTSDataViewer import batch, sweep
+        failed = batch.sweep_files(args.paths, args.output,
+                                   thresholds=sweep.default_thresholds if args.thresholds is None else args.thresholds,
+                                   workers=args.workers, catalog_filter=get_catalog_filter(args))
+        sys.exit(1 if failed else 0)
+
+    elif args.command == 'catalog':
+        from DTSDataViewer import catalog
+        with catalog.Catalog(args.db) as index:
+            if args.action == 'update':
+                for root_path in args.paths:
+                    index.update(root_path, workers=args.workers)
+            else:
+                filters = {'subject_id': args.subject, 'sample_rate_hz': args.sample_rate,
+                           'since': args.since, 'until': args.until}
+                rows = [row for root_path in args.paths or [None] for row in index.query(root_path=root_path, **filters)]
+                for row in rows:
+                    print(row['path'])
+
+    elif args.command == 'cohort':
+        from DTSDataViewer import batch, cohort, experiment
+        failed = cohort.build_cohort(
+            batch.find_data_files(args.paths, get_catalog_filter(args)), args.output, window_anchor=args.anchor,
+            workers=args.workers,
+            window_ms=experiment.default_window_ms if args.window_ms is None else args.window_ms,
+            pre_peak_fraction=experiment.default_pre_peak_fraction if args.pre_peak_fraction is None
+            else args.pre_peak_fraction)
+        sys.exit(1 if failed else 0)
+
+    elif args.command == 'inspect':
+        from DTSDataViewer import batch
+        failed = False
+        for data_file_path in batch.find_data_files(args.paths, get_catalog_filter(args)):
+            try:
+                info = batch.inspect_file(data_file_path, header_only=args.header_only)
+            except Exception as e:
+                logging.error("failed %s: %s", data_file_path, e)
+                failed = True
+                continue
+            if args.json:
+                print(json.dumps(info, default=str))
+            else:
+                print_info(info)
+        sys.exit(1 if failed else 0)
+
+    elif args.command == 'export':
+        from DTSDataViewer import batch
+        failed = batch.export_files(args.paths, args.export_path, manifest_path=args.manifest,
+                                    window_anchor=args.anchor, workers=args.workers, max_attempts=args.max_attempts,
+                                    catalog_filter=get_catalog_filter(args), derived_signals=args.derived,
+                                    timeout=args.timeout)
+        sys.exit(1 if failed else 0)
+
+    elif args.command == 'export-events':
+        from DTSDataViewer import batch
+        failed = False
+        for data_file_path in batch.find_data_files(args.paths, get_catalog_filter(args)):
+            try:
+                batch.export_events(data_file_path, args.export_path, window_anchor=args.anchor,
+                                    threshold=args.threshold, derived_signals=args.derived)
+            except Exception as e:
+                logging.error("failed %s: %s", data_file_path, e)
+                failed = True
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from DTSDataViewer.experiment import Experiment, default_window_ms, default_pre_peak_fraction
+
+logger = logging.getLogger(__name__)
+
+# columns of the table that goes with a cohort tensor, a row per trial
+cohort_fields = [
+    'trial',
+    'file',
+    'subject_id',
+    'anchor',
+    'window_start',
+    'window_end',
+    'error',
+]
+
+
+def get_window_data(experiment, start, stop):
+    """
+    Filtered data of all channels from 'start' to 'stop' as float32 (channels, samples).
+    Samples outside of the recording are NaN.
+    """
+    samples = experiment.scaled_data.shape[1]
+    window_data = np.full((len(experiment.channel_map), stop - start), np.nan, dtype=np.float32)
+    clipped_start = min(max(start, 0), samples)
+    clipped_stop = min(max(stop, clipped_start), samples)
+    if clipped_stop > clipped_start:
+        window_data[:, clipped_start - start:clipped_stop - start] = \
+            experiment.get_filtered_data(start=clipped_start, stop=clipped_stop)
+
+    return window_data
+
+
+def load_window(data_file_path, window_anchor, window_ms, pre_peak_fraction):
+    """
+    Load a data file, filtering only its windows, and return its export window as
+    (float32 (channels, samples) data, subject id, window start, window end)
+    """
+    experiment = Experiment.load(data_file_path, fast_open=True, workers=1,
+                                 window_ms=window_ms, pre_peak_fraction=pre_peak_fraction)
+    start, stop = experiment.get_export_window(window_anchor)
+
+    return get_window_data(experiment, start, stop), experiment.get_id(), start, stop
+
+
+def write_trial(tensor_path, trial_i, data_file_path, window_anchor, window_ms, pre_peak_fraction):
+    """
+    Worker: window one data file and write it to its slot of the memory-mapped tensor.
+    Returns subject id, window start and window end.
+    """
+    window_data, subject_id, start, stop = load_window(data_file_path, window_anchor, window_ms, pre_peak_fraction)
+    tensor = np.load(tensor_path, mmap_mode='r+')
+    if window_data.shape != tensor.shape[1:]:
+        raise ValueError(f"window of {window_data.shape[1]} samples does not fit a tensor of {tensor.shape[2]},"
+                         f" is the sample rate different?")
+    tensor[trial_i] = window_data
+    tensor.flush()
+    del tensor
+
+    return subject_id, start, stop
+
+
+def build_cohort(data_files, tensor_path, window_anchor='rise_start', workers=None,
+                 window_ms=default_window_ms, pre_peak_fraction=default_pre_peak_fraction):
+    """
+    Window every data file and write all of them to one memory-mapped (trials, channels, samples)
+    float32 .npy tensor, channels in channel_map order. The first file that loads fixes the window length; worker
+    processes write their trials directly into the tensor. Trials of files that fail are NaN.
+    A CSV next to the tensor maps each trial to file, subject id and window.
+    Returns dict of data file path to error message for files that failed.
+    """
+    data_files = list(data_files)
+    if not data_files:
+        raise ValueError("No data files")
+    table_path = os.path.splitext(tensor_path)[0] + '.csv'
+    rows = [{'trial': trial_i, 'file': data_file_path, 'subject_id': '', 'anchor': window_anchor,
+             'window_start': '', 'window_end': '', 'error': ''}
+            for trial_i, data_file_path in enumerate(data_files)]
+
+    # the first file that loads gives the tensor shape, files before it are failed trials
+    failed = {}
+    first_i = None
+    for trial_i, data_file_path in enumerate(data_files):
+        try:
+            window_data, subject_id, start, stop = load_window(data_file_path, window_anchor, window_ms,
+                                                               pre_peak_fraction)
+        except Exception as e:
+            failed[data_file_path] = str(e)
+            rows[trial_i]['error'] = str(e)
+            logger.error("failed %s: %s", data_file_path, e)
+            continue
+        first_i = trial_i
+        break
+    if first_i is None:
+        raise ValueError("No data file could be loaded")
+
+    tensor = np.lib.format.open_memmap(tensor_path, mode='w+', dtype=np.float32,
+                                       shape=(len(data_files),) + window_data.shape)
+    tensor[:] = np.nan
+    tensor[first_i] = window_data
+    tensor.flush()
+    del tensor
+    rows[first_i].update(subject_id=subject_id, window_start=start, window_end=stop)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(write_trial, tensor_path, trial_i, data_file_path, window_anchor, window_ms,
+                            pre_peak_fraction): trial_i
+            for trial_i, data_file_path in enumerate(data_files) if trial_i > first_i
+        }
+        for future in as_completed(futures):
+            trial_i = futures[future]
+            try:
+                subject_id, start, stop = future.result()
+                rows[trial_i].update(subject_id=subject_id, window_start=start, window_end=stop)
+            except Exception as e:
+                failed[data_files[trial_i]] = str(e)
+                rows[trial_i]['error'] = str(e)
+                logger.error("failed %s: %s", data_files[trial_i], e)
+
+    with open(table_path, 'w', newline='') as table_file:
+        writer = csv.DictWriter(table_file, fieldnames=cohort_fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    logger.info("cohort of %d trials in %s", len(data_files) - len(failed), tensor_path)
+
+    return failed
@@ -0,0 +1,94 @@
+import numpy as np
+
+# operations by the suffix that names a derived signal, '<signal>_<suffix>'
+# accel: first time derivative, angular acceleration of a rate channel
+# jerk: second time derivative
+# angle: time integral from the start of the recording, angular displacement of a rate channel
+derived_operations = ['accel', 'jerk', 'angle']
+
+
+def get_source(signal):
+    """
+    (source signal, operation) of a derived signal name, None if the name is not derived
+    """
+    source, _, operation = signal.rpartition('_')
+    if not source or operation not in derived_operations:
+        return None
+
+    return source, operation
+
+
+def get_derivative(data, sample_rate_hz, order=1):
+    """
+    Time derivative of a series, second order central differences inside and one sided at the ends
+    """
+    derivative = np.asarray(data, dtype=np.float64)
+    for _ in range(order):
+        derivative = np.gradient(derivative, 1.0 / sample_rate_hz)
+
+    return derivative
+
+
+def get_integral(data, sample_rate_hz, offset=0.0):
+    """
+    Cumulative trapezoidal time integral of a series less 'offset', zero at the first sample.
+    Pass the baseline mean as 'offset' so a sensor offset does not integrate into drift.
+    """
+    data = np.asarray(data, dtype=np.float64) - offset
+    integral = np.empty_like(data)
+    if data.size:
+        integral[0] = 0.0
+        np.cumsum((data[1:] + data[:-1]) * (0.5 / sample_rate_hz), out=integral[1:])
+
+    return integral
+
+
+def get_derived(data, sample_rate_hz, operation, offset=0.0):
+    """
+    Derived series of 'data' for one of derived_operations. 'offset' applies to 'angle' only.
+    """
+    if operation == 'accel':
+        return get_derivative(data, sample_rate_hz, order=1)
+    elif operation == 'jerk':
+        return get_derivative(data, sample_rate_hz, order=2)
+    elif operation == 'angle':
+        return get_integral(data, sample_rate_hz, offset=offset)
+
+    raise ValueError(f"Invalid derived operation: '{operation}'")
+
+
+def get_derived_resultant(component_data, sample_rate_hz, operation, offsets=None):
+    """
+    Resultant of the derived series of each component. The derivative of a resultant is the rate of
+    change of its magnitude, not the magnitude of the acceleration vector, and the integral of a
+    resultant rate is path length, not angular displacement. 'offsets' of the components apply to 'angle'.
+    """
+    offsets = [0.0] * len(component_data) if offsets is None else offsets
+
+    return np.sqrt(np.sum([np.square(get_derived(data, sample_rate_hz, operation, offset=offset))
+                           for data, offset in zip(component_data, offsets)], axis=0))
+
+
+def get_derived_eu(eu, operation):
+    """
+    Engineering units of a derived series from those of its source, 'rad/s' -> 'rad/s^2' for 'accel'
+    """
+    if operation not in derived_operations:
+        raise ValueError(f"Invalid derived operation: '{operation}'")
+
+    # powers of time of a rate unit such as 'rad/s' or 'deg/sec'
+    base_eu, seconds = eu, 0
+    for rate_suffix in ['/sec', '/s']:
+        if eu.endswith(rate_suffix):
+            base_eu, seconds = eu[:-len(rate_suffix)], 1
+            break
+    seconds += {'accel': 1, 'jerk': 2, 'angle': -1}[operation]
+
+    if seconds == 0:
+        return base_eu
+    elif seconds == 1:
+        return f"{base_eu}/s"
+    elif seconds > 1:
+        return f"{base_eu}/s^{seconds}"
+
+    return f"{base_eu}*s"
@@ -2,17 +2,108 @@
 # -*- coding: utf-8 -*-
 #
 
+import datetime
+import logging
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from PyQt5 import QtWidgets, QtGui, QtCore
-from DTSDataViewer.experiment import Experiment
+from DTSDataViewer.experiment import Experiment, ExportCancelled, default_window_ms, default_pre_peak_fraction
 from DTSDataViewer.plotarea import PlotArea
+from DTSDataViewer.memory import default_cache_memory_fraction, format_bytes, get_physical_memory_bytes
+from DTSDataViewer.cache import ExperimentCache
+from DTSDataViewer.catalog import Catalog
+from DTSDataViewer.watchdog import StallWatchdog
+from DTSDataViewer.acquisition import Acquisition, SimulatedDevice
 
 
 __version__ = '2.2.0'
 
 
+class ExportWorker(QtCore.QObject):
+    """
+    Runs an experiment export off the GUI thread
+    """
+
+    progress = QtCore.pyqtSignal(int)
+    finished = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, experiment, export_path, window_anchor):
+        super().__init__()
+        self.experiment = experiment
+        self.export_path = export_path
+        self.window_anchor = window_anchor
+        self.cancel_event = threading.Event()
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            self.experiment.export(self.export_path, window_anchor=self.window_anchor,
+                                   progress=lambda fraction: self.progress.emit(int(fraction * 100)),
+                                   cancel_event=self.cancel_event)
+            self.finished.emit(self.export_path)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class CatalogWorker(QtCore.QObject):
+    """
+    Updates the catalog index of a data tree off the GUI thread
+    """
+
+    finished = QtCore.pyqtSignal(int, int)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, catalog_path, root_path):
+        super().__init__()
+        self.catalog_path = catalog_path
+        self.root_path = root_path
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            # the connection belongs to this thread
+            with Catalog(self.catalog_path) as catalog:
+                read_count, removed_count = catalog.update(self.root_path)
+            self.finished.emit(read_count, removed_count)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class AcquisitionWorker(QtCore.QObject):
+    """
+    Streams from an acquisition device off the GUI thread until triggered
+    """
+
+    captured = QtCore.pyqtSignal(object)
+    stopped = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, acquisition):
+        super().__init__()
+        self.acquisition = acquisition
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            capture = self.acquisition.run()
+            if capture is None:
+                self.stopped.emit()
+            else:
+                self.captured.emit(capture)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class GUI(QtWidgets.QMainWindow):
 
     def __init__(self):
@@ -27,10 +118,63 @@ class GUI(QtWidgets.QMainWindow):
         self.plotCursorTrackDataMenu = None
         self.exportWindowAnchorMenu = None
         self.export_window_anchor = None
+        self.compactStorageMenu = None
+        self.compact_storage = None
+        self.fastOpenMenu = None
+        self.fast_open = None
+        self.cacheMemoryMenu = None
+        # memory budget of the experiment cache in MB, 0 for a part of physical memory
+        self.cache_memory_mb = None
+        self.windowLengthMenu = None
+        self.window_ms = None
+        self.windowPrePeakMenu = None
+        self.pre_peak_fraction = None
+        self.stallWatchdogMenu = None
+        self.stall_watchdog = None
+        self.derivedSignalMenu = None
+        self.derived_signal = None
 
         # class member for runtime access
         self.exportFileAction = None
 
+        # background export
+        self.export_thread = None
+        self.export_worker = None
+        self.export_progress_dlg = None
+
+        # data quality flags of loaded data
+        self.quality_label = None
+        # memory held by loaded data
+        self.memory_label = None
+        # impact shown of a recording with several
+        self.event_label = None
+
+        # file browser of the current data directory and prefetch of neighbouring files
+        self.file_list = None
+        self.file_list_dir = None
+        self.experiment_cache = None
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=2)
+
+        # header index of data trees
+        self.catalog_path = None
+        self.catalog_thread = None
+        self.catalog_worker = None
+
+        # opt-in event loop stall monitor, logs to a file in the application data directory
+        self.watchdog = None
+
+        # data collection: device, triggered acquisition on a thread and the live plot refresh
+        self.trigger_threshold = None
+        self.acquisition_device = None
+        self.acquisition = None
+        self.acquisition_thread = None
+        self.acquisition_worker = None
+        # captures are saved here, apart from the prefetch that close() cancels
+        self.capture_executor = ThreadPoolExecutor(max_workers=1)
+        self.live_timer = None
+        self.live_total = 0
+        self.stopCollectionAction = None
+
         # get app settings
         self.read_app_settings()
 
@@ -38,6 +182,7 @@ class GUI(QtWidgets.QMainWindow):
         self.plot_area = None
 
         self.init_gui()
+        self.set_watchdog(self.stall_watchdog)
 
     def init_gui(self):
         """
@@ -64,9 +209,56 @@ class GUI(QtWidgets.QMainWindow):
         self.exportFileAction.triggered.connect(self.export)
         self.exportFileAction.setEnabled(False)
 
+        nextFileAction = QtWidgets.QAction('&Next File', self)
+        nextFileAction.setShortcut('Ctrl+Right')
+        nextFileAction.setStatusTip('Load next DTS file of data directory')
+        nextFileAction.triggered.connect(lambda: self.step_file(1))
+
+        previousFileAction = QtWidgets.QAction('&Previous File', self)
+        previousFileAction.setShortcut('Ctrl+Left')
+        previousFileAction.setStatusTip('Load previous DTS file of data directory')
+        previousFileAction.triggered.connect(lambda: self.step_file(-1))
+
+        nextEventAction = QtWidgets.QAction('Next E&vent', self)
+        nextEventAction.setShortcut('Ctrl+Down')
+        nextEventAction.setStatusTip('Show next impact of recording')
+        nextEventAction.triggered.connect(lambda: self.step_event(1))
+
+        previousEventAction = QtWidgets.QAction('Previous Eve&nt', self)
+        previousEventAction.setShortcut('Ctrl+Up')
+        previousEventAction.setStatusTip('Show previous impact of recording')
+        previousEventAction.triggered.connect(lambda: self.step_event(-1))
+
+        findFileAction = QtWidgets.QAction('&Find in Catalog', self)
+        findFileAction.setShortcut('Ctrl+F')
+        findFileAction.setStatusTip('Find DTS files by subject, sample rate or date in the catalog')
+        findFileAction.triggered.connect(self.show_find_file_dlg)
+
+        updateCatalogAction = QtWidgets.QAction('&Update Catalog', self)
+        updateCatalogAction.setStatusTip('Index the DTS file headers of a directory tree')
+        updateCatalogAction.triggered.connect(self.update_catalog)
+
+        collectAction = QtWidgets.QAction('&Collect Data', self)
+        collectAction.setShortcut('Ctrl+D')
+        collectAction.setStatusTip('Enter experiment settings and wait for the trigger')
+        collectAction.triggered.connect(self.get_experiment_params)
+
+        self.stopCollectionAction = QtWidgets.QAction('&Stop Collection', self)
+        self.stopCollectionAction.setStatusTip('Stop waiting for the trigger')
+        self.stopCollectionAction.triggered.connect(self.stop_collection)
+        self.stopCollectionAction.setEnabled(False)
+
         menubar = self.menuBar()
         fileMenu = menubar.addMenu('&File')
         fileMenu.addAction(openFileAction)
+        fileMenu.addAction(collectAction)
+        fileMenu.addAction(self.stopCollectionAction)
+        fileMenu.addAction(findFileAction)
+        fileMenu.addAction(updateCatalogAction)
+        fileMenu.addAction(nextFileAction)
+        fileMenu.addAction(previousFileAction)
+        fileMenu.addAction(nextEventAction)
+        fileMenu.addAction(previousEventAction)
         fileMenu.addAction(self.exportFileAction)
         fileMenu.addAction(clearTraceAction)
         fileMenu.addAction(exitAction)
@@ -131,20 +323,154 @@ class GUI(QtWidgets.QMainWindow):
         self.exportWindowAnchorMenu.addAction(a)
         self.exportWindowAnchorMenu.triggered.connect(self.exportWindowAnchorMenu_changed)
 
+        # float32 storage of loaded data
+        self.compactStorageMenu = optMenu.addMenu('Compact Storage:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.compactStorageMenu)
+        # add menu items
+        a = ag.addAction(QtWidgets.QAction('On', self.compactStorageMenu, checkable=True))
+        a.setData(True)
+        if self.compact_storage:
+            a.setChecked(True)
+        self.compactStorageMenu.addAction(a)
+
+        a = ag.addAction(QtWidgets.QAction('Off', self.compactStorageMenu, checkable=True))
+        a.setData(False)
+        if not self.compact_storage:
+            a.setChecked(True)
+        self.compactStorageMenu.addAction(a)
+        self.compactStorageMenu.triggered.connect(self.compactStorageMenu_changed)
+
+        # filter only the data window when opening a file
+        self.fastOpenMenu = optMenu.addMenu('Fast Open:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.fastOpenMenu)
+        # add menu items
+        a = ag.addAction(QtWidgets.QAction('On', self.fastOpenMenu, checkable=True))
+        a.setData(True)
+        if self.fast_open:
+            a.setChecked(True)
+        self.fastOpenMenu.addAction(a)
+
+        a = ag.addAction(QtWidgets.QAction('Off', self.fastOpenMenu, checkable=True))
+        a.setData(False)
+        if not self.fast_open:
+            a.setChecked(True)
+        self.fastOpenMenu.addAction(a)
+        self.fastOpenMenu.triggered.connect(self.fastOpenMenu_changed)
+
+        # memory the cache of loaded and prefetched files may hold
+        self.cacheMemoryMenu = optMenu.addMenu('Cache Memory:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.cacheMemoryMenu)
+        # add menu items
+        for cache_memory_mb, text in [(0, f"Auto ({default_cache_memory_fraction:.0%} of RAM)"), (512, '512 MB'),
+                                      (1024, '1 GB'), (2048, '2 GB'), (4096, '4 GB')]:
+            a = ag.addAction(QtWidgets.QAction(text, self.cacheMemoryMenu, checkable=True))
+            a.setData(cache_memory_mb)
+            if self.cache_memory_mb == cache_memory_mb:
+                a.setChecked(True)
+            self.cacheMemoryMenu.addAction(a)
+        self.cacheMemoryMenu.triggered.connect(self.cacheMemoryMenu_changed)
+
+        # display and export window length
+        self.windowLengthMenu = optMenu.addMenu('Window Length:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.windowLengthMenu)
+        # add menu items
+        for window_ms in [125.0, 250.0, 500.0, 1000.0]:
+            a = ag.addAction(QtWidgets.QAction(f"{window_ms:g} ms", self.windowLengthMenu, checkable=True))
+            a.setData(window_ms)
+            if self.window_ms == window_ms:
+                a.setChecked(True)
+            self.windowLengthMenu.addAction(a)
+        self.windowLengthMenu.triggered.connect(self.windowMenu_changed)
+
+        # part of the window before the peak
+        self.windowPrePeakMenu = optMenu.addMenu('Window Before Peak:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.windowPrePeakMenu)
+        # add menu items
+        for pre_peak_fraction in [0.1, 0.25, 0.5]:
+            a = ag.addAction(QtWidgets.QAction(f"{pre_peak_fraction:.0%}", self.windowPrePeakMenu, checkable=True))
+            a.setData(pre_peak_fraction)
+            if self.pre_peak_fraction == pre_peak_fraction:
+                a.setChecked(True)
+            self.windowPrePeakMenu.addAction(a)
+        self.windowPrePeakMenu.triggered.connect(self.windowMenu_changed)
+
+        # derivative or integral plotted with the head resultant, and exported
+        self.derivedSignalMenu = optMenu.addMenu('Derived Signal:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.derivedSignalMenu)
+        # add menu items
+        for derived_signal, text in [('', 'Off'),
+                                     ('head_resultant_accel', 'Head Resultant Acceleration'),
+                                     ('head_resultant_jerk', 'Head Resultant Jerk'),
+                                     ('head_resultant_angle', 'Head Resultant Angle'),
+                                     ('mach_rot_pri_accel', 'Machine Primary Acceleration')]:
+            a = ag.addAction(QtWidgets.QAction(text, self.derivedSignalMenu, checkable=True))
+            a.setData(derived_signal)
+            if self.derived_signal == derived_signal:
+                a.setChecked(True)
+            self.derivedSignalMenu.addAction(a)
+        self.derivedSignalMenu.triggered.connect(self.derivedSignalMenu_changed)
+
+        # log event loop stalls
+        self.stallWatchdogMenu = optMenu.addMenu('Stall Watchdog:')
+        # group so options are exclusive
+        ag = QtWidgets.QActionGroup(self.stallWatchdogMenu)
+        # add menu items
+        a = ag.addAction(QtWidgets.QAction('On', self.stallWatchdogMenu, checkable=True))
+        a.setData(True)
+        if self.stall_watchdog:
+            a.setChecked(True)
+        self.stallWatchdogMenu.addAction(a)
+
+        a = ag.addAction(QtWidgets.QAction('Off', self.stallWatchdogMenu, checkable=True))
+        a.setData(False)
+        if not self.stall_watchdog:
+            a.setChecked(True)
+        self.stallWatchdogMenu.addAction(a)
+        self.stallWatchdogMenu.triggered.connect(self.stallWatchdogMenu_changed)
+
         # about menu
+        # file browser dock
+        self.file_list = QtWidgets.QListWidget()
+        self.file_list.currentRowChanged.connect(self.file_list_row_changed)
+        fileDock = QtWidgets.QDockWidget('Data Files', self)
+        fileDock.setObjectName('fileDock')
+        fileDock.setWidget(self.file_list)
+        self.addDockWidget(QtCore.Qt.LeftDockWidgetArea, fileDock)
+        viewMenu = menubar.addMenu('&View')
+        viewMenu.addAction(fileDock.toggleViewAction())
+
         abtMenu = menubar.addMenu('&About')
         appAction = QtWidgets.QAction('Application', self)
         appAction.triggered.connect(self.show_about_app_dlg)
         abtMenu.addAction(appAction)
+        renderStatsAction = QtWidgets.QAction('Rendering Statistics', self)
+        renderStatsAction.triggered.connect(self.show_render_stats_dlg)
+        abtMenu.addAction(renderStatsAction)
+        stallReportAction = QtWidgets.QAction('Stall Report', self)
+        stallReportAction.triggered.connect(self.show_stall_report_dlg)
+        abtMenu.addAction(stallReportAction)
 
         # create status bar
         self.statusBar()
+        self.event_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.event_label)
+        self.quality_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.quality_label)
+        self.memory_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.memory_label)
 
         self.setWindowTitle('DTS Data Viewer')
         self.setWindowIcon(QtGui.QIcon('rc/appicon.png'))
         self.statusBar().showMessage('Ready')
 
         self.plot_area = PlotArea(self.main_frame)
+        self.plot_area.peak_selected.connect(self.save_session)
         self.main_frame.setLayout(self.plot_area)
         self.setCentralWidget(self.main_frame)
 
@@ -196,6 +522,29 @@ class GUI(QtWidgets.QMainWindow):
 """)
         aboutDlg.exec_()
 
+    def show_render_stats_dlg(self):
+        """
+        Show frame time metrics of the plot
+        """
+        stats = self.plot_area.get_render_stats()
+        self.display_msg("Rendering Statistics",
+                         "Cursor frames: {frames}, mouse events per frame: {events_per_frame:0.1f}\n"
+                         "Cursor frame time: mean {mean_ms:0.1f} ms, 95% {p95_ms:0.1f} ms, max {max_ms:0.1f} ms\n"
+                         "Full redraws: {redraws}, mean {redraw_mean_ms:0.1f} ms, max {redraw_max_ms:0.1f} ms".format(**stats),
+                         "Mouse moves are rendered at most once per display frame and window resizes are redrawn "
+                         "once resizing pauses.")
+
+    def show_stall_report_dlg(self):
+        """
+        Show the worst event loop stalls seen by the watchdog
+        """
+        if self.watchdog is None:
+            self.display_msg("Stall Report", "The stall watchdog is off.", "Turn it on in Options.")
+            return
+
+        summary = self.watchdog.get_summary()
+        self.display_msg("Stall Report", summary[0], "\n".join(summary[1:]))
+
     def show_about_experiment_dlg(self):
         """
         Show some version info
@@ -227,8 +576,12 @@ class GUI(QtWidgets.QMainWindow):
 
             # make sure we have data
             if (len(inFldId.text()) != 0) and (len(inFldPsiLoad.text()) != 0) and (len(inFldPsiSet.text()) != 0):
-                # start new experiment
+                # start new experiment, keeping the data and export directories
+                last_data_path = self.experiment.lastDataPath
+                last_export_path = self.experiment.lastExportPath
                 self.experiment = Experiment()
+                self.experiment.lastDataPath = last_data_path
+                self.experiment.lastExportPath = last_export_path
                 self.experiment.subjectId = str(inFldId.text())
                 self.experiment.PsiLoad = str(inFldPsiLoad.text())
                 self.experiment.PsiSet = str(inFldPsiSet.text())
@@ -243,11 +596,6 @@ class GUI(QtWidgets.QMainWindow):
         def frmCancel():
             experimentDlg.close()
 
-        # see if we can collect an experiment first; perhaps better place to put this?
-        if 'PyDAQmx' not in sys.modules:
-            self.display_msg("No NI Driver", "You cannot collect data.",
-                             "Data collection requires niDAQmx driver and PyDAQmx wrapper.")
-
         experimentDlg = QtWidgets.QDialog(self)
         experimentDlg.setWindowTitle("Experiment Settings")
         experimentDlg.setWindowModality(QtCore.Qt.ApplicationModal)
@@ -256,20 +604,20 @@ class GUI(QtWidgets.QMainWindow):
         inLblId = QtWidgets.QLabel("Subject ID:")
         inFldId = QtWidgets.QLineEdit()
         # inFldId.setInputMask('M99999999')   # input validation for MRN ids
-        inFldId.setText(self.experiment.subjectId)
+        inFldId.setText(getattr(self.experiment, 'subjectId', ''))
         # inFldId.setCursorPosition(len(self.experiment.subjectId)) # input validation, cursor position
 
         inLblPsiLoad = QtWidgets.QLabel("Load PSI:")
         inFldPsiLoad = QtWidgets.QLineEdit()
         inFldPsiLoad.setValidator(QtGui.QIntValidator())
         inFldPsiLoad.setMaxLength(4)
-        inFldPsiLoad.setText(self.experiment.PsiLoad)
+        inFldPsiLoad.setText(getattr(self.experiment, 'PsiLoad', ''))
 
         inLblPsiSet = QtWidgets.QLabel("Set PSI:")
         inFldPsiSet = QtWidgets.QLineEdit()
         inFldPsiSet.setValidator(QtGui.QIntValidator())
         inFldPsiSet.setMaxLength(3)
-        inFldPsiSet.setText(self.experiment.PsiSet)
+        inFldPsiSet.setText(getattr(self.experiment, 'PsiSet', ''))
 
         btnBox = QtWidgets.QDialogButtonBox()
         btnBox.addButton("Continue", QtWidgets.QDialogButtonBox.AcceptRole)
@@ -288,6 +636,267 @@ class GUI(QtWidgets.QMainWindow):
         experimentDlg.setLayout(dlgLayout)
         experimentDlg.exec_()
 
+    def get_acquisition_device(self):
+        """
+        Device to collect from. Without a DAQ backend recorded DTS files are replayed at their sample rate.
+        """
+        if self.acquisition_device is not None:
+            return self.acquisition_device
+
+        if 'PyDAQmx' not in sys.modules:
+            self.statusBar().showMessage('No NI driver, data collection replays DTS files')
+        fnames, _ = QtWidgets.QFileDialog.getOpenFileNames(self, 'Select DTS Files to Replay',
+                                                           self.experiment.lastDataPath, "Sliceware Files (*.dts)")
+        if not fnames:
+            return None
+
+        try:
+            self.acquisition_device = SimulatedDevice(fnames)
+        except Exception as e:
+            self.display_msg("Error:", "Opening acquisition device", str(e))
+            return None
+
+        return self.acquisition_device
+
+    def get_current_excitation_voltage(self):
+        """
+        Excitation voltage of the acquisition device, None if there is no device to collect from
+        """
+        if self.acquisition_thread is not None:
+            self.statusBar().showMessage('Collection in progress')
+            return None
+
+        device = self.get_acquisition_device()
+        if device is None:
+            return None
+
+        excitation_volts = device.get_excitation_voltage()
+        if excitation_volts is None:
+            self.display_msg("Error:", "Excitation voltage check failed", "The device did not report a voltage.")
+            self.acquisition_device = None
+
+        return excitation_volts
+
+    def wait_trigger_collection(self):
+        """
+        Stream from the device in the background and show the latest data until the machine triggers
+        """
+        try:
+            self.acquisition = Acquisition(self.acquisition_device, self.trigger_threshold)
+        except Exception as e:
+            self.display_msg("Error:", "Starting collection", str(e))
+            self.acquisition_device = None
+            return
+
+        self.live_total = 0
+        self.acquisition_thread = QtCore.QThread(self)
+        self.acquisition_worker = AcquisitionWorker(self.acquisition)
+        self.acquisition_worker.moveToThread(self.acquisition_thread)
+        self.acquisition_thread.started.connect(self.acquisition_worker.run)
+        self.acquisition_worker.captured.connect(self.acquisition_captured)
+        self.acquisition_worker.stopped.connect(self.acquisition_stopped)
+        self.acquisition_worker.failed.connect(self.acquisition_failed)
+
+        # redraw at most 20 times a second however fast blocks arrive
+        self.live_timer = QtCore.QTimer(self)
+        self.live_timer.setInterval(50)
+        self.live_timer.timeout.connect(self.update_live_plot)
+
+        self.exportFileAction.setEnabled(False)
+        self.stopCollectionAction.setEnabled(True)
+        self.setWindowTitle('DTS Data Viewer - ' + self.experiment.subjectId)
+        self.statusBar().showMessage(f"Waiting for trigger on machine primary > {self.trigger_threshold:g}...")
+        self.acquisition_thread.start()
+        self.live_timer.start()
+
+    def update_live_plot(self):
+        """
+        Show the latest samples of the running collection, thinned to about the plot width
+        """
+        data, total = self.acquisition.get_latest(self.acquisition.ring.capacity)
+        if total == self.live_total or data.shape[1] < 2:
+            return
+        self.live_total = total
+
+        step = max(data.shape[1] // 2000, 1)
+        self.plot_area.update_live(data[:, ::step], self.acquisition.device.sample_rate_hz / step,
+                                   self.experiment.channel_map)
+
+    def stop_collection(self):
+        if self.acquisition is not None:
+            self.acquisition.stop()
+
+    def acquisition_captured(self, capture):
+        """
+        Save the capture in the background and show it without reading it back
+        """
+        params = {name: getattr(self.experiment, name) for name in ['subjectId', 'PsiLoad', 'PsiSet', 'excitation_volts']}
+        last_export_path = self.experiment.lastExportPath
+        capture_path = os.path.join(self.experiment.lastDataPath,
+                                    f"{params['subjectId']}_{capture.captured_at:%Y%m%d_%H%M%S}.npz")
+        self.acquisition_done()
+
+        def report_save(future):
+            if future.exception() is not None:
+                logging.getLogger(__name__).error("saving %s failed: %s", capture_path, future.exception())
+
+        # errors surface in the log, the capture is shown either way
+        self.capture_executor.submit(capture.save, capture_path).add_done_callback(report_save)
+
+        try:
+            self.experiment = capture.to_experiment(capture_path, compact=self.compact_storage,
+                                                    window_ms=self.window_ms, pre_peak_fraction=self.pre_peak_fraction)
+            for name, value in params.items():
+                setattr(self.experiment, name, value)
+            self.experiment.lastExportPath = last_export_path
+            self.experiment.export_window_anchor = self.export_window_anchor
+            self.experiment.detect_events()
+            self.set_derived_signal()
+
+            self.plot_area.clear_plot()
+            self.plot_area.plot(self.experiment, self.plot_annotate, self.plot_cursor_tracks_data)
+        except Exception as e:
+            self.display_msg("Error:", "Showing captured data", str(e))
+            return
+
+        self.statusBar().showMessage('Captured ' + capture_path)
+        self.setWindowTitle('DTS Data Viewer - ' + self.experiment.get_export_label())
+        self.update_memory_status()
+        self.update_quality_status()
+        self.update_event_status()
+        self.exportFileAction.setEnabled(True)
+
+    def acquisition_stopped(self):
+        self.acquisition_done()
+        self.plot_area.clear_plot()
+        self.setWindowTitle('DTS Data Viewer')
+        self.statusBar().showMessage('Collection stopped')
+
+    def acquisition_failed(self, message):
+        self.acquisition_done()
+        self.plot_area.clear_plot()
+        self.statusBar().showMessage('Collection failed')
+        self.display_msg("Error:", "Error collecting data", message)
+
+    def acquisition_done(self):
+        """
+        Clean up after background collection
+        """
+        self.live_timer.stop()
+        self.live_timer.deleteLater()
+        self.live_timer = None
+        self.acquisition_thread.quit()
+        self.acquisition_thread.wait()
+        self.acquisition_worker.deleteLater()
+        self.acquisition_thread.deleteLater()
+        self.acquisition_worker = None
+        self.acquisition_thread = None
+        self.acquisition = None
+        # a replay is chosen again for the next collection
+        self.acquisition_device = None
+        self.stopCollectionAction.setEnabled(False)
+
+    def show_find_file_dlg(self):
+        """
+        Filter the catalog as the user types and open the selected file
+        """
+        findDlg = QtWidgets.QDialog(self)
+        findDlg.setWindowTitle("Find in Catalog")
+        findDlg.setWindowModality(QtCore.Qt.ApplicationModal)
+
+        inFldSubject = QtWidgets.QLineEdit()
+        inFldSampleRate = QtWidgets.QLineEdit()
+        inFldSampleRate.setValidator(QtGui.QDoubleValidator())
+        inFldSince = QtWidgets.QLineEdit()
+        inFldSince.setPlaceholderText('YYYY-MM-DD')
+        inFldUntil = QtWidgets.QLineEdit()
+        inFldUntil.setPlaceholderText('YYYY-MM-DD')
+        resultList = QtWidgets.QListWidget()
+        resultCount = QtWidgets.QLabel()
+
+        catalog = Catalog(self.catalog_path)
+
+        def frmFilter():
+            try:
+                sample_rate_hz = float(inFldSampleRate.text()) if inFldSampleRate.text() else None
+                rows = catalog.query(subject_id=inFldSubject.text() or None,
+                                     sample_rate_hz=sample_rate_hz,
+                                     since=inFldSince.text() or None,
+                                     until=inFldUntil.text() or None)
+            except ValueError:
+                # still typing a number or timestamp
+                return
+            resultList.clear()
+            for row in rows:
+                item = QtWidgets.QListWidgetItem(f"{row['file_name']}  {row['timestamp'] or ''}")
+                item.setData(QtCore.Qt.UserRole, row['path'])
+                item.setToolTip(row['path'])
+                resultList.addItem(item)
+            resultCount.setText(f"{len(rows)} file(s)")
+
+        def frmOpen(item):
+            findDlg.close()
+            self.open_file(item.data(QtCore.Qt.UserRole))
+
+        for inFld in [inFldSubject, inFldSampleRate, inFldSince, inFldUntil]:
+            inFld.textChanged.connect(frmFilter)
+        resultList.itemActivated.connect(frmOpen)
+
+        dlgLayout = QtWidgets.QFormLayout()
+        dlgLayout.addRow(QtWidgets.QLabel("Subject ID:"), inFldSubject)
+        dlgLayout.addRow(QtWidgets.QLabel("Sample Rate (Hz):"), inFldSampleRate)
+        dlgLayout.addRow(QtWidgets.QLabel("Since:"), inFldSince)
+        dlgLayout.addRow(QtWidgets.QLabel("Until:"), inFldUntil)
+        dlgLayout.addRow(resultList)
+        dlgLayout.addRow(resultCount)
+        findDlg.setLayout(dlgLayout)
+
+        frmFilter()
+        findDlg.exec_()
+        catalog.close()
+
+    def update_catalog(self):
+        """
+        Index the headers of a directory tree in the background
+        """
+        if self.catalog_thread is not None:
+            self.statusBar().showMessage('Catalog update in progress')
+            return
+
+        dname = QtWidgets.QFileDialog.getExistingDirectory(self, 'Select Data Directory', self.experiment.lastDataPath,
+                                                           options=QtWidgets.QFileDialog.ShowDirsOnly)
+        if not len(dname):
+            return
+
+        self.catalog_thread = QtCore.QThread(self)
+        self.catalog_worker = CatalogWorker(self.catalog_path, dname)
+        self.catalog_worker.moveToThread(self.catalog_thread)
+        self.catalog_thread.started.connect(self.catalog_worker.run)
+        self.catalog_worker.finished.connect(self.catalog_finished)
+        self.catalog_worker.failed.connect(self.catalog_failed)
+        self.statusBar().showMessage('Updating catalog of ' + dname + '...')
+        self.catalog_thread.start()
+
+    def catalog_finished(self, read_count, removed_count):
+        self.catalog_done()
+        self.statusBar().showMessage(f"Catalog updated: {read_count} file(s) read, {removed_count} removed")
+
+    def catalog_failed(self, message):
+        self.catalog_done()
+        self.statusBar().showMessage('Catalog update failed')
+        self.display_msg("Error:", "Error updating catalog", message)
+
+    def catalog_done(self):
+        """
+        Clean up after background catalog update
+        """
+        self.catalog_thread.quit()
+        self.catalog_thread.wait()
+        self.catalog_worker.deleteLater()
+        self.catalog_thread.deleteLater()
+        self.catalog_worker = None
+        self.catalog_thread = None
+
     @staticmethod
     def display_msg(txt, iTxt, dTxt):
         msg = QtWidgets.QMessageBox()
@@ -313,6 +922,77 @@ class GUI(QtWidgets.QMainWindow):
         # with data cleared, disable export of data menu item
         self.exportFileAction.setEnabled(False)
         self.setWindowTitle('DTS Data Viewer')
+        self.update_memory_status()
+        self.update_quality_status()
+        self.update_event_status()
+
+    def update_event_status(self):
+        """
+        Show which impact of a recording with several is shown in the status bar
+        """
+        if len(self.experiment.events) < 2:
+            self.event_label.setText('')
+        elif self.experiment.active_event is None:
+            self.event_label.setText(f"{len(self.experiment.events)} events")
+        else:
+            self.event_label.setText(f"Event {self.experiment.active_event + 1} of {len(self.experiment.events)}")
+
+    def step_event(self, step):
+        """
+        Show the next (step 1) or previous (step -1) impact of the recording
+        """
+        if len(self.experiment.events) < 2:
+            return
+
+        if self.experiment.active_event is None:
+            event_i = 0 if step > 0 else len(self.experiment.events) - 1
+        else:
+            event_i = self.experiment.active_event + step
+        if not 0 <= event_i < len(self.experiment.events):
+            return
+
+        try:
+            self.experiment.select_event(event_i)
+            self.plot_area.clear_plot()
+            self.plot_area.plot(self.experiment, self.plot_annotate, self.plot_cursor_tracks_data)
+        except Exception as e:
+            self.display_msg("Error:", "Selecting event", str(e))
+            return
+
+        self.setWindowTitle('DTS Data Viewer - ' + self.experiment.get_export_label())
+        self.update_event_status()
+
+    def update_quality_status(self):
+        """
+        Show data quality flags of the loaded experiment in the status bar
+        """
+        if self.experiment.channel_data is None:
+            self.quality_label.setText('')
+            self.quality_label.setToolTip('')
+            return
+
+        report = self.experiment.get_quality_report()
+        if report.is_suspicious():
+            self.quality_label.setText(f"QC: {len(report.flags)} flag(s)")
+            self.quality_label.setStyleSheet('color: red')
+            self.quality_label.setToolTip("\n".join(report.get_flag_text()))
+        else:
+            self.quality_label.setText('QC: OK')
+            self.quality_label.setStyleSheet('')
+            self.quality_label.setToolTip('')
+
+    def update_memory_status(self):
+        """
+        Show memory held by the loaded experiment in the status bar
+        """
+        self.memory_label.setText('Memory: ' + format_bytes(self.experiment.get_memory_bytes()))
+        cache = self.get_experiment_cache()
+        cache_text = f"cache: {format_bytes(cache.get_memory_bytes())} of {len(cache)} files" + (
+            f", budget {format_bytes(cache.max_bytes)}" if cache.max_bytes is not None else '')
+        self.memory_label.setToolTip("\n".join(
+            [f"{name}: {format_bytes(size)}" for name, size in self.experiment.get_memory_usage().items() if size] +
+            [cache_text]
+        ))
 
     def plotCursorTrackDataMenu_changed(self):
         """ 
@@ -339,37 +1019,263 @@ class GUI(QtWidgets.QMainWindow):
         for action in self.exportWindowAnchorMenu.actions():
             if action.isChecked():
                 self.export_window_anchor = action.data()
+                # keep anchor with the loaded file
+                if self.experiment.channel_data is not None:
+                    self.experiment.export_window_anchor = self.export_window_anchor
+                    self.save_session()
 
-    def load_trace(self):
+    def save_session(self, *args):
         """
-        Read DTS data file and display in plot
+        Save user selections of the loaded file to its session sidecar
         """
         try:
+            self.experiment.save_session()
+        except OSError as e:
+            self.statusBar().showMessage('Session not saved: ' + str(e))
 
-            fname, _ = QtWidgets.QFileDialog.getOpenFileName(self, 'Open file',
-                                                             self.experiment.lastDataPath, "Sliceware Files (*.dts)")
-            if fname:
-                # update experiment parameters with header from file being loaded
-                self.experiment = Experiment.load(fname)
-                # clear the plot
-                self.plot_area.clear_plot()
+    def compactStorageMenu_changed(self):
+        """
+        Applies to the next file loaded
+        """
+        for action in self.compactStorageMenu.actions():
+            if action.isChecked():
+                self.compact_storage = action.data()
+                self.reset_experiment_cache()
+
+    def cacheMemoryMenu_changed(self):
+        """
+        Applies to the next file loaded
+        """
+        for action in self.cacheMemoryMenu.actions():
+            if action.isChecked():
+                self.cache_memory_mb = action.data()
+                self.reset_experiment_cache()
+
+    def get_cache_max_bytes(self):
+        """
+        Memory budget of the experiment cache, None if it is automatic and physical memory is not known
+        """
+        if self.cache_memory_mb:
+            return int(self.cache_memory_mb * 1024 * 1024)
+
+        physical_memory_bytes = get_physical_memory_bytes()
+        if physical_memory_bytes is None:
+            return None
+
+        return int(physical_memory_bytes * default_cache_memory_fraction)
 
-                # plot data
+    def fastOpenMenu_changed(self):
+        """
+        Applies to the next file loaded
+        """
+        for action in self.fastOpenMenu.actions():
+            if action.isChecked():
+                self.fast_open = action.data()
+                self.reset_experiment_cache()
+
+    def windowMenu_changed(self):
+        """
+        Window the loaded data again and show it in the existing plots. Applies to exports too.
+        """
+        for action in self.windowLengthMenu.actions():
+            if action.isChecked():
+                self.window_ms = action.data()
+        for action in self.windowPrePeakMenu.actions():
+            if action.isChecked():
+                self.pre_peak_fraction = action.data()
+
+        # files loaded from now on
+        if self.experiment_cache is not None:
+            self.experiment_cache.window_ms = self.window_ms
+            self.experiment_cache.pre_peak_fraction = self.pre_peak_fraction
+
+        if self.experiment.channel_data is not None:
+            self.experiment.set_window(self.window_ms, self.pre_peak_fraction)
+            self.plot_area.update_window()
+            self.update_memory_status()
+            self.statusBar().showMessage('Ready')
+
+    def derivedSignalMenu_changed(self):
+        """
+        Plot the loaded data again with the selected derived signal. Applies to exports too.
+        """
+        for action in self.derivedSignalMenu.actions():
+            if action.isChecked():
+                self.derived_signal = action.data()
+
+        if self.experiment.channel_data is not None:
+            try:
+                self.set_derived_signal()
+                self.plot_area.clear_plot()
                 self.plot_area.plot(self.experiment, self.plot_annotate, self.plot_cursor_tracks_data)
-                self.statusBar().showMessage('Ready')
+            except Exception as e:
+                self.display_msg("Error:", "Computing derived signal", str(e))
+                return
+            self.update_memory_status()
+            self.statusBar().showMessage('Ready')
+
+    def set_derived_signal(self):
+        """
+        Make the selected derived signal the one plotted and exported with the current experiment
+        """
+        if self.experiment.derived_signals != ([self.derived_signal] if self.derived_signal else []):
+            self.experiment.derived_signals = []
+            if self.derived_signal:
+                self.experiment.add_derived(self.derived_signal)
+
+    def stallWatchdogMenu_changed(self):
+        for action in self.stallWatchdogMenu.actions():
+            if action.isChecked():
+                self.stall_watchdog = action.data()
+                self.set_watchdog(self.stall_watchdog)
 
-                self.setWindowTitle('DTS Data Viewer - ' + self.experiment.get_label())
-                # with data loaded, enable export of data menu item
-                self.exportFileAction.setEnabled(True)
+    def set_watchdog(self, enabled):
+        """
+        Start or stop the event loop stall watchdog
+        """
+        if enabled and self.watchdog is None:
+            log_dir = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.AppDataLocation)
+            os.makedirs(log_dir, exist_ok=True)
+            watchdog_logger = logging.getLogger('DTSDataViewer.watchdog')
+            if not watchdog_logger.handlers:
+                handler = logging.FileHandler(os.path.join(log_dir, 'stalls.log'))
+                handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+                watchdog_logger.addHandler(handler)
+                watchdog_logger.setLevel(logging.INFO)
+            self.watchdog = StallWatchdog()
+            self.watchdog.set_context(self.experiment.data_file_path)
+            self.watchdog.start()
+        elif not enabled and self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    def load_trace(self):
+        """
+        Select DTS data file and display in plot
+        """
+        fname, _ = QtWidgets.QFileDialog.getOpenFileName(self, 'Open file', self.experiment.lastDataPath,
+                                                         "Data Files (*.dts *.npz);;Sliceware Files (*.dts);;"
+                                                         "Captures (*.npz)")
+        if fname:
+            self.open_file(fname)
+
+    def open_file(self, fname):
+        """
+        Read DTS data file and display in plot
+        """
+        if self.watchdog is not None:
+            self.watchdog.set_context(fname)
+
+        try:
+
+            # update experiment parameters with header from file being loaded
+            # a file that was prefetched is taken from the cache
+            self.experiment = self.get_experiment_cache().get(fname)
+            # restore export anchor of an earlier session, otherwise the file takes the current one
+            if self.experiment.export_window_anchor in ('peak', 'rise_start'):
+                self.export_window_anchor = self.experiment.export_window_anchor
+                for action in self.exportWindowAnchorMenu.actions():
+                    action.setChecked(action.data() == self.export_window_anchor)
+            else:
+                self.experiment.export_window_anchor = self.export_window_anchor
+            # a file cached before the window changed
+            if (self.experiment.window_ms, self.experiment.pre_peak_fraction) != (self.window_ms, self.pre_peak_fraction):
+                self.experiment.set_window(self.window_ms, self.pre_peak_fraction)
+            # impacts of the recording, kept with a cached experiment
+            if not self.experiment.events:
+                self.experiment.detect_events()
+            self.set_derived_signal()
+            # clear the plot
+            self.plot_area.clear_plot()
+
+            # plot data
+            self.plot_area.plot(self.experiment, self.plot_annotate, self.plot_cursor_tracks_data)
+            self.statusBar().showMessage('Ready')
+
+            self.setWindowTitle('DTS Data Viewer - ' + self.experiment.get_export_label())
+            self.update_memory_status()
+            self.update_quality_status()
+            self.update_event_status()
+            # with data loaded, enable export of data menu item
+            self.exportFileAction.setEnabled(True)
 
         except Exception as e:
             self.display_msg("Error:", "Loading Trace file", str(e))
             return
 
+        self.refresh_file_list(fname)
+        self.prefetch_neighbours()
+
+    def get_experiment_cache(self):
+        """
+        Cache of loaded and prefetched experiments
+        """
+        if self.experiment_cache is None:
+            # current file and its two neighbours
+            self.experiment_cache = ExperimentCache(max_items=3, compact=self.compact_storage, fast_open=self.fast_open,
+                                                    max_bytes=self.get_cache_max_bytes(),
+                                                    window_ms=self.window_ms, pre_peak_fraction=self.pre_peak_fraction)
+
+        return self.experiment_cache
+
+    def reset_experiment_cache(self):
+        """
+        Load options changed, so files are loaded again
+        """
+        self.experiment_cache = None
+
+    def refresh_file_list(self, fname):
+        """
+        List DTS files and captures of the directory of fname and select fname
+        """
+        file_dir = QtCore.QFileInfo(fname).absolutePath()
+        file_name = QtCore.QFileInfo(fname).fileName()
+
+        # selecting a row programmatically should not load it again
+        self.file_list.blockSignals(True)
+        if file_dir != self.file_list_dir:
+            self.file_list_dir = file_dir
+            self.file_list.clear()
+            self.file_list.addItems(QtCore.QDir(file_dir).entryList(['*.dts', '*.DTS', '*.npz'], QtCore.QDir.Files,
+                                                                    QtCore.QDir.Name))
+        matches = self.file_list.findItems(file_name, QtCore.Qt.MatchExactly)
+        if matches:
+            self.file_list.setCurrentItem(matches[0])
+        self.file_list.blockSignals(False)
+
+    def file_list_row_changed(self, row):
+        if row >= 0:
+            self.open_file(QtCore.QDir(self.file_list_dir).filePath(self.file_list.item(row).text()))
+
+    def step_file(self, step):
+        """
+        Load the next (step 1) or previous (step -1) file of the file list
+        """
+        row = self.file_list.currentRow() + step
+        if 0 <= row < self.file_list.count():
+            self.file_list.setCurrentRow(row)
+
+    def prefetch_neighbours(self):
+        """
+        Load the files before and after the current one in the background
+        """
+        cache = self.get_experiment_cache()
+        for row in [self.file_list.currentRow() + 1, self.file_list.currentRow() - 1]:
+            if 0 <= row < self.file_list.count():
+                fname = QtCore.QDir(self.file_list_dir).filePath(self.file_list.item(row).text())
+                if fname not in cache:
+                    # errors surface when the file is opened
+                    self.prefetch_executor.submit(cache.get, fname)
+
     def export(self):
         """ 
-        Export experiment data files
+        Export experiment data files in the background
         """
+        # one export at a time
+        if self.export_thread is not None:
+            self.statusBar().showMessage('Export in progress')
+            return
+
         try:
 
             dname = QtWidgets.QFileDialog.getExistingDirectory(self,
@@ -377,13 +1283,61 @@ class GUI(QtWidgets.QMainWindow):
                                                                self.experiment.lastExportPath,
                                                                options=QtWidgets.QFileDialog.ShowDirsOnly)
             if len(dname):
-                self.experiment.export(dname, window_anchor=self.export_window_anchor)
+                self.exportFileAction.setEnabled(False)
+
+                self.export_progress_dlg = QtWidgets.QProgressDialog('Exporting ' + self.experiment.get_label(),
+                                                                     'Cancel', 0, 100, self)
+                self.export_progress_dlg.setWindowTitle('Export Data')
+                self.export_progress_dlg.setMinimumDuration(500)
+                # stay open at 100% until the files are renamed into place, export_done() resets it
+                self.export_progress_dlg.setAutoReset(False)
+
+                self.export_thread = QtCore.QThread(self)
+                # the window, peaks and event can change while the snapshot is exported
+                self.export_worker = ExportWorker(self.experiment.get_snapshot(), dname, self.export_window_anchor)
+                self.export_worker.moveToThread(self.export_thread)
+                self.export_thread.started.connect(self.export_worker.run)
+                self.export_worker.progress.connect(self.export_progress_dlg.setValue)
+                self.export_worker.finished.connect(self.export_finished)
+                self.export_worker.cancelled.connect(self.export_cancelled)
+                self.export_worker.failed.connect(self.export_failed)
+                # cancel is checked from the worker thread so call directly
+                self.export_progress_dlg.canceled.connect(self.export_worker.cancel, QtCore.Qt.DirectConnection)
+
+                self.statusBar().showMessage('Exporting ' + self.experiment.get_label() + '...')
+                self.export_thread.start()
 
         except Exception as e:
             self.display_msg("Error:", "Error exporting data", str(e))
             return
 
+    def export_finished(self, export_path):
+        self.export_done()
+        self.experiment.lastExportPath = export_path
+        self.statusBar().showMessage('Exported to ' + export_path)
+
+    def export_cancelled(self):
+        self.export_done()
+        self.statusBar().showMessage('Export cancelled')
 
+    def export_failed(self, message):
+        self.export_done()
+        self.statusBar().showMessage('Export failed')
+        self.display_msg("Error:", "Error exporting data", message)
+
+    def export_done(self):
+        """
+        Clean up after background export
+        """
+        self.export_progress_dlg.reset()
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_worker.deleteLater()
+        self.export_thread.deleteLater()
+        self.export_worker = None
+        self.export_thread = None
+        # export is available again if there is data loaded
+        self.exportFileAction.setEnabled(self.experiment.channel_data is not None)
 
     def read_app_settings(self):
         """
@@ -405,6 +1359,25 @@ class GUI(QtWidgets.QMainWindow):
         self.experiment.lastExportPath = self.settings.value('lastExportPath', os.path.join(script_home, 'data'))
         # window anchor for exported data
         self.export_window_anchor = self.settings.value('export_window_anchor', 'rise_start', type=str)
+        # float32 storage of loaded data
+        self.compact_storage = self.settings.value('compact_storage', False, type=bool)
+        # filter only the data window when opening a file
+        self.fast_open = self.settings.value('fast_open', False, type=bool)
+        # memory budget of the experiment cache
+        self.cache_memory_mb = self.settings.value('cache_memory_mb', 0, type=int)
+        # catalog index of data file headers
+        app_data_dir = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.AppDataLocation)
+        os.makedirs(app_data_dir, exist_ok=True)
+        self.catalog_path = self.settings.value('catalog_path', os.path.join(app_data_dir, 'catalog.sqlite'), type=str)
+        # event loop stall watchdog
+        self.stall_watchdog = self.settings.value('stall_watchdog', False, type=bool)
+        # machine primary level that triggers data collection
+        self.trigger_threshold = self.settings.value('trigger_threshold', 10.0, type=float)
+        # derived signal plotted and exported, '' for none
+        self.derived_signal = self.settings.value('derived_signal', '', type=str)
+        # display and export window
+        self.window_ms = self.settings.value('window_ms', default_window_ms, type=float)
+        self.pre_peak_fraction = self.settings.value('pre_peak_fraction', default_pre_peak_fraction, type=float)
 
     def save_app_settings(self):
         """
@@ -416,6 +1389,15 @@ class GUI(QtWidgets.QMainWindow):
         self.settings.setValue('lastDataPath', self.experiment.lastDataPath)
         self.settings.setValue('lastExportPath', self.experiment.lastExportPath)
         self.settings.setValue('export_window_anchor', self.export_window_anchor)
+        self.settings.setValue('compact_storage', self.compact_storage)
+        self.settings.setValue('fast_open', self.fast_open)
+        self.settings.setValue('cache_memory_mb', self.cache_memory_mb)
+        self.settings.setValue('stall_watchdog', self.stall_watchdog)
+        self.settings.setValue('catalog_path', self.catalog_path)
+        self.settings.setValue('trigger_threshold', self.trigger_threshold)
+        self.settings.setValue('derived_signal', self.derived_signal)
+        self.settings.setValue('window_ms', self.window_ms)
+        self.settings.setValue('pre_peak_fraction', self.pre_peak_fraction)
 
         # this writes to native storage
         del self.settings
@@ -427,6 +1409,23 @@ class GUI(QtWidgets.QMainWindow):
         :return: 
         """
         self.save_app_settings()
+        if self.acquisition_thread is not None:
+            self.acquisition.stop()
+            self.acquisition_thread.quit()
+            self.acquisition_thread.wait()
+        # a running export removes its temporary files when cancelled
+        if self.export_thread is not None:
+            self.export_worker.cancel()
+            self.export_thread.quit()
+            self.export_thread.wait()
+        # a catalog update cannot be interrupted, let it commit
+        if self.catalog_thread is not None:
+            self.catalog_thread.quit()
+            self.catalog_thread.wait()
+        self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        # a capture being saved is written in full
+        self.capture_executor.shutdown(wait=True)
+        self.set_watchdog(False)
         super().close()
 
 
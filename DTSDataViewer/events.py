@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class Event:
+    """
+    An impact found in a recording. Indices are relative to all data.
+    segment_start and segment_stop bound the part of the recording that belongs to this impact,
+    half way to the neighbouring impacts.
+    """
+
+    def __init__(self, peak_index, rise_start_index, rise_end_index, peak_value):
+        self.peak_index = int(peak_index)
+        self.rise_start_index = int(rise_start_index)
+        self.rise_end_index = int(rise_end_index)
+        self.peak_value = float(peak_value)
+        self.segment_start = 0
+        self.segment_stop = 0
+
+
+def get_robust_baseline(data):
+    """
+    Baseline level and spread of a series that is mostly baseline: median and scaled median absolute deviation.
+    A quantized quiet series can have no median absolute deviation, the mean absolute deviation is used then.
+    """
+    median = float(np.median(data))
+    deviation = np.abs(data - median)
+    sigma = 1.4826 * float(np.median(deviation))
+    if sigma == 0:
+        sigma = float(deviation.mean())
+
+    return median, sigma
+
+
+def detect_events(data, sample_rate_hz, threshold=None, rise_threshold=None, refractory_ms=125.0, baseline=None):
+    """
+    Find every impact in a series in one pass, of either sign.
+    Samples further than 'threshold' from the baseline level make up an impact; impacts closer than
+    'refractory_ms' are merged. Each impact rises from and returns to within 'rise_threshold' of the baseline.
+    By default 'threshold' is 10 sigma and 'rise_threshold' 3 sigma, so small impacts are found next to large ones.
+    'baseline' is (level, sigma) of the baseline, if known; by default a robust estimate over the whole series.
+    Returns list of Event in recording order.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.size == 0:
+        return []
+
+    level, sigma = get_robust_baseline(data) if baseline is None else baseline
+    if threshold is None:
+        threshold = 10 * sigma
+    if rise_threshold is None:
+        rise_threshold = 3 * sigma
+    # distance from baseline, so impacts of either sign are found the same way
+    deviation = np.abs(data - level)
+
+    # runs of samples beyond threshold
+    above = np.zeros(data.size + 2, dtype=np.int8)
+    above[1:-1] = deviation > threshold
+    edges = np.diff(above)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    # merge runs within the refractory period of the run before
+    refractory_samples = int(refractory_ms * sample_rate_hz / 1000.0)
+    keep = starts[1:] - ends[:-1] >= refractory_samples
+    starts = starts[np.concatenate(([True], keep))]
+    ends = ends[np.concatenate((keep, [True]))]
+
+    # peak of each run. samples between runs are within threshold so reduceat over whole
+    # stretches from one run start to the next finds the peak of the run
+    peak_values = np.maximum.reduceat(deviation, starts)
+    run_marks = np.zeros(data.size + 1, dtype=np.int64)
+    run_marks[starts] += 1
+    run_ids = np.cumsum(run_marks[:-1]) - 1
+    run_marks[ends] -= 1
+    in_run = np.cumsum(run_marks[:-1]) > 0
+    candidates = np.flatnonzero(in_run & (deviation == peak_values[np.maximum(run_ids, 0)]))
+    _, first_candidate = np.unique(run_ids[candidates], return_index=True)
+    peak_indices = candidates[first_candidate]
+
+    # rise start is the first sample after the last baseline sample before the peak,
+    # rise end the first baseline sample after the peak
+    below = np.flatnonzero(deviation <= rise_threshold)
+    before = np.searchsorted(below, peak_indices) - 1
+    rise_start_indices = np.where(before >= 0, below[np.maximum(before, 0)] + 1, 0)
+    after = np.searchsorted(below, peak_indices)
+    rise_end_indices = np.where(after < below.size, below[np.minimum(after, below.size - 1)], data.size - 1)
+
+    events = [Event(peak_index, rise_start_index, rise_end_index, data[peak_index])
+              for peak_index, rise_start_index, rise_end_index
+              in zip(peak_indices, rise_start_indices, rise_end_indices)]
+
+    # split the recording half way between impacts
+    for event_i, event in enumerate(events):
+        event.segment_start = 0 if event_i == 0 else \
+            (events[event_i - 1].rise_end_index + event.rise_start_index) // 2
+        event.segment_stop = data.size if event_i == len(events) - 1 else \
+            (event.rise_end_index + events[event_i + 1].rise_start_index) // 2
+
+    return events
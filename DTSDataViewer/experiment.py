@@ -1,7 +1,76 @@
 import os
+import copy
 import datetime
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dts_file_reader import slice
 import numpy as np
+from DTSDataViewer import alignment, derived, events, filters, memory, quality
+
+logger = logging.getLogger(__name__)
+
+
+# rows written between checks for a cancelled export
+export_block_rows = 4096
+
+
+class ExportCancelled(Exception):
+    """
+    Raised when an export is cancelled
+    """
+
+
+# summary fields in export order
+summary_fields = [
+    'peak_index',
+    'rise_start_index',
+    'rise_end_index',
+    'peak_vel',
+    'time_to_peak',
+    'decel_time',
+    'fwhm',
+    'delta_t',
+    'rise_to_peak_slope',
+    'is_peak_user_selected',
+]
+
+# display and export window, 1/8 of a second with a quarter of it before the peak
+default_window_ms = 125.0
+default_pre_peak_fraction = 0.25
+# windows filtered on their own that are kept, the display and two export windows and one more
+max_filtered_windows = 4
+
+# longest pre-impact baseline, and the fewest samples that make one
+default_baseline_ms = 250.0
+min_baseline_samples = 16
+# half width of the baseline band in baseline standard deviations, and the reference threshold of a sweep.
+# The reader's summaries find their rise against a baseline of their own, which this need not reproduce
+rise_threshold_sd = 3.0
+
+# summarized signals by the suffix used for them in the export summary
+summary_signals = {
+    'hc': 'head_rot_cor',
+    'hr': 'head_resultant',
+    'mc': 'mach_rot_pri',
+}
+
+
+def get_baseline_stats(data):
+    """
+    (mean, standard deviation) of a baseline segment as floats
+    """
+    data = np.asarray(data, dtype=np.float64)
+
+    return float(data.mean()), float(data.std())
+
+
+def get_subject_id(file_name):
+    """
+    subject id from a data file name, the part before the first underscore
+    """
+    return file_name.split('.')[0].split('_')[0]
 
 
 class Experiment:
@@ -14,6 +83,16 @@ class Experiment:
 
         # initiate container for data
         self.channel_data = None
+        # all channels as (channels, samples) arrays in channel_map order
+        self.scaled_data = None
+        self.filtered_data = None
+        # first sample held in filtered_data, which may cover only part of the data after a fast open
+        self.filtered_data_start = 0
+        # (start, stop) -> (channels, samples) window filtered on its own, see get_filtered_data()
+        self.window_filtered_data = {}
+        self.filter_lock = threading.RLock()
+        # threads used for filtering, None for one per processor
+        self.workers = None
 
         # experiment provides channel map specific to our experiment
         # DTS slice reader is dependent on what user entered in DTS channel setup. That should be generic.
@@ -33,8 +112,45 @@ class Experiment:
         self.machine_summary = slice.Channel.Summary()
         self.head_summary = slice.Channel.Summary()
         self.head_resultant = None
+        # signal -> summary of the whole recording without a user selected peak, see get_automatic_summary()
+        self.automatic_summaries = {}
+        # store series as float32 instead of float64
+        self.compact = False
         self.data_window_start = 0
         self.data_window_end = 0
+        # display and export window length and the part of it before the peak
+        self.window_ms = default_window_ms
+        self.pre_peak_fraction = default_pre_peak_fraction
+        # samples in the display window
+        self.window_samples = 0
+
+        # quiet segment before the first impact, samples baseline_start to baseline_stop, and
+        # signal -> (mean, standard deviation) of the filtered series over it, see compute_baseline_stats()
+        self.baseline_start = 0
+        self.baseline_stop = 0
+        self.baseline_stats = {}
+
+        # impacts found by detect_events() and the index of the one windowed, None for the whole recording
+        self.events = []
+        self.active_event = None
+
+        # derivatives and integrals of channels or the head resultant by name, '<signal>_<operation>',
+        # computed from the filtered series on first request, their summaries, and those shown and exported
+        self.derived = {}
+        self.derived_summaries = {}
+        self.derived_signals = []
+
+        # lag of the head resultant behind machine primary in the data window, computed on first request
+        self.alignment = None
+        self.alignment_window = None
+
+        # data quality screen, computed on first request
+        self.quality_report = None
+
+        # user selections kept in the session sidecar of the data file
+        self.data_file_path = None
+        self.user_selected_peaks = {}
+        self.export_window_anchor = None
 
         # From where did we last open a DTS file?
         self.lastDataPath = ''
@@ -51,55 +167,459 @@ class Experiment:
         """
         subject id for experiment
         """
-        return self.file_name.split('.')[0].split('_')[0]
+        return get_subject_id(self.file_name)
 
     @classmethod
-    def load(cls, data_file_path):
+    def load(cls, data_file_path, compact: bool = False, fast_open: bool = False, workers: int = None,
+             window_ms: float = default_window_ms, pre_peak_fraction: float = default_pre_peak_fraction):
+        """
+        Load experiment from a DTS data file.
+        With 'compact' the scaled data, filtered data and head resultant are stored as float32,
+        roughly halving memory. Filtering, the resultant and all summaries are still computed in
+        float64 before the series are stored, so summary values are unchanged, also when summarized
+        again later. Summaries around a user selected peak are computed in float64 from the stored
+        series. Stored and exported series values differ from float64 by at most 2**-24 of their
+        magnitude (6e-5 at 1000 rad/s).
+        With 'fast_open' the peak is found first and only the display and export windows plus
+        filter padding are filtered. Filtered data outside of that is computed when first requested.
+        Channels are filtered and the summaries computed on a thread pool of 'workers' threads;
+        with 1 they are computed one after another. Results are the same either way.
+        'window_ms' and 'pre_peak_fraction' set the display and export window, see set_window().
+        A .npz capture saved by data collection is loaded with acquisition.Capture.load().
+        """
+        if str(data_file_path).lower().endswith('.npz'):
+            # acquisition imports this module
+            from DTSDataViewer.acquisition import Capture
+            return Capture.load(data_file_path).to_experiment(data_file_path, compact=compact, fast_open=fast_open,
+                                                              workers=workers, window_ms=window_ms,
+                                                              pre_peak_fraction=pre_peak_fraction)
 
+        return cls.from_channel_data(slice.Reader().parse(str(data_file_path)), data_file_path, compact=compact,
+                                     fast_open=fast_open, workers=workers, window_ms=window_ms,
+                                     pre_peak_fraction=pre_peak_fraction)
+
+    @classmethod
+    def from_channel_data(cls, channel_data, data_file_path, compact: bool = False, fast_open: bool = False,
+                          workers: int = None, window_ms: float = default_window_ms,
+                          pre_peak_fraction: float = default_pre_peak_fraction):
+        """
+        Experiment from reader channels already in memory, parsed from 'data_file_path' or captured
+        live and saved there. Options as for load(). The session sidecar of 'data_file_path' applies.
+        """
         experiment = Experiment()
+        experiment.compact = compact
         experiment.lastDataPath = os.path.sep.join(str(data_file_path).split('/')[0:-1])
         experiment.file_name = str(data_file_path).split('/')[-1]
-        experiment.channel_data = slice.Reader().parse(str(data_file_path))
+        experiment.data_file_path = str(data_file_path)
+        experiment.channel_data = channel_data
+
+        # stack scaled channels so that filtering runs once over all of them.
+        # reader channels keep views into the stack so there is only one copy of the data
+        experiment.scaled_data = np.vstack([channel.scaled_data for channel in experiment.channel_data])
+        for channel_i, channel in enumerate(experiment.channel_data):
+            channel.scaled_data = experiment.scaled_data[channel_i]
+        experiment.workers = workers
+        if not fast_open:
+            experiment.filter_data()
 
         # need summary data of a primary channel to determine location of peak
         # to window the data to 1/8 of a second
-        # the head sensor will not be reliable as its orientation will change
-        # machine sensor orientation is fixed so use that channel to get summary data
-        experiment.machine_summary = experiment.get_channel('mach_rot_pri').get_channel_summary(method='machine')
-        experiment.head_summary = experiment.get_channel('head_rot_cor').get_channel_summary(method='head')
-
-        # get head resultant, use entire vector so that this resultant can be passed to get_summary()
-        # which works only on full timeseries.
-        # down below where we plot the data we will window the resultant to display window
-        experiment.head_resultant = slice.get_resultant(experiment.channel_data, (0, 1, 2))
-        experiment.head_resultant_summary = slice.get_data_summary(method='head',
-                                                                   sample_rate_hz=experiment.get_channel(
-                                                                       'head_rot_cor').meta_data.sample_rate_hz,
-                                                                   data=experiment.head_resultant)
+        # peaks the user selected in an earlier session replace automatic peak detection
+        session = experiment.read_session()
+        user_selected_peaks = session.get('user_selected_peaks', {})
+
+        # the three summaries are independent of each other
+        summarized_signals = ['mach_rot_pri', 'head_rot_cor', 'head_resultant']
+        if workers == 1:
+            for signal in summarized_signals:
+                experiment.summarize(signal, user_selected_peaks.get(signal))
+        else:
+            with ThreadPoolExecutor(max_workers=len(summarized_signals)) as executor:
+                # result() raises any error of a summary
+                for future in [executor.submit(experiment.summarize, signal, user_selected_peaks.get(signal))
+                               for signal in summarized_signals]:
+                    future.result()
 
         # data display/export window
-        experiment.data_window_start = 0
-        experiment.data_window_end = 0
-        experiment.window_samples = int(experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz / 8)
-        pre_peak_samples = int(experiment.window_samples / 4)
-        post_peak_sample = int(pre_peak_samples * 3)
-        # print(f"pre:{pre_peak_samples}, post:{post_peak_sample}")
-
-        # window large data vector around peak velocity value
+        experiment.set_window(window_ms, pre_peak_fraction)
+        # quiet segment before the first impact, its statistics are computed once it is filtered
+        experiment.set_baseline_window()
+
+        # window and export anchor from an earlier session, if it was saved with the same window length
+        if 'data_window_start' in session and 'data_window_end' in session and \
+                int(session['data_window_end']) - int(session['data_window_start']) == experiment.window_samples:
+            experiment.data_window_start = int(session['data_window_start'])
+            experiment.data_window_end = int(session['data_window_end'])
+        experiment.export_window_anchor = session.get('export_window_anchor')
+
+        # second pass of a fast open filters only what is displayed or exported
+        if fast_open and experiment.filtered_data is None:
+            window_bounds = [(experiment.data_window_start, experiment.data_window_end),
+                             experiment.get_export_window('peak'),
+                             experiment.get_export_window('rise_start')]
+            if experiment.baseline_stop > experiment.baseline_start:
+                window_bounds.append((experiment.baseline_start, experiment.baseline_stop))
+            experiment.filter_data(start=min(start for start, end in window_bounds),
+                                   stop=max(end for start, end in window_bounds))
+        experiment.compute_baseline_stats()
+
+        if experiment.compact:
+            experiment.scaled_data = experiment.scaled_data.astype(np.float32)
+            for channel_i, channel in enumerate(experiment.channel_data):
+                channel.scaled_data = experiment.scaled_data[channel_i]
+            experiment.head_resultant = np.asarray(experiment.head_resultant, dtype=np.float32)
+
+        return experiment
+
+    def set_window(self, window_ms: float = None, pre_peak_fraction: float = None):
+        """
+        Set display and export window length and the fraction of it before the peak, and window
+        the loaded data again. Data is sliced from what is loaded, nothing is read or filtered again.
+        """
+        window_ms = self.window_ms if window_ms is None else float(window_ms)
+        pre_peak_fraction = self.pre_peak_fraction if pre_peak_fraction is None else float(pre_peak_fraction)
+        if window_ms <= 0:
+            raise ValueError("window_ms must be positive")
+        if not 0 <= pre_peak_fraction < 1:
+            raise ValueError("pre_peak_fraction must be at least 0 and less than 1")
+
+        self.window_ms = window_ms
+        self.pre_peak_fraction = pre_peak_fraction
+        self.window_samples = int(self.get_channel('head_rot_cor').meta_data.sample_rate_hz * window_ms / 1000.0)
+        self.update_data_window()
+
+    def update_data_window(self):
+        """
+        Window large data vector around peak velocity value
+        """
+        self.data_window_start = 0
+        self.data_window_end = 0
+        pre_peak_samples = int(self.window_samples * self.pre_peak_fraction)
+        post_peak_sample = self.window_samples - pre_peak_samples
+
         # first use the machine sensor, then try the head sensor
         # otherwise, a meaningless window of data at the start of the vector
-        if experiment.machine_summary.peak_index == 0:
-            if experiment.head_summary.peak_index == 0:
-                experiment.data_window_start = 0
-                experiment.data_window_end = experiment.window_samples
+        if self.machine_summary.peak_index == 0:
+            if self.head_summary.peak_index == 0:
+                self.data_window_start = 0
+                self.data_window_end = self.window_samples
             else:
-                experiment.data_window_start = experiment.head_summary.peak_index - pre_peak_samples - 1
-                experiment.data_window_end = experiment.head_summary.peak_index + post_peak_sample - 1
+                self.data_window_start = self.head_summary.peak_index - pre_peak_samples - 1
+                self.data_window_end = self.head_summary.peak_index + post_peak_sample - 1
         else:
-            experiment.data_window_start = experiment.machine_summary.peak_index - pre_peak_samples - 1
-            experiment.data_window_end = experiment.machine_summary.peak_index + post_peak_sample - 1
+            self.data_window_start = self.machine_summary.peak_index - pre_peak_samples - 1
+            self.data_window_end = self.machine_summary.peak_index + post_peak_sample - 1
 
-        return experiment
+    def get_impact_spans(self):
+        """
+        Sample spans (start, stop) of the impacts of the recording in order, each from one filter padding
+        before its rise to one after its rise end. Impacts are found on unfiltered machine primary, or head
+        coronal, see events.detect_events(); the data window is taken as an impact as well.
+        """
+        sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+        padding = filters.get_padding_samples(sample_rate_hz)
+        sample_count = self.scaled_data.shape[1]
+
+        spans = [(max(self.data_window_start, 0), self.data_window_end)]
+        for channel_map_key in ['mach_rot_pri', 'head_rot_cor']:
+            detected = events.detect_events(self.scaled_data[self.channel_map[channel_map_key]], sample_rate_hz,
+                                            refractory_ms=self.window_samples / sample_rate_hz * 1000.0)
+            if detected:
+                spans.extend((event.rise_start_index, event.rise_end_index + 1) for event in detected)
+                break
+
+        return sorted((max(start - padding, 0), min(stop + padding, sample_count)) for start, stop in spans)
+
+    def set_baseline_window(self, baseline_ms: float = default_baseline_ms):
+        """
+        Place the pre-impact baseline: up to 'baseline_ms' of samples before the first impact, see
+        get_impact_spans(), so that neither earlier impacts of a multi-impact recording nor the filtered
+        rise fall into it. Leaves an empty segment if there is no room for one.
+        """
+        sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+        self.baseline_stop = self.get_impact_spans()[0][0]
+        self.baseline_start = max(self.baseline_stop - int(sample_rate_hz * baseline_ms / 1000.0), 0)
+        if self.baseline_stop - self.baseline_start < min_baseline_samples:
+            self.baseline_start = self.baseline_stop = 0
+
+    def compute_baseline_stats(self):
+        """
+        Mean and standard deviation of the baseline of every channel and the head resultant, from the
+        series that are plotted and swept: filtered channels. One pass over the baseline segment of the
+        (channels, samples) filtered array. A recording without a quiet segment before its first impact
+        has robust statistics of the whole series instead, median and scaled median absolute deviation,
+        which the impacts do not inflate. The reader's summaries do not use them, see rise_threshold_sd.
+        """
+        if self.baseline_stop > self.baseline_start:
+            baseline = np.asarray(self.get_filtered_slice(start=self.baseline_start, stop=self.baseline_stop),
+                                  dtype=np.float64)
+            means = baseline.mean(axis=1)
+            stds = baseline.std(axis=1)
+            head_resultant_stats = get_baseline_stats(self.head_resultant[self.baseline_start:self.baseline_stop])
+        else:
+            filtered_data = np.asarray(self.get_filtered_slice(), dtype=np.float64)
+            means = np.median(filtered_data, axis=1)
+            stds = 1.4826 * np.median(np.abs(filtered_data - means[:, np.newaxis]), axis=1)
+            head_resultant_stats = events.get_robust_baseline(np.asarray(self.head_resultant, dtype=np.float64))
+
+        self.baseline_stats = {
+            channel_map_key: (float(means[channel_i]), float(stds[channel_i]))
+            for channel_map_key, channel_i in self.channel_map.items()
+        }
+        self.baseline_stats['head_resultant'] = head_resultant_stats
+
+    def get_baseline_stats(self, signal):
+        """
+        Baseline (mean, standard deviation) of a channel, 'head_resultant' or a derived signal.
+        Those of derived signals are computed over the same segment on first request.
+        """
+        if signal not in self.baseline_stats:
+            source = derived.get_source(signal)
+            if source is None or source[1] == 'angle':
+                # an integral of the baseline is not stationary, it has no baseline statistics
+                raise ValueError(f"Invalid signal: '{signal}'")
+            series = np.asarray(self.get_derived(signal), dtype=np.float64)
+            if self.baseline_stop > self.baseline_start:
+                self.baseline_stats[signal] = get_baseline_stats(series[self.baseline_start:self.baseline_stop])
+            else:
+                self.baseline_stats[signal] = events.get_robust_baseline(series)
+
+        return self.baseline_stats[signal]
+
+    def get_rise_threshold(self, signal, threshold_sd: float = rise_threshold_sd):
+        """
+        Level 'threshold_sd' baseline standard deviations from the baseline mean of a summarized signal,
+        toward its summary peak. Not the level of the reader's rise start, see rise_threshold_sd.
+        """
+        baseline_mean, baseline_std = self.get_baseline_stats(signal)
+        peak_value = self.get_series(signal)[self.get_summary(signal).peak_index]
+        polarity = 1.0 if peak_value >= baseline_mean else -1.0
+
+        return baseline_mean + polarity * threshold_sd * baseline_std
+
+    def detect_events(self, threshold=None, refractory_ms=None):
+        """
+        Find every impact in the machine primary series, or in head coronal if the machine sensor has none.
+        Impacts closer than 'refractory_ms', by default one data window, are taken as one.
+        Unfiltered data is searched, so a fast open does not need the whole recording filtered;
+        selecting an event summarizes it on filtered data. 'threshold' is the distance from the
+        baseline level of the searched series, in its engineering units, see events.detect_events().
+        """
+        sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+        if refractory_ms is None:
+            refractory_ms = self.window_samples / sample_rate_hz * 1000.0
+
+        self.events = []
+        for channel_map_key in ['mach_rot_pri', 'head_rot_cor']:
+            self.events = events.detect_events(self.scaled_data[self.channel_map[channel_map_key]], sample_rate_hz,
+                                               threshold=threshold, refractory_ms=refractory_ms)
+            if self.events:
+                break
+
+        self.active_event = None
+
+        return self.events
+
+    def select_event(self, event_i=None):
+        """
+        Summarize and window one detected event, so it is plotted and exported like a single impact
+        recording. With None the whole recording is summarized again.
+        """
+        if event_i is None:
+            self.active_event = None
+            user_selected_peaks = dict(self.user_selected_peaks)
+            for signal in list(summary_signals.values()) + self.derived_signals:
+                self.summarize(signal, user_selected_peaks.get(signal))
+            self.update_data_window()
+            return
+
+        event = self.events[event_i]
+
+        # summaries of the part of the recording that belongs to the event
+        for signal, method in [('mach_rot_pri', 'machine'), ('head_rot_cor', 'head'), ('head_resultant', 'head')] + \
+                [(signal, 'head') for signal in self.derived_signals]:
+            summary = self.get_event_summary(signal, method, event)
+
+            if signal == 'mach_rot_pri':
+                self.machine_summary = summary
+                self.get_channel(signal).summary_data = summary
+            elif signal == 'head_rot_cor':
+                self.head_summary = summary
+                self.get_channel(signal).summary_data = summary
+            elif signal == 'head_resultant':
+                self.head_resultant_summary = summary
+            else:
+                self.derived_summaries[signal] = summary
+
+        self.active_event = event_i
+        self.update_data_window()
+
+    def get_event_summary(self, signal, method, event):
+        """
+        Summary of a signal over the segment of an event, its indices shifted to index all data
+        """
+        summary = slice.get_data_summary(
+            method=method,
+            sample_rate_hz=self.get_channel('head_rot_cor').meta_data.sample_rate_hz,
+            data=np.asarray(self.get_series(signal, start=event.segment_start, stop=event.segment_stop),
+                            dtype=np.float64)
+        )
+        summary.peak_index += event.segment_start
+        summary.rise_start_index += event.segment_start
+        summary.rise_end_index += event.segment_start
+
+        return summary
+
+    def get_snapshot(self):
+        """
+        Copy to export in the background while the GUI goes on changing the window, peaks, event or
+        derived signals of this experiment. Summaries and the state export reads are copied; data
+        arrays are shared, they are replaced and not changed in place.
+        """
+        snapshot = copy.copy(self)
+        snapshot.channel_data = [copy.copy(channel) for channel in self.channel_data]
+        for channel in snapshot.channel_data:
+            channel.summary_data = copy.deepcopy(channel.summary_data)
+        for name in ['machine_summary', 'head_summary', 'head_resultant_summary', 'derived_summaries', 'events',
+                     'derived_signals', 'user_selected_peaks', 'baseline_stats']:
+            setattr(snapshot, name, copy.deepcopy(getattr(self, name)))
+        snapshot.derived = dict(self.derived)
+        snapshot.window_filtered_data = dict(self.window_filtered_data)
+
+        return snapshot
+
+    def get_export_label(self):
+        """
+        Name for exported files, with the event number when one event is selected
+        """
+        if self.active_event is None:
+            return self.get_label()
+
+        return f"{self.get_label()}_event{self.active_event + 1}"
+
+    def summarize(self, signal, user_selected_peak=None):
+        """
+        Compute summary of a summarized signal, around a user selected peak if one is given.
+        Without one the automatic summary is that computed at load, see get_automatic_summary().
+        """
+        if signal == 'mach_rot_pri':
+            # the head sensor will not be reliable as its orientation will change
+            # machine sensor orientation is fixed so use that channel to get summary data
+            if user_selected_peak is None:
+                self.machine_summary = self.get_automatic_summary('mach_rot_pri')
+                self.get_channel('mach_rot_pri').summary_data = self.machine_summary
+            else:
+                self.machine_summary = slice.Channel.Summary()
+                self.set_user_selected_peak('mach_rot_pri', user_selected_peak)
+
+        elif signal == 'head_rot_cor':
+            if user_selected_peak is None:
+                self.head_summary = self.get_automatic_summary('head_rot_cor')
+                self.get_channel('head_rot_cor').summary_data = self.head_summary
+            else:
+                self.get_channel('head_rot_cor').summary_data = slice.Channel.Summary()
+                self.head_summary = self.set_user_selected_peak('head_rot_cor', user_selected_peak)
+
+        elif signal == 'head_resultant':
+            # get head resultant, use entire vector so that this resultant can be passed to get_summary()
+            # which works only on full timeseries.
+            # where we plot the data we will window the resultant to display window.
+            # it is computed once, from the float64 data at load
+            if self.head_resultant is None:
+                self.head_resultant = slice.get_resultant(self.channel_data, (0, 1, 2))
+            if user_selected_peak is None:
+                self.head_resultant_summary = self.get_automatic_summary('head_resultant')
+            else:
+                self.head_resultant_summary = slice.Channel.Summary()
+                self.set_user_selected_peak('head_resultant', user_selected_peak)
+
+        elif derived.get_source(signal) is not None:
+            if user_selected_peak is None:
+                self.derived_summaries[signal] = self.get_automatic_summary(signal)
+            else:
+                self.derived_summaries[signal] = slice.Channel.Summary()
+                self.set_user_selected_peak(signal, user_selected_peak)
+
+        else:
+            raise ValueError(f"Invalid summary signal: '{signal}'")
+
+    def get_automatic_summary(self, signal):
+        """
+        Summary of a summarized signal over the whole recording without a user selected peak.
+        Computed once, at load for the channels and the head resultant while their data is still float64,
+        and a copy of it returned after that, so summarizing again gives the same values in compact mode.
+        """
+        if signal not in self.automatic_summaries:
+            sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+            if signal == 'mach_rot_pri':
+                summary = self.get_channel('mach_rot_pri').get_channel_summary(method='machine')
+            elif signal == 'head_rot_cor':
+                summary = self.get_channel('head_rot_cor').get_channel_summary(method='head')
+            elif signal == 'head_resultant':
+                summary = slice.get_data_summary(method='head', sample_rate_hz=sample_rate_hz,
+                                                 data=np.asarray(self.head_resultant, dtype=np.float64))
+            else:
+                summary = slice.get_data_summary(method='head', sample_rate_hz=sample_rate_hz,
+                                                 data=np.asarray(self.get_derived(signal), dtype=np.float64))
+            self.automatic_summaries[signal] = summary
+
+        return copy.deepcopy(self.automatic_summaries[signal])
+
+    def get_derived(self, signal):
+        """
+        Derived series of a channel or the head resultant over all data, '<signal>_accel', '<signal>_jerk'
+        or '<signal>_angle' of a channel, see derived.derived_operations. Computed in float64 from the
+        filtered series and cached; integrals start from the baseline mean so the sensor offset does not
+        drift. Those of the head resultant are the resultant of the derived head components.
+        """
+        source = derived.get_source(signal)
+        if source is None or (source[0] not in self.channel_map and source[0] != 'head_resultant'):
+            raise ValueError(f"Invalid derived signal: '{signal}'")
+
+        with self.filter_lock:
+            if signal not in self.derived:
+                source_signal, operation = source
+                sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+                if source_signal == 'head_resultant':
+                    components = ['head_rot_cor', 'head_rot_sag', 'head_rot_axi']
+                    series = derived.get_derived_resultant(
+                        [self.get_series(channel_map_key) for channel_map_key in components],
+                        sample_rate_hz,
+                        operation,
+                        offsets=[self.get_baseline_stats(channel_map_key)[0] if operation == 'angle' else 0.0
+                                 for channel_map_key in components]
+                    )
+                else:
+                    series = derived.get_derived(
+                        self.get_series(source_signal),
+                        sample_rate_hz,
+                        operation,
+                        offset=self.get_baseline_stats(source_signal)[0] if operation == 'angle' else 0.0
+                    )
+                self.derived[signal] = series.astype(np.float32) if self.compact else series
+
+            return self.derived[signal]
+
+    def get_derived_eu(self, signal):
+        """
+        Engineering units of a derived signal
+        """
+        source_signal, operation = derived.get_source(signal)
+        eu_channel = 'head_rot_cor' if source_signal == 'head_resultant' else source_signal
+
+        return derived.get_derived_eu(self.get_channel(eu_channel).meta_data.eu, operation)
+
+    def add_derived(self, signal):
+        """
+        Compute and summarize a derived signal and add it to those plotted and exported.
+        With an event selected, only the segment of that event is summarized, like the other signals.
+        """
+        if signal not in self.derived_signals:
+            if self.active_event is None:
+                self.summarize(signal, self.user_selected_peaks.get(signal))
+            else:
+                self.derived_summaries[signal] = self.get_event_summary(signal, 'head', self.events[self.active_event])
+            self.derived_signals.append(signal)
 
     def get_channel(self, channel_map_key):
         """
@@ -110,11 +630,317 @@ class Experiment:
 
         return self.channel_data[self.channel_map[channel_map_key]]
 
-    def export(self, export_path, window_anchor: str = 'rise_start'):
+    def filter_data(self, start=None, stop=None):
         """
-        Export windowed data and summaries.
+        Filter all channels, or only samples from 'start' to 'stop' plus filter padding on either side.
+        Filtering is done in float64, the result is stored as float32 in compact mode.
+        """
+        sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+        sample_count = self.scaled_data.shape[1]
+
+        filtered_data_start = 0
+        filtered_data_stop = sample_count
+        if start is not None or stop is not None:
+            padding = filters.get_padding_samples(sample_rate_hz)
+            filtered_data_start = min(max((start or 0) - padding, 0), sample_count)
+            filtered_data_stop = max(min((sample_count if stop is None else stop) + padding, sample_count),
+                                     filtered_data_start)
+
+        filtered_data = filters.cfc_filter(self.scaled_data[:, filtered_data_start:filtered_data_stop], sample_rate_hz,
+                                           workers=self.workers)
+        if self.compact:
+            filtered_data = filtered_data.astype(np.float32)
+
+        with self.filter_lock:
+            self.filtered_data = filtered_data
+            self.filtered_data_start = filtered_data_start
+
+    def get_filtered_data(self, channel_map_key=None, start=None, stop=None):
+        """
+        Retrieve filtered data of a channel by key, optionally windowed.
+        Without a key all channels are returned as a (channels, samples) array.
+        A window is filtered on its own, all channels at once, the way the reader's
+        Channel.get_filtered_data(start, stop) filters it, so plotted and exported values are the
+        reader's. Its first and last samples differ from a slice of the whole recording filtered,
+        get_filtered_slice(), by the filter start up over about filters.get_padding_samples().
+        The last few windows are kept.
+        """
+        if channel_map_key is not None and channel_map_key not in self.channel_map.keys():
+            raise ValueError(f"Invalid channel map key: '{channel_map_key}'")
+        if start is None and stop is None:
+            return self.get_filtered_slice(channel_map_key)
+
+        window = range(self.scaled_data.shape[1])[start:stop]
+        with self.filter_lock:
+            if (window.start, window.stop) not in self.window_filtered_data:
+                filtered_data = filters.cfc_filter(self.scaled_data[:, window.start:window.stop],
+                                                   self.get_channel('head_rot_cor').meta_data.sample_rate_hz,
+                                                   workers=self.workers)
+                if self.compact:
+                    filtered_data = filtered_data.astype(np.float32)
+                if len(self.window_filtered_data) >= max_filtered_windows:
+                    del self.window_filtered_data[next(iter(self.window_filtered_data))]
+                self.window_filtered_data[(window.start, window.stop)] = filtered_data
+            filtered_data = self.window_filtered_data[(window.start, window.stop)]
+
+        if channel_map_key is None:
+            return filtered_data
+
+        return filtered_data[self.channel_map[channel_map_key]]
+
+    def get_filtered_slice(self, channel_map_key=None, start=None, stop=None):
+        """
+        Slice of the filter run over the whole recording, or over the windows of a fast open,
+        for statistics that must not see a filter start up. Arguments as for get_filtered_data().
+        Filtered data that was dropped by drop_derived(), or not filtered by a fast open, is computed here.
+        """
+        if channel_map_key is not None and channel_map_key not in self.channel_map.keys():
+            raise ValueError(f"Invalid channel map key: '{channel_map_key}'")
+
+        with self.filter_lock:
+            sample_count = self.scaled_data.shape[1]
+            start_index = 0 if start is None else start
+            stop_index = sample_count if stop is None else stop
+
+            # negative indices count from the end of all data, which only a complete filter covers
+            if self.filtered_data is None or (
+                    self.filtered_data.shape[1] != sample_count and not (
+                        0 <= self.filtered_data_start <= start_index and
+                        0 <= stop_index <= self.filtered_data_start + self.filtered_data.shape[1])):
+                self.filter_data()
+
+            filtered_data = self.filtered_data
+            if filtered_data.shape[1] != sample_count:
+                start = start_index - self.filtered_data_start
+                stop = stop_index - self.filtered_data_start
+
+        if channel_map_key is None:
+            return filtered_data[:, start:stop]
+
+        return filtered_data[self.channel_map[channel_map_key], start:stop]
+
+    def get_quality_report(self):
+        """
+        Data quality screen of all channels
+        """
+        if self.quality_report is None:
+            self.quality_report = quality.screen(self)
+
+        return self.quality_report
+
+    def get_memory_usage(self):
+        """
+        Bytes held by the arrays of the experiment by name, including arrays the reader keeps on
+        its channels. Memory shared between arrays is counted once.
+        """
+        arrays = {
+            'scaled_data': self.scaled_data,
+            'filtered_data': self.filtered_data,
+            'head_resultant': self.head_resultant,
+        }
+        for signal, series in self.derived.items():
+            arrays[f"derived.{signal}"] = series
+        for (start, stop), window_data in self.window_filtered_data.items():
+            arrays[f"window.{start}:{stop}"] = window_data
+        if self.channel_data is not None:
+            for channel_map_key, channel_i in self.channel_map.items():
+                for name, value in vars(self.channel_data[channel_i]).items():
+                    arrays[f"{channel_map_key}.{name}"] = value
+
+        return memory.get_array_bytes(arrays)
+
+    def get_memory_bytes(self):
+        """
+        Total bytes held by the arrays of the experiment
+        """
+        return sum(self.get_memory_usage().values())
+
+    def drop_derived(self):
+        """
+        Release arrays that can be recomputed on demand. Returns bytes released.
+        """
+        with self.filter_lock:
+            memory_usage = self.get_memory_usage()
+            released = memory_usage['filtered_data'] + \
+                sum(memory_usage[f"derived.{signal}"] for signal in self.derived) + \
+                sum(memory_usage[f"window.{start}:{stop}"] for start, stop in self.window_filtered_data)
+            self.filtered_data = None
+            self.derived = {}
+            self.window_filtered_data = {}
+
+        return released
+
+    def get_series(self, signal, start=None, stop=None):
+        """
+        Retrieve filtered data of a channel by key, the head resultant with 'head_resultant',
+        or a derived signal
+        """
+        if signal == 'head_resultant':
+            return self.head_resultant[start:stop]
+        if derived.get_source(signal) is not None:
+            return self.get_derived(signal)[start:stop]
+
+        return self.get_filtered_data(signal, start=start, stop=stop)
+
+    def get_summary(self, signal):
+        """
+        Retrieve summary object of a summarized signal: 'head_rot_cor', 'head_resultant' or 'mach_rot_pri'
+        """
+        if signal == 'head_rot_cor':
+            return self.get_channel('head_rot_cor').summary_data
+        elif signal == 'head_resultant':
+            return self.head_resultant_summary
+        elif signal == 'mach_rot_pri':
+            return self.machine_summary
+        elif signal in self.derived_summaries:
+            return self.derived_summaries[signal]
+
+        raise ValueError(f"Invalid summary signal: '{signal}'")
+
+    def set_user_selected_peak(self, signal, peak_index):
+        """
+        Update summary of a summarized signal for a user selected peak.
+        'peak_index' is relative to all data, not the data window.
+        """
+        summary = self.get_summary(signal)
+        # summaries are computed in float64 even if the experiment stores float32
+        slice.set_user_selected_peak(
+            summary,
+            np.asarray(self.get_series(signal), dtype=np.float64),
+            self.get_channel('head_rot_cor').meta_data.sample_rate_hz,
+            int(peak_index)
+        )
+        self.user_selected_peaks[signal] = int(peak_index)
+
+        if signal == 'head_resultant':
+            self.head_resultant_summary = summary
+        elif signal in self.derived_summaries:
+            self.derived_summaries[signal] = summary
+        elif signal == 'mach_rot_pri':
+            self.machine_summary = summary
+            self.get_channel(signal).summary_data = summary
+        else:
+            self.get_channel(signal).summary_data = summary
+
+        return summary
+
+    def get_session_path(self):
+        """
+        Session sidecar file stored next to the data file
+        """
+        return self.data_file_path + '.session.json'
+
+    def read_session(self):
+        """
+        Session sidecar contents, empty if there is no sidecar or it cannot be read
+        """
+        if self.data_file_path is None or not os.path.isfile(self.get_session_path()):
+            return {}
+
+        # a damaged sidecar only loses the session, the data file still opens
+        try:
+            with open(self.get_session_path(), 'r') as session_file:
+                session = json.load(session_file)
+        except (OSError, ValueError) as e:
+            logger.warning("ignored session %s: %s", self.get_session_path(), e)
+            return {}
+        if not isinstance(session, dict):
+            logger.warning("ignored session %s: not a JSON object", self.get_session_path())
+            return {}
+
+        return session
+
+    def save_session(self):
+        """
+        Write user selected peaks, data window and export anchor to the session sidecar
+        """
+        if self.data_file_path is None:
+            return
+
+        session = {
+            'file_name': self.file_name,
+            'user_selected_peaks': self.user_selected_peaks,
+            'data_window_start': int(self.data_window_start),
+            'data_window_end': int(self.data_window_end),
+            'export_window_anchor': self.export_window_anchor,
+        }
+        # the window of a selected event is not the window of the recording
+        if self.active_event is not None:
+            del session['data_window_start'], session['data_window_end']
+        # write a temporary file next to the sidecar, then replace it,
+        # so an interrupted or concurrent save does not lose the previous session
+        session_path = self.get_session_path()
+        temp_path = f"{session_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as session_file:
+                json.dump(session, session_file, indent=2)
+                session_file.flush()
+                os.fsync(session_file.fileno())
+            os.replace(temp_path, session_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def get_summary_values(self, signal):
+        """
+        Summary of a signal as a dict of plain values in summary_fields order
+        """
+        summary = self.get_summary(signal)
+        return {
+            'peak_index': summary.peak_index,
+            'rise_start_index': summary.rise_start_index,
+            'rise_end_index': summary.rise_end_index,
+            'peak_vel': summary.peak_vel.value,
+            'time_to_peak': summary.time_to_peak.value,
+            'decel_time': summary.decel_time.value,
+            'fwhm': summary.fwhm.value,
+            'delta_t': summary.delta_t.value,
+            'rise_to_peak_slope': summary.rise_to_peak_slope,
+            'is_peak_user_selected': bool(summary.is_peak_user_selected),
+        }
+
+    def get_alignment(self):
+        """
+        Lag in ms of the head rotation resultant behind machine primary over the data window,
+        positive when the head follows the machine, and the correlation at that lag, negative
+        when the head resultant moves against machine primary.
+        Lags up to a quarter of the window are considered. Cached per window.
+        """
+        window = (max(self.data_window_start, 0), self.data_window_end)
+        if self.alignment is None or self.alignment_window != window:
+            lag_samples, coefficient = alignment.get_lag(
+                self.get_series('mach_rot_pri', start=window[0], stop=window[1]),
+                self.get_series('head_resultant', start=window[0], stop=window[1]),
+                max_lag_samples=self.window_samples // 4
+            )
+            sample_rate_hz = self.get_channel('head_rot_cor').meta_data.sample_rate_hz
+            self.alignment = (lag_samples * 1000.0 / sample_rate_hz, coefficient)
+            self.alignment_window = window
+
+        return self.alignment
+
+    def get_export_summary(self):
+        """
+        All three summaries in the wide format of the export summary file, then the head to machine lag,
+        then the summaries of derived signals with the signal name as suffix
+        """
+        export_summary = {'id': self.get_id()}
+        for suffix, signal in summary_signals.items():
+            for field, value in self.get_summary_values(signal).items():
+                export_summary[f"{field}_{suffix}"] = value
+        export_summary['lag_ms_hr_mc'], export_summary['lag_correlation_hr_mc'] = self.get_alignment()
+        for signal in self.derived_signals:
+            for field, value in self.get_summary_values(signal).items():
+                export_summary[f"{field}_{signal}"] = value
+
+        return export_summary
+
+    def get_export_window(self, window_anchor: str = 'rise_start'):
+        """
+        Start and end sample of the export data window.
         'window_anchor' string can be 'peak' or 'rise_start' and determines how data window
-        is centered. By default, data window in centered on peak for viewing in dataviewer.
+        is centered.
         """
 
         if (window_anchor != 'peak') and (window_anchor != 'rise_start'):
@@ -125,8 +951,10 @@ class Experiment:
         export_window_end = self.data_window_end
 
         if window_anchor == 'rise_start':
-            pre_peak_samples = int((self.window_samples / 4) / 2)
-            post_peak_sample = int(((self.window_samples / 4) * 3) + (self.window_samples / 4) / 2)
+            # rise start is placed half way into the part of the window before the peak
+            pre_peak_samples = int((self.window_samples * self.pre_peak_fraction) / 2)
+            post_peak_sample = int((self.window_samples * (1 - self.pre_peak_fraction)) +
+                                   (self.window_samples * self.pre_peak_fraction) / 2)
 
             if self.machine_summary.rise_start_index == 0:
                 if self.head_summary.rise_start_index == 0:
@@ -139,94 +967,106 @@ class Experiment:
                 export_window_start = self.machine_summary.rise_start_index - pre_peak_samples - 1
                 export_window_end = self.machine_summary.rise_start_index + post_peak_sample - 1
 
-        # export raw scaled data
-        np.savetxt(
-            os.path.join(export_path, "_".join([self.get_label(), 'export', 'raw.csv'])),
-            np.array(list(map(lambda x: x.scaled_data[export_window_start:export_window_end],
-                          self.channel_data))).transpose(),
-            fmt='%.11f',
-            delimiter=',',
-            header=",".join(self.channel_map.keys())
-        )
+        return export_window_start, export_window_end
 
-        # export filtered data
-        np.savetxt(
-            os.path.join(export_path, "_".join([self.get_label(), 'export', 'filtered.csv'])),
-            np.array(list(map(lambda x: x.get_filtered_data(start=export_window_start, stop=export_window_end),
-                          self.channel_data))).transpose(),
-            fmt='%.11f',
-            delimiter=',',
-            header=",".join(self.channel_map.keys())
-        )
+    def export(self, export_path, window_anchor: str = 'rise_start', progress=None, cancel_event=None):
+        """
+        Export windowed data and summaries.
+        'window_anchor' string can be 'peak' or 'rise_start' and determines how data window
+        is centered. By default, data window in centered on peak for viewing in dataviewer.
+        The raw, filtered and summary files are written concurrently to temporary files that are
+        renamed into place only once all three are complete. A marker file, '<label>_export.complete',
+        listing the three is removed before the renames and written after them, so a set of files
+        without its marker may mix two exports. 'progress' is called with the fraction done.
+        Setting 'cancel_event' stops the export with ExportCancelled and leaves no partial files.
+        Returns paths of the files written, the marker last.
+        """
+        export_window_start, export_window_end = self.get_export_window(window_anchor)
+
+        raw_data = self.scaled_data[:, export_window_start:export_window_end].transpose()
+        filtered_data = self.get_filtered_data(start=export_window_start, stop=export_window_end).transpose()
+        # derived signals are columns of the filtered file after the channels
+        if self.derived_signals:
+            filtered_data = np.column_stack(
+                [filtered_data] + [self.get_derived(signal)[export_window_start:export_window_end]
+                                   for signal in self.derived_signals]
+            )
+        summary = self.get_export_summary()
+
+        # progress over rows of both data files plus the summary
+        rows_total = raw_data.shape[0] + filtered_data.shape[0] + 1
+        rows_done = [0]
+        progress_lock = threading.Lock()
+
+        def report(rows):
+            with progress_lock:
+                rows_done[0] += rows
+                if progress is not None:
+                    progress(rows_done[0] / rows_total)
+
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled("Export cancelled")
+
+        def write_data(export_file, data, columns):
+            # write in blocks of rows so that a cancel is noticed during large exports
+            for row_i in range(0, max(data.shape[0], 1), export_block_rows):
+                check_cancelled()
+                np.savetxt(
+                    export_file,
+                    data[row_i:row_i + export_block_rows],
+                    fmt='%.11f',
+                    delimiter=',',
+                    header=",".join(columns) if row_i == 0 else ''
+                )
+                report(data[row_i:row_i + export_block_rows].shape[0])
+
+        def write_summary(export_file):
+            check_cancelled()
+            export_file.write(",".join(summary.keys()) + "\n")
+            export_file.write(",".join(map(str, summary.values())) + "\n")
+            report(1)
 
-        # export three summaries
-        with open(os.path.join(export_path, "_".join([self.get_label(), 'export', 'summary.csv'])),
-                  "w") as summary_file:
-            summary_file.write("id,"
-                               "peak_index_hc,"
-                               "rise_start_index_hc,"
-                               "rise_end_index_hc,"
-                               "peak_vel_hc,"
-                               "time_to_peak_hc,"
-                               "decel_time_hc,"
-                               "fwhm_hc,"
-                               "delta_t_hc,"
-                               "rise_to_peak_slope_hc,"
-                               "is_peak_user_selected_hc,"
-                               "peak_index_hr,"
-                               "rise_start_index_hr,"
-                               "rise_end_index_hr,"
-                               "peak_vel_hr,"
-                               "time_to_peak_hr,"
-                               "decel_time_hr,"
-                               "fwhm_hr,"
-                               "delta_t_hr,"
-                               "rise_to_peak_slope_hr,"
-                               "is_peak_user_selected_hr,"
-                               "peak_index_mc,"
-                               "rise_start_index_mc,"
-                               "rise_end_index_mc,"
-                               "peak_vel_mc,"
-                               "time_to_peak_mc,"
-                               "decel_time_mc,"
-                               "fwhm_mc,"
-                               "delta_t_mc,"
-                               "rise_to_peak_slope_mc,"
-                               "is_peak_user_selected_mc"
-                               "\n")
-
-            summary_file.write(",".join([self.get_id(),
-                                         str(self.get_channel('head_rot_cor').summary_data.peak_index),
-                                         str(self.get_channel('head_rot_cor').summary_data.rise_start_index),
-                                         str(self.get_channel('head_rot_cor').summary_data.rise_end_index),
-                                         str(self.get_channel('head_rot_cor').summary_data.peak_vel.value),
-                                         str(self.get_channel('head_rot_cor').summary_data.time_to_peak.value),
-                                         str(self.get_channel('head_rot_cor').summary_data.decel_time.value),
-                                         str(self.get_channel('head_rot_cor').summary_data.fwhm.value),
-                                         str(self.get_channel('head_rot_cor').summary_data.delta_t.value),
-                                         str(self.get_channel('head_rot_cor').summary_data.rise_to_peak_slope),
-                                         str(bool(self.get_channel('head_rot_cor').summary_data.is_peak_user_selected)),
-                                         str(self.head_resultant_summary.peak_index),
-                                         str(self.head_resultant_summary.rise_start_index),
-                                         str(self.head_resultant_summary.rise_end_index),
-                                         str(self.head_resultant_summary.peak_vel.value),
-                                         str(self.head_resultant_summary.time_to_peak.value),
-                                         str(self.head_resultant_summary.decel_time.value),
-                                         str(self.head_resultant_summary.fwhm.value),
-                                         str(self.head_resultant_summary.delta_t.value),
-                                         str(self.head_resultant_summary.rise_to_peak_slope),
-                                         str(bool(self.head_resultant_summary.is_peak_user_selected)),
-                                         str(self.machine_summary.peak_index),
-                                         str(self.machine_summary.rise_start_index),
-                                         str(self.machine_summary.rise_end_index),
-                                         str(self.machine_summary.peak_vel.value),
-                                         str(self.machine_summary.time_to_peak.value),
-                                         str(self.machine_summary.decel_time.value),
-                                         str(self.machine_summary.fwhm.value),
-                                         str(self.machine_summary.delta_t.value),
-                                         str(self.machine_summary.rise_to_peak_slope),
-                                         str(bool(self.machine_summary.is_peak_user_selected))+'\n'
-                                         ])
-                               )
+        # export raw scaled data, filtered data and three summaries
+        raw_columns = list(self.channel_map.keys())
+        filtered_columns = raw_columns + self.derived_signals
+        writers = {
+            "_".join([self.get_export_label(), 'export', 'raw.csv']): lambda f: write_data(f, raw_data, raw_columns),
+            "_".join([self.get_export_label(), 'export', 'filtered.csv']):
+                lambda f: write_data(f, filtered_data, filtered_columns),
+            "_".join([self.get_export_label(), 'export', 'summary.csv']): write_summary,
+        }
+        temp_paths = {
+            file_name: os.path.join(export_path, '.' + file_name + '.tmp') for file_name in writers.keys()
+        }
+        marker_path = os.path.join(export_path, "_".join([self.get_export_label(), 'export.complete']))
+        marker_temp_path = os.path.join(export_path, '.' + os.path.basename(marker_path) + '.tmp')
+
+        def write(file_name):
+            with open(temp_paths[file_name], 'w') as export_file:
+                writers[file_name](export_file)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+                # result() raises the first error of any writer
+                for future in [executor.submit(write, file_name) for file_name in writers.keys()]:
+                    future.result()
+
+            check_cancelled()
+            # the marker of an earlier export goes first, so a crash between renames leaves none
+            if os.path.exists(marker_path):
+                os.remove(marker_path)
+            for file_name, temp_path in temp_paths.items():
+                os.replace(temp_path, os.path.join(export_path, file_name))
+            with open(marker_temp_path, 'w') as marker_file:
+                marker_file.write("\n".join(writers.keys()) + "\n")
+            os.replace(marker_temp_path, marker_path)
+
+        finally:
+            for temp_path in list(temp_paths.values()) + [marker_temp_path]:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
 
         self.lastExportPath = export_path
+
+        return [os.path.join(export_path, file_name) for file_name in writers.keys()] + [marker_path]
@@ -0,0 +1,123 @@
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# scipy is a dependency. Without it the filter falls back to a much slower sample loop
+# that is still vectorized across channels.
+try:
+    from scipy import signal
+except ImportError:
+    signal = None
+
+
+# SAE J211 channel frequency class used for display and export
+DEFAULT_CFC = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def get_cfc_coefficients(sample_rate_hz, cfc=DEFAULT_CFC):
+    """
+    SAE J211 CFC filter coefficients for a sample rate.
+    Returned as (b, a) in the form used by lfilter. Cached per sample rate and class.
+    """
+    sample_period = 1.0 / float(sample_rate_hz)
+    wd = 2.0 * np.pi * cfc * 2.0775
+    wa = np.sin(wd * sample_period / 2.0) / np.cos(wd * sample_period / 2.0)
+    denominator = 1.0 + np.sqrt(2.0) * wa + wa ** 2
+
+    a0 = wa ** 2 / denominator
+    b1 = -2.0 * (wa ** 2 - 1.0) / denominator
+    b2 = (-1.0 + np.sqrt(2.0) * wa - wa ** 2) / denominator
+
+    b = np.array([a0, 2.0 * a0, a0])
+    a = np.array([1.0, -b1, -b2])
+    # coefficients are shared between callers
+    b.setflags(write=False)
+    a.setflags(write=False)
+
+    return b, a
+
+
+def get_padding_samples(sample_rate_hz, cfc=DEFAULT_CFC):
+    """
+    Samples to filter on either side of a window so that the filter start up transient
+    has decayed inside the window. 20 periods of the filter class frequency.
+    """
+    return int(np.ceil(20 * float(sample_rate_hz) / cfc))
+
+
+def _filter_pass(data, b, a):
+    """
+    Single forward pass of the 2-pole filter along the last axis of a 2-D array.
+    The first two samples of each channel seed the recursion.
+    """
+    filtered = np.empty_like(data)
+    filtered[:, 0:2] = data[:, 0:2]
+
+    if signal is not None:
+        # initial filter state that reproduces the seeded first two samples
+        zi = np.empty((data.shape[0], 2))
+        zi[:, 0] = b[1] * data[:, 1] + b[2] * data[:, 0] - a[1] * filtered[:, 1] - a[2] * filtered[:, 0]
+        zi[:, 1] = b[2] * data[:, 1] - a[2] * filtered[:, 1]
+        filtered[:, 2:], _ = signal.lfilter(b, a, data[:, 2:], axis=-1, zi=zi)
+    else:
+        # loop over samples with all channels in one row
+        x = np.ascontiguousarray(data.transpose())
+        y = np.ascontiguousarray(filtered.transpose())
+        for i in range(2, x.shape[0]):
+            y[i] = b[0] * x[i] + b[1] * x[i - 1] + b[2] * x[i - 2] - a[1] * y[i - 1] - a[2] * y[i - 2]
+        filtered = y.transpose()
+
+    return filtered
+
+
+def cfc_filter(data, sample_rate_hz, cfc=DEFAULT_CFC, workers=1):
+    """
+    Phaseless CFC filter of a (channels, samples) array, or a single channel vector,
+    along the time axis. The data is filtered forward and then backward.
+    With scipy, channels are split across 'workers' threads (None for one per processor);
+    lfilter releases the GIL so they run in parallel. Each channel is filtered independently
+    so the result does not depend on 'workers'.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    is_vector = data.ndim == 1
+    data = np.atleast_2d(data)
+
+    if data.shape[-1] < 3:
+        filtered = data.copy()
+    else:
+        b, a = get_cfc_coefficients(sample_rate_hz, cfc)
+
+        def filter_channels(channels):
+            filtered_channels = _filter_pass(channels, b, a)
+            return _filter_pass(filtered_channels[:, ::-1], b, a)[:, ::-1]
+
+        workers = min(workers or os.cpu_count() or 1, data.shape[0])
+        if signal is None or workers <= 1:
+            filtered = np.ascontiguousarray(filter_channels(data))
+        else:
+            filtered = np.empty_like(data)
+            channel_groups = np.array_split(np.arange(data.shape[0]), workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for channels, filtered_channels in zip(channel_groups,
+                                                       executor.map(lambda c: filter_channels(data[c]), channel_groups)):
+                    filtered[channels] = filtered_channels
+
+    return filtered[0] if is_vector else filtered
+
+
+def compare_to_reader(channel_data, start=0, stop=None, cfc=DEFAULT_CFC):
+    """
+    Largest absolute difference between cfc_filter and the reader's own filter over the
+    samples start:stop of every channel. Both filter the same samples, as Experiment.get_filtered_data()
+    does for a window, so this includes the seeded start and the end of the backward pass.
+    """
+    differences = []
+    for channel in channel_data:
+        channel_stop = channel.scaled_data.size if stop is None else stop
+        filtered = cfc_filter(channel.scaled_data[start:channel_stop], channel.meta_data.sample_rate_hz, cfc)
+        reader_filtered = np.asarray(channel.get_filtered_data(start=start, stop=channel_stop), dtype=np.float64)
+        differences.append(float(np.max(np.abs(reader_filtered - filtered))))
+
+    return max(differences)
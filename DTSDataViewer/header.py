@@ -0,0 +1,110 @@
+import os
+import xml.etree.ElementTree as ElementTree
+
+# bytes of the file read at a time, the XML setup is followed by binary sample data
+header_block_bytes = 64 * 1024
+
+# attribute names, lower case, that hold header values in the .dts XML of different SLICEWare versions
+sample_rate_attributes = ['samplerate', 'sampleratehz', 'samplespersecond']
+timestamp_attributes = ['starttime', 'startdate', 'date', 'time', 'timestamp', 'created', 'testdate']
+
+
+class Header:
+    """
+    Metadata of a DTS data file read from its XML setup without decoding sample data.
+    The XML is read generically: attributes of the root element, of every module and of every channel.
+    """
+
+    def __init__(self, data_file_path):
+        self.data_file_path = str(data_file_path)
+        self.file_name = os.path.basename(self.data_file_path)
+        self.root_tag = ''
+        self.attributes = {}
+        self.modules = []
+        self.channels = []
+
+    def get_value(self, names, elements=None):
+        """
+        First value of any of the attribute names, matched without case, in the root element
+        and then the modules, or in 'elements' if given
+        """
+        for attributes in elements if elements is not None else [self.attributes] + self.modules:
+            for name, value in attributes.items():
+                if name.lower() in names:
+                    return value
+
+        return None
+
+    def get_sample_rate_hz(self):
+        value = self.get_value(sample_rate_attributes) or self.get_value(sample_rate_attributes, self.channels)
+        return float(value) if value is not None else None
+
+    def get_timestamp(self):
+        return self.get_value(timestamp_attributes)
+
+    def get_mismatches(self, channel_data):
+        """
+        Differences between the header values and the reader's channels parsed from the same file,
+        as messages. The attribute names are known only from the files seen so far, so this is how
+        a new SLICEWare version with other names is noticed. A value missing from the header is a mismatch too.
+        """
+        mismatches = []
+        expected = [
+            ('channels', len(self.channels), len(channel_data)),
+            ('sample_rate_hz', self.get_sample_rate_hz(), float(channel_data[0].meta_data.sample_rate_hz)),
+        ]
+        for name, header_value, reader_value in expected:
+            if header_value is None:
+                mismatches.append(f"{name}: not found in header, reader has {reader_value}")
+            elif header_value != reader_value:
+                mismatches.append(f"{name}: header has {header_value}, reader has {reader_value}")
+
+        return mismatches
+
+    def to_dict(self):
+        return {
+            'file': self.file_name,
+            'sample_rate_hz': self.get_sample_rate_hz(),
+            'timestamp': self.get_timestamp(),
+            'attributes': self.attributes,
+            'modules': self.modules,
+            'channels': self.channels,
+        }
+
+
+def read_header(data_file_path) -> Header:
+    """
+    Read the XML setup of a DTS data file. Elements whose tag contains 'Module' are modules,
+    those whose tag contains 'Chan' are channels (SLICEWare writes 'AnalogInputChanel').
+    Container elements, which hold elements of the same kind such as 'Channels', are skipped.
+    The file is read in blocks and reading stops at the end of the root element, so the sample data
+    after the setup is neither read nor parsed. Header.get_mismatches() checks the result against the reader.
+    """
+    header = Header(data_file_path)
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    depth = 0
+
+    with open(data_file_path, 'rb') as f:
+        while True:
+            block = f.read(header_block_bytes)
+            if not block:
+                raise ElementTree.ParseError(f"{header.file_name}: file ends inside the XML setup")
+            parser.feed(block)
+            # events up to the end of the root element come before any error on the binary data after it
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if not header.root_tag:
+                        header.root_tag = element.tag
+                        header.attributes = dict(element.attrib)
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth == 0:
+                    return header
+                if 'Chan' in element.tag:
+                    if not any('Chan' in child.tag for child in element):
+                        header.channels.append(dict(element.attrib))
+                elif 'Module' in element.tag:
+                    if not any('Module' in child.tag for child in element):
+                        header.modules.append(dict(element.attrib))
@@ -0,0 +1,130 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# bytes read at a time when hashing a data file
+hash_block_bytes = 1024 * 1024
+
+# fields a record is read back by, a line without them is ignored
+record_fields = ['path', 'hash', 'status', 'outputs']
+
+
+def get_file_hash(data_file_path):
+    """
+    SHA-256 of the contents of a file, as hex
+    """
+    file_hash = hashlib.sha256()
+    with open(data_file_path, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(hash_block_bytes), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+class Manifest:
+    """
+    Append-only JSON lines checkpoint of a batch job, one record per file and attempt:
+    real path, hash of its contents, size and modification time, status ('completed', 'failed' or
+    'skipped'), output paths, error, attempt number and time. Records are flushed to disk as they are
+    written, so a job that stops at any point can be started again and carry on. A record cut short
+    by a crash, or any line that is not a record, is ignored.
+    """
+
+    def __init__(self, manifest_path):
+
+        self.manifest_path = str(manifest_path)
+        self.lock = threading.Lock()
+        # path -> records in the order written
+        self.records = {}
+        # a record cut short has no line end, the next one starts on a new line
+        self.line_end_missing = False
+
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, 'r') as manifest_file:
+                text = manifest_file.read()
+            self.line_end_missing = len(text) > 0 and not text.endswith('\n')
+            for line_i, line in enumerate(text.splitlines()):
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict) or any(field not in record for field in record_fields):
+                        raise ValueError("missing fields")
+                except ValueError:
+                    logger.warning("%s: ignored incomplete record on line %d", self.manifest_path, line_i + 1)
+                    continue
+                self.records.setdefault(self.get_key(record['path']), []).append(record)
+
+    @staticmethod
+    def get_key(data_file_path):
+        """
+        Key of the records of a data file, the same however the file is named
+        """
+        return os.path.realpath(str(data_file_path))
+
+    def get_file_hash(self, data_file_path, file_stat):
+        """
+        Hash of the contents of a file with os.stat() result 'file_stat'. The hash of the latest record
+        with the same size and modification time is taken without reading the file again.
+        """
+        for record in reversed(self.records.get(self.get_key(data_file_path), [])):
+            if record['hash'] is not None and record.get('size') == file_stat.st_size and \
+                    record.get('mtime_ns') == file_stat.st_mtime_ns:
+                return record['hash']
+
+        return get_file_hash(data_file_path)
+
+    def get_records(self, data_file_path, file_hash):
+        """
+        Records of a file with the given contents, oldest first
+        """
+        return [record for record in self.records.get(self.get_key(data_file_path), [])
+                if record['hash'] == file_hash]
+
+    def get_completed(self, data_file_path, file_hash):
+        """
+        Latest completed record of a file with the given contents whose outputs all still exist, or None
+        """
+        for record in reversed(self.get_records(data_file_path, file_hash)):
+            if record['status'] == 'completed' and all(os.path.exists(path) for path in record['outputs']):
+                return record
+
+        return None
+
+    def get_failed_count(self, data_file_path, file_hash):
+        """
+        Failed attempts of a file with the given contents
+        """
+        return sum(record['status'] == 'failed' for record in self.get_records(data_file_path, file_hash))
+
+    def add(self, data_file_path, file_hash, status, outputs=(), error=None, file_stat=None):
+        """
+        Append a record and flush it to disk. 'file_stat' is the os.stat() result of the file
+        taken before it was hashed.
+        """
+        key = self.get_key(data_file_path)
+        record = {
+            'path': key,
+            'hash': file_hash,
+            'size': None if file_stat is None else file_stat.st_size,
+            'mtime_ns': None if file_stat is None else file_stat.st_mtime_ns,
+            'status': status,
+            'outputs': list(outputs),
+            'error': error,
+            'attempt': self.get_failed_count(data_file_path, file_hash) + 1,
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        with self.lock:
+            with open(self.manifest_path, 'a') as manifest_file:
+                if self.line_end_missing:
+                    manifest_file.write('\n')
+                    self.line_end_missing = False
+                manifest_file.write(json.dumps(record) + '\n')
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
+            self.records.setdefault(key, []).append(record)
+
+        return record
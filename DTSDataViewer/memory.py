@@ -0,0 +1,73 @@
+import ctypes
+import os
+import sys
+import numpy as np
+
+# part of physical memory the GUI experiment cache holds at most, unless a budget is set
+default_cache_memory_fraction = 0.25
+
+
+def get_root_array(array):
+    """
+    Array that owns the memory of a view
+    """
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+
+    return array
+
+
+def get_array_bytes(arrays):
+    """
+    Bytes held by a dict of named arrays. Memory shared by views is counted once,
+    under the first name it is found by. Entries that are not arrays count as 0.
+    """
+    usage = {}
+    counted = set()
+    for name, array in arrays.items():
+        usage[name] = 0
+        if not isinstance(array, np.ndarray):
+            continue
+
+        root = get_root_array(array)
+        if id(root) not in counted:
+            counted.add(id(root))
+            usage[name] = root.nbytes
+
+    return usage
+
+
+def get_physical_memory_bytes():
+    """
+    Physical memory of the machine, None where it cannot be found
+    """
+    if sys.platform == 'win32':
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullTotalPhys)
+        return None
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def format_bytes(size):
+    """
+    Human readable size
+    """
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} GB"
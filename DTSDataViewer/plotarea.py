@@ -1,18 +1,36 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 #
+import collections
 import inspect
+import time
 
 import matplotlib.offsetbox
 import numpy as np
-from PyQt5 import QtWidgets
+from PyQt5 import QtWidgets, QtCore, QtGui
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
 from matplotlib.ticker import NullLocator
 from matplotlib.widgets import Cursor
 from dts_file_reader import slice
-from DTSDataViewer.experiment import Experiment
+from DTSDataViewer.experiment import Experiment, rise_threshold_sd
+
+
+# series plotted in each axes, in plot order. Annotations mark the summary of the first one
+axes_series = {
+    (0, 0): ['head_rot_cor'],
+    (1, 0): ['head_rot_sag'],
+    (2, 0): ['head_rot_axi'],
+    (3, 0): ['head_resultant'],
+    (0, 1): ['mach_rot_pri'],
+    (1, 1): ['head_tran_cor', 'head_tran_sag', 'head_tran_axi'],
+    (2, 1): ['head_rot_cor', 'head_resultant'],
+    (3, 1): ['mach_rot_pri', 'head_resultant'],
+}
+
+# colors of derived signals plotted on the independent y axis of the head resultant
+derived_colors = ['#1f77b4', '#9467bd', '#8c564b', '#e377c2']
 
 
 class AnnotatedCursor(Cursor):
@@ -58,6 +76,10 @@ class AnnotatedCursor(Cursor):
     textprops : `matplotlib.text` properties as dictionary
         Specifies the appearance of the rendered text object.
 
+    frame_scheduler : `FrameScheduler`, optional, default: None
+        If given, mouse moves are handed to the scheduler, which renders
+        only the latest one once per display frame.
+
     **cursorargs : `matplotlib.widgets.Cursor` properties
         Arguments passed to the internal `~matplotlib.widgets.Cursor` instance.
         The `matplotlib.axes.Axes` argument is mandatory! The parameter
@@ -66,9 +88,11 @@ class AnnotatedCursor(Cursor):
     """
 
     def __init__(self, line, numberformat="{0:.4g};{1:.4g}", offset=(20, 25),
-                 dataaxis='x', textprops=None, **cursorargs):
+                 dataaxis='x', textprops=None, frame_scheduler=None, **cursorargs):
         if textprops is None:
             textprops = {}
+        # Coalesces mouse moves to one render per display frame, if given
+        self.frame_scheduler = frame_scheduler
         # The line object, for which the coordinates are displayed
         self.line = line
         # The format string, on which .format() is called for creating the text
@@ -103,6 +127,16 @@ class AnnotatedCursor(Cursor):
     def onmove(self, event):
         """
         Overridden draw callback for cursor. Called when moving the mouse.
+        With a frame scheduler only the latest event is rendered on the next frame.
+        """
+        if self.frame_scheduler is not None:
+            self.frame_scheduler.schedule(self, event)
+        else:
+            self.render(event)
+
+    def render(self, event):
+        """
+        Draw cursor and text for a mouse move event.
         """
         # Leave method under the same conditions as in overridden method
         if self.ignore(event):
@@ -283,11 +317,137 @@ class AnnotatedCursor(Cursor):
             super()._update()
 
 
+class FrameScheduler:
+    """
+    Coalesces cursor mouse moves so that each cursor renders at most once per display frame,
+    from its latest event only. Keeps the time spent per rendered frame as a metric.
+    """
+
+    def __init__(self, frame_ms=None):
+
+        if frame_ms is None:
+            screen = QtWidgets.QApplication.primaryScreen()
+            refresh_rate = screen.refreshRate() if screen is not None else 60.0
+            frame_ms = 1000.0 / (refresh_rate if refresh_rate > 0 else 60.0)
+
+        # set False to render every event as it arrives, for comparison
+        self.enabled = True
+
+        # cursor -> latest unrendered event
+        self.pending = {}
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(int(round(frame_ms)))
+        self.timer.timeout.connect(self.flush)
+
+        # metrics. A mouse move reaches every cursor, it is counted once.
+        self.events_received = 0
+        self.last_event = None
+        self.pending_event_count = 0
+        # time and mouse moves of each of the latest rendered frames
+        self.frame_times_ms = collections.deque(maxlen=600)
+        self.frame_event_counts = collections.deque(maxlen=600)
+
+    def schedule(self, cursor, event):
+        """
+        Hold latest event of cursor until the next frame
+        """
+        if event is not self.last_event:
+            self.last_event = event
+            self.events_received += 1
+            self.pending_event_count += 1
+        self.pending[cursor] = event
+
+        if not self.enabled:
+            self.flush()
+        elif not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """
+        Render latest event of each cursor
+        """
+        pending = self.pending
+        self.pending = {}
+        if not pending:
+            return
+
+        start = time.perf_counter()
+        for cursor, event in pending.items():
+            cursor.render(event)
+        self.frame_times_ms.append((time.perf_counter() - start) * 1000.0)
+        self.frame_event_counts.append(self.pending_event_count)
+        self.pending_event_count = 0
+
+    def clear(self):
+        """
+        Drop unrendered events, for cursors that are going away
+        """
+        self.timer.stop()
+        self.pending = {}
+        self.last_event = None
+        self.pending_event_count = 0
+
+    def get_stats(self):
+        """
+        Frame time metric: rendered frames, mouse events per frame and frame time mean, 95th percentile and max in ms.
+        All over the latest 600 rendered frames.
+        """
+        frame_times_ms = np.array(self.frame_times_ms)
+        if frame_times_ms.size == 0:
+            return {'frames': 0, 'events_per_frame': 0.0, 'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+        return {
+            'frames': int(frame_times_ms.size),
+            'events_per_frame': float(np.mean(self.frame_event_counts)),
+            'mean_ms': float(frame_times_ms.mean()),
+            'p95_ms': float(np.percentile(frame_times_ms, 95)),
+            'max_ms': float(frame_times_ms.max()),
+        }
+
+
+class DebouncedFigureCanvas(FigureCanvas):
+    """
+    Figure canvas that applies a burst of window resizes as a single redraw once resizing pauses.
+    Keeps full redraw times as a metric.
+    """
+
+    def __init__(self, figure, resize_delay_ms=100):
+        super().__init__(figure)
+
+        self.pending_resize_event = None
+        self.resize_timer = QtCore.QTimer()
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(resize_delay_ms)
+        self.resize_timer.timeout.connect(self.apply_resize)
+
+        self.draw_times_ms = collections.deque(maxlen=100)
+
+    def resizeEvent(self, event):
+        # Qt reuses the event object so keep a copy
+        self.pending_resize_event = QtGui.QResizeEvent(event.size(), event.oldSize())
+        self.resize_timer.start()
+
+    def apply_resize(self):
+        if self.pending_resize_event is not None:
+            event = self.pending_resize_event
+            self.pending_resize_event = None
+            super().resizeEvent(event)
+
+    def draw(self):
+        start = time.perf_counter()
+        super().draw()
+        self.draw_times_ms.append((time.perf_counter() - start) * 1000.0)
+
+
 class PlotArea(QtWidgets.QVBoxLayout):
     """
     Plots an Experiment
     """
 
+    # emitted with the signal id and peak index after the user selects a peak
+    peak_selected = QtCore.pyqtSignal(str, int)
+
     def __init__(self, parent=None):
         super(PlotArea, self).__init__()
 
@@ -297,7 +457,9 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.current_sample_rate = None
         self.underlay_peak_index = None
         self.fig = Figure((5.0, 4.0), facecolor='#e2e2e2', edgecolor=None, frameon=True)
-        self.canvas = FigureCanvas(self.fig)
+        self.canvas = DebouncedFigureCanvas(self.fig)
+        # coalesce crosshair cursor mouse moves to display frames
+        self.frame_scheduler = FrameScheduler()
         self.canvas.setParent(parent)
         # connect button event to callback for manual user peak selection
         self.fig.canvas.mpl_connect('button_release_event', self.user_peak_selected)
@@ -319,6 +481,9 @@ class PlotArea(QtWidgets.QVBoxLayout):
         # independent scaled plot object
         self.y2 = None
 
+        # version text of plot
+        self.version_text = None
+
         # notate axis units
         for row_i in range(0, row_count):
             self.axes[row_i, 0].set_ylabel('', fontsize=self.gui_axes_fontsize)
@@ -370,7 +535,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             Axis 2 = rotation along an axis that runs from ear to ear (SAGITTAL)
             Axis 3 = rotation along an axis that runs from the bottom to top of head (AXIAL)
 
-            Display 1/8 of a second
+            Display the experiment window, 1/8 of a second by default
         """
 
         # experiment reference - 20230603
@@ -383,18 +548,9 @@ class PlotArea(QtWidgets.QVBoxLayout):
 
 
         # data display window
-        x_data = list(map(lambda x: x/(experiment.channel_data[0].meta_data.sample_rate_hz/1000), range(0, experiment.window_samples)))
+        x_data, x_tick_loc, x_tick_labels = self.get_window_axis(experiment)
         min_y = -150
         max_y = 350
-        x_tick_loc = list(map(lambda x: x/(experiment.channel_data[0].meta_data.sample_rate_hz/1000), np.arange(0,
-                                                                                                                (int(experiment.channel_data[0].meta_data.sample_rate_hz / 8) +
-                                                                                                                 int((experiment.channel_data[0].meta_data.sample_rate_hz / 8) / 5)
-                                                                                                                 ), int((experiment.channel_data[0].meta_data.sample_rate_hz / 8) / 5)
-                                                                                                                )
-                              )
-                          )
-
-        x_tick_labels = list(map(lambda x: int(x), x_tick_loc))
         y_tick_loc = np.arange(min_y, max_y, 50)
         y_tick_labels = ['', '-100', '', '0', '', '100', '', '200', '', '300']
 
@@ -415,7 +571,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[0, 0].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
         self.axes[0, 0].set_xlim(x_tick_labels[0], x_tick_labels[-1])
         self.axes[0, 0].set_ylabel(experiment.get_channel('head_rot_cor').meta_data.eu, fontsize=self.gui_axes_fontsize)
-        y_data = experiment.get_channel('head_rot_cor').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end)
+        y_data = experiment.get_filtered_data('head_rot_cor', start=experiment.data_window_start, stop=experiment.data_window_end)
         self.axes[0, 0].plot(x_data, y_data, color='#000000', linewidth=1, snap=True, label='id_trace')
 
         # only show summary if it is populated
@@ -431,6 +587,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
                     # label for program identification
                     label='id_annot'
                 )
+                self.add_baseline_band(self.axes[0, 0], 'head_rot_cor')
 
             self.axes[0, 0].add_artist(self.get_summary_box(experiment.head_summary))
 
@@ -442,6 +599,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis=plot_cursor_tracks_data,
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[0, 0],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -462,7 +620,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[1, 0].xaxis.set_ticks(x_tick_loc)
         self.axes[1, 0].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
         self.axes[1, 0].set_ylabel(experiment.get_channel('head_rot_sag').meta_data.eu, fontsize=self.gui_axes_fontsize)
-        self.axes[1, 0].plot(x_data, experiment.get_channel('head_rot_sag').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[1, 0].plot(x_data, experiment.get_filtered_data('head_rot_sag', start=experiment.data_window_start, stop=experiment.data_window_end),
                              color='green', linewidth=1, snap=True)
         self.axes[1, 0].format_coord = self.format_coord
 
@@ -474,6 +632,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis=plot_cursor_tracks_data,
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[1, 0],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -491,7 +650,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[2, 0].xaxis.set_ticks(x_tick_loc)
         self.axes[2, 0].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
         self.axes[2, 0].set_ylabel(experiment.get_channel('head_rot_axi').meta_data.eu, fontsize=self.gui_axes_fontsize)
-        self.axes[2, 0].plot(x_data, experiment.get_channel('head_rot_axi').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[2, 0].plot(x_data, experiment.get_filtered_data('head_rot_axi', start=experiment.data_window_start, stop=experiment.data_window_end),
                              color='orange', linewidth=1, snap=True)
         self.axes[2, 0].format_coord = self.format_coord
 
@@ -503,6 +662,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis=plot_cursor_tracks_data,
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[2, 0],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -536,6 +696,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
                     color="#000000",
                     label='id_annot'
                 )
+                self.add_baseline_band(self.axes[3, 0], 'head_resultant')
 
             self.axes[3, 0].add_artist(self.get_summary_box(experiment.head_resultant_summary))
 
@@ -547,6 +708,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis=plot_cursor_tracks_data,
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[3, 0],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -565,7 +727,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[0, 1].set_ylabel(experiment.get_channel('mach_rot_pri').meta_data.eu, fontsize=self.gui_axes_fontsize)
         self.axes[0, 1].xaxis.set_ticks(x_tick_loc)
         self.axes[0, 1].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
-        y_data = experiment.get_channel('mach_rot_pri').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end)
+        y_data = experiment.get_filtered_data('mach_rot_pri', start=experiment.data_window_start, stop=experiment.data_window_end)
         self.axes[0, 1].plot(x_data, y_data, color='#000000', linewidth=1, snap=True, label="id_trace")
         if experiment.get_channel('mach_rot_pri').summary_data.peak_vel.value is not None:
             if plot_annotate:
@@ -577,6 +739,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
                     color="red",
                     label="id_annot"
                 )
+                self.add_baseline_band(self.axes[0, 1], 'mach_rot_pri')
 
             self.axes[0, 1].add_artist(self.get_summary_box(experiment.machine_summary))
 
@@ -588,6 +751,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis=plot_cursor_tracks_data,
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[0, 1],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -606,11 +770,11 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[1, 1].xaxis.set_ticks(x_tick_loc)
         self.axes[1, 1].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
         self.axes[1, 1].tick_params(labelsize=self.gui_axes_fontsize)
-        self.axes[1, 1].plot(x_data, experiment.get_channel('head_tran_cor').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[1, 1].plot(x_data, experiment.get_filtered_data('head_tran_cor', start=experiment.data_window_start, stop=experiment.data_window_end),
                              label='Coronal', color='#000000', linewidth=1, snap=True)
-        self.axes[1, 1].plot(x_data, experiment.get_channel('head_tran_sag').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[1, 1].plot(x_data, experiment.get_filtered_data('head_tran_sag', start=experiment.data_window_start, stop=experiment.data_window_end),
                              label='Sagittal', color='green', linewidth=1, snap=True)
-        self.axes[1, 1].plot(x_data, experiment.get_channel('head_tran_axi').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[1, 1].plot(x_data, experiment.get_filtered_data('head_tran_axi', start=experiment.data_window_start, stop=experiment.data_window_end),
                              label='Axial', color='orange', linewidth=1, snap=True)
         self.axes[1, 1].format_coord = lambda x, y: '{:0.0f} ms'.format(x) + ', ' + '{:0.2f} g'.format(y)
 
@@ -622,6 +786,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis='off',
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[1, 1],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -641,7 +806,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[2, 1].xaxis.set_ticks(x_tick_loc)
         self.axes[2, 1].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
         self.axes[2, 1].set_ylabel(experiment.get_channel('head_rot_cor').meta_data.eu, fontsize=self.gui_axes_fontsize)
-        self.axes[2, 1].plot(x_data, experiment.get_channel('head_rot_cor').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[2, 1].plot(x_data, experiment.get_filtered_data('head_rot_cor', start=experiment.data_window_start, stop=experiment.data_window_end),
                              label='Coronal', color='#000000', linewidth=1, snap=True)
         self.axes[2, 1].plot(x_data, experiment.head_resultant[experiment.data_window_start:experiment.data_window_end],
                              label='Rotation Resultant', color='#db3e27', linewidth=1, snap=True)
@@ -655,6 +820,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis='off',
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[2, 1],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
@@ -674,7 +840,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.axes[3, 1].set_ylabel(experiment.get_channel('mach_rot_pri').meta_data.eu, fontsize=self.gui_axes_fontsize)
         self.axes[3, 1].xaxis.set_ticks(x_tick_loc)
         self.axes[3, 1].set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
-        self.axes[3, 1].plot(x_data, experiment.get_channel('mach_rot_pri').get_filtered_data(start=experiment.data_window_start, stop=experiment.data_window_end),
+        self.axes[3, 1].plot(x_data, experiment.get_filtered_data('mach_rot_pri', start=experiment.data_window_start, stop=experiment.data_window_end),
                              label='Machine Primary', color='#000000', linewidth=1, snap=True)
         self.axes[3, 1].plot(x_data, experiment.head_resultant[experiment.data_window_start:experiment.data_window_end],
                              label='Head Rotation Resultant', color='#db3e27', linewidth=1, snap=True)
@@ -688,14 +854,34 @@ class PlotArea(QtWidgets.QVBoxLayout):
             dataaxis='off',
             textprops={'color': '#000000', 'fontweight': 'normal', 'fontsize': 'small', 'backgroundcolor': '#F3F3F3'},
             ax=self.axes[3, 1],
+            frame_scheduler=self.frame_scheduler,
             useblit=True,
             linewidth=0.5, linestyle='dotted')
 
         self.axes[3, 1].legend(fontsize=self.gui_axes_fontsize, loc='upper right')
+        self.axes[3, 1].add_artist(self.get_alignment_box(experiment))
+
+        ##############################################################################################################
+        # derived signals on an independent y axis of the head resultant
+        ##############################################################################################################
+        if experiment.derived_signals:
+            self.y2 = self.axes[3, 0].twinx()
+            # keep the head resultant axes on top so its cursor and peak selection still get mouse events
+            self.y2.set_zorder(self.axes[3, 0].get_zorder() - 1)
+            self.y2.set_facecolor(self.axes[3, 0].get_facecolor())
+            self.y2.patch.set_visible(True)
+            self.axes[3, 0].patch.set_visible(False)
+            self.y2.set_ylabel(experiment.get_derived_eu(experiment.derived_signals[0]), fontsize=self.gui_axes_fontsize)
+            self.y2.tick_params(labelsize=self.gui_axes_fontsize)
+            for signal, color in zip(experiment.derived_signals, derived_colors):
+                self.y2.plot(x_data, experiment.get_series(signal, start=experiment.data_window_start,
+                                                           stop=experiment.data_window_end),
+                             label=signal, color=color, linewidth=1, linestyle='dashed', snap=True)
+            self.y2.legend(fontsize=self.gui_axes_fontsize, loc='lower right')
 
         # add code version to plot. Retreive from caller
         daq_version_str = 'Version: ' + inspect.currentframe().f_back.f_globals['__version__']
-        self.fig.text(0.98, 0.00, daq_version_str, fontsize='x-small', horizontalalignment='right', verticalalignment='bottom', transform=self.fig.transFigure)
+        self.version_text = self.fig.text(0.98, 0.00, daq_version_str, fontsize='x-small', horizontalalignment='right', verticalalignment='bottom', transform=self.fig.transFigure)
 
         # adjust layout
         # self.fig.subplots_adjust(top=0.938, bottom=0.061, left=0.036, right=0.985, hspace=0.187, wspace=0.094)
@@ -704,6 +890,110 @@ class PlotArea(QtWidgets.QVBoxLayout):
         # refresh canvas so plot is updated
         self.canvas.draw()
 
+    @staticmethod
+    def get_window_axis(experiment):
+        """
+        Time in ms of the window samples, and x tick locations and labels every fifth of the window
+        """
+        ms_per_sample = 1 / (experiment.channel_data[0].meta_data.sample_rate_hz / 1000)
+        x_data = list(map(lambda x: x * ms_per_sample, range(0, experiment.window_samples)))
+        tick_step = max(int(experiment.window_samples / 5), 1)
+        x_tick_loc = list(map(lambda x: x * ms_per_sample,
+                              np.arange(0, experiment.window_samples + tick_step, tick_step)))
+        x_tick_labels = list(map(lambda x: int(x), x_tick_loc))
+
+        return x_data, x_tick_loc, x_tick_labels
+
+    def get_annotation_data(self, signal, summary):
+        """
+        Rise start, peak and rise end of a summary as x and y data of an annotation plot
+        """
+        y_data_full = self.experiment.get_series(signal)
+        ms_per_sample = 1 / (self.experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz / 1000)
+        indices = [summary.rise_start_index, summary.peak_index, summary.rise_end_index]
+
+        return [(index - self.experiment.data_window_start) * ms_per_sample for index in indices], \
+            [y_data_full[index] for index in indices]
+
+    def update_window(self):
+        """
+        Show the current experiment window in the existing plots after the window changed.
+        Line data is sliced from the loaded experiment; the plots are not built again.
+        """
+        if self.experiment.channel_data is None:
+            return
+
+        x_data, x_tick_loc, x_tick_labels = self.get_window_axis(self.experiment)
+        start = self.experiment.data_window_start
+        stop = self.experiment.data_window_end
+
+        for (row_i, col_i), signals in axes_series.items():
+            ax = self.axes[row_i, col_i]
+            trace_lines = [line for line in ax.lines if line.get_label() != 'id_annot']
+            for line, signal in zip(trace_lines, signals):
+                line.set_data(x_data, self.experiment.get_series(signal, start=start, stop=stop))
+            for line in ax.lines:
+                if line.get_label() == 'id_annot':
+                    line.set_data(*self.get_annotation_data(signals[0], self.experiment.get_summary(signals[0])))
+            ax.xaxis.set_ticks(x_tick_loc)
+            ax.set_xticklabels(x_tick_labels, fontsize=self.gui_axes_fontsize)
+
+        # axes share x
+        self.axes[0, 0].set_xlim(x_tick_labels[0], x_tick_labels[-1])
+
+        # lag depends on the window
+        for plot_artist in list(self.axes[3, 1].artists):
+            if plot_artist.get_label() == 'id_alignment_box':
+                plot_artist.remove()
+        self.axes[3, 1].add_artist(self.get_alignment_box(self.experiment))
+
+        if self.y2 is not None:
+            for line, signal in zip(self.y2.lines, self.experiment.derived_signals):
+                line.set_data(x_data, self.experiment.get_series(signal, start=start, stop=stop))
+            self.y2.relim()
+            self.y2.autoscale_view()
+
+        # pending cursor moves are in the old window; cursors save a new background on draw
+        self.frame_scheduler.clear()
+        self.canvas.draw()
+
+    def update_live(self, data, sample_rate_hz, channel_map):
+        """
+        Show the latest block of a running acquisition, (channels, samples) in channel_map order.
+        Lines are created on the first call and only their data is replaced after that.
+        """
+        series = {signal: data[channel_i] for signal, channel_i in channel_map.items()}
+        series['head_resultant'] = np.sqrt(np.sum(np.square(data[[channel_map['head_rot_cor'],
+                                                                   channel_map['head_rot_sag'],
+                                                                   channel_map['head_rot_axi']]]), axis=0))
+        # time in ms relative to the newest sample
+        x_data = (np.arange(data.shape[1]) - data.shape[1]) * (1000.0 / sample_rate_hz)
+
+        live = any(line.get_label() == 'id_live' for line in self.axes[0, 0].lines)
+        if not live:
+            self.clear_plot()
+            self.fig.suptitle('Acquiring...', fontsize='medium')
+
+        for (row_i, col_i), signals in axes_series.items():
+            ax = self.axes[row_i, col_i]
+            if not live:
+                for signal in signals:
+                    ax.plot(x_data, series[signal], linewidth=1, label='id_live')
+            else:
+                for line, signal in zip(ax.lines, signals):
+                    line.set_data(x_data, series[signal])
+            # y limits from the data, cheaper than relim
+            y_min = min(np.min(series[signal]) for signal in signals)
+            y_max = max(np.max(series[signal]) for signal in signals)
+            margin = max((y_max - y_min) * 0.05, 1e-6)
+            ax.set_ylim(y_min - margin, y_max + margin)
+
+        # axes share x
+        if x_data.size > 1:
+            self.axes[0, 0].set_xlim(x_data[0], x_data[-1])
+
+        self.canvas.draw_idle()
+
     def clear_plot(self):
         """ clear the plot """
 
@@ -711,12 +1001,19 @@ class PlotArea(QtWidgets.QVBoxLayout):
 
         for row_i in range(0, row_count):
             for col_i in range(0, col_count):
-                # remove all plots
-                del self.axes[row_i, col_i].lines[:]
+                # remove all plots so the figure no longer references experiment data
+                for line in list(self.axes[row_i, col_i].lines):
+                    line.remove()
                 self.reset_history()
 
                 # remove all text boxes
-                del self.axes[row_i, col_i].artists[:]
+                for artist in list(self.axes[row_i, col_i].artists):
+                    artist.remove()
+
+                # remove baseline bands
+                for patch in list(self.axes[row_i, col_i].patches):
+                    if patch.get_label() == 'id_baseline_band':
+                        patch.remove()
 
                 # clean up legend if it is initialized
                 if self.axes[row_i, col_i].get_legend() is not None:
@@ -742,12 +1039,25 @@ class PlotArea(QtWidgets.QVBoxLayout):
         if self.y2 is not None:
             self.y2.remove()
             self.y2 = None
+            self.axes[3, 0].patch.set_visible(True)
 
         self.fig.suptitle('')
 
-        # reset the crosshair cursors
+        # remove version text
+        if self.version_text is not None:
+            self.version_text.remove()
+            self.version_text = None
+
+        # disconnect the crosshair cursors from the canvas, they hold the old lines, and reset them
+        self.frame_scheduler.clear()
+        for cursor in self.cursors.flat:
+            if cursor is not None:
+                cursor.disconnect_events()
         self.cursors = np.empty(self.axes.shape, dtype=AnnotatedCursor)
 
+        # release experiment data
+        self.experiment = Experiment()
+
         # refresh canvas
         self.canvas.draw()
 
@@ -757,6 +1067,15 @@ class PlotArea(QtWidgets.QVBoxLayout):
         self.underlay_peak_index = 0
         self.current_sample_rate = 0
 
+    def add_baseline_band(self, ax, signal):
+        """
+        Shade the baseline mean plus and minus rise_threshold_sd baseline standard deviations. The reader's
+        summaries find their rise against a baseline of their own, so their rise start need not be on its edge
+        """
+        baseline_mean, baseline_std = self.experiment.get_baseline_stats(signal)
+        ax.axhspan(baseline_mean - rise_threshold_sd * baseline_std, baseline_mean + rise_threshold_sd * baseline_std,
+                   color='gray', alpha=0.25, linewidth=0, label='id_baseline_band')
+
     def get_summary_box(self, summary: slice.Channel.Summary) -> matplotlib.offsetbox.AnchoredText:
         """
         Return anchored text object to place in plot
@@ -794,6 +1113,37 @@ class PlotArea(QtWidgets.QVBoxLayout):
 
         return anchored_text
 
+    def get_alignment_box(self, experiment) -> matplotlib.offsetbox.AnchoredText:
+        """
+        Return anchored text object with the lag of the head resultant behind machine primary
+        """
+        from matplotlib.offsetbox import AnchoredText
+
+        lag_ms, coefficient = experiment.get_alignment()
+        anchored_text = AnchoredText("{}{:0.3f} ms  {}{:0.2f}".format('Head lag: ', lag_ms, 'r: ', coefficient),
+                                     loc='upper left',
+                                     prop=dict(family='sans-serif', size=self.gui_axes_fontsize, weight='bold', linespacing=1.0))
+        anchored_text.set_label('id_alignment_box')
+        anchored_text.patch.set_boxstyle("round, pad=0.0, rounding_size=0.2")
+        anchored_text.patch.set_facecolor('white')
+        anchored_text.patch.set_edgecolor('gray')
+        anchored_text.patch.set_linewidth(1)
+        anchored_text.patch.set_alpha(0.95)
+
+        return anchored_text
+
+    def get_render_stats(self):
+        """
+        Frame time metrics of cursor rendering and full canvas redraws
+        """
+        stats = self.frame_scheduler.get_stats()
+        draw_times_ms = np.array(self.canvas.draw_times_ms)
+        stats['redraws'] = int(draw_times_ms.size)
+        stats['redraw_mean_ms'] = float(draw_times_ms.mean()) if draw_times_ms.size else 0.0
+        stats['redraw_max_ms'] = float(draw_times_ms.max()) if draw_times_ms.size else 0.0
+
+        return stats
+
     @staticmethod
     def format_coord(x, y):
         return 'Cursor {:0.3f} ms'.format(x) + '; ' + '{:0.2f} rad/s'.format(y)
@@ -807,26 +1157,20 @@ class PlotArea(QtWidgets.QVBoxLayout):
         if event.button != MouseButton.RIGHT:
             return
 
+        # nothing to select without data
+        if event.inaxes is None or self.experiment.channel_data is None:
+            return
+
         # filter to axes of interest by axes label id
         if event.inaxes.get_label() in ['id_head_rot_cor', 'id_mach_rot_pri', 'id_head_rot_res']:
 
-            # data channel id for pulling data from experiment
-            channel_id = "_".join(event.inaxes.get_label().split('_')[1:])
-            # device_id for determining summary data
-            device_id = event.inaxes.get_label().split('_')[1]
-            # axis for distinguishing both axis and single vs resultant
-            axis_id = event.inaxes.get_label().split('_')[3]
-
-            if axis_id == 'res':
-                if device_id == 'head':
-                    y_data_full = self.experiment.head_resultant
-                    summary_data = self.experiment.head_resultant_summary
-                else:
-                    y_data_full = self.experiment.machine_resultant
-                    summary_data = self.experiment.machine_resultant_summary
+            # signal id for pulling data from experiment
+            if event.inaxes.get_label() == 'id_head_rot_res':
+                signal = 'head_resultant'
             else:
-                y_data_full = self.experiment.get_channel(channel_id).get_filtered_data()
-                summary_data = self.experiment.get_channel(channel_id).summary_data
+                signal = "_".join(event.inaxes.get_label().split('_')[1:])
+
+            summary_data = self.experiment.get_summary(signal)
 
             for line in event.inaxes.lines:
                 # use trace plot to select peak
@@ -839,22 +1183,10 @@ class PlotArea(QtWidgets.QVBoxLayout):
                     # not just the windowed data
                     # If the user exports the windowed data the peak_index is incorrect for that
                     user_selected_peak_index = x_index + self.experiment.data_window_start
-                    # update the channel summary values relevant to a new peak_index
-                    slice.set_user_selected_peak(
-                        summary_data,
-                        y_data_full,
-                        self.experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz,
-                        user_selected_peak_index
-                    )
-                    # update the channel data in the experiment so that if the user
-                    # exports data it will reflect the user peak selected
-                    if axis_id == 'res':
-                        if device_id == 'head':
-                            self.experiment.head_resultant_summary = summary_data
-                        else:
-                            self.experiment.machine_resultant_summary = summary_data
-                    else:
-                        self.experiment.get_channel(channel_id).summary_data = summary_data
+                    # update the summary values relevant to a new peak_index in the experiment
+                    # so that if the user exports data it will reflect the user peak selected
+                    summary_data = self.experiment.set_user_selected_peak(signal, user_selected_peak_index)
+                    self.peak_selected.emit(signal, int(user_selected_peak_index))
 
                     for plot_artist in event.inaxes.artists:
                         # find the data summary box
@@ -869,16 +1201,7 @@ class PlotArea(QtWidgets.QVBoxLayout):
                 # find the annotation plot and assume it is after the trace plot
                 if line.get_label() == 'id_annot':
                     # update the data for the annotation plot
-                    line.set_data([(summary_data.rise_start_index - self.experiment.data_window_start) /
-                                   (self.experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz / 1000),
-                                   (summary_data.peak_index - self.experiment.data_window_start) /
-                                   (self.experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz / 1000),
-                                   (summary_data.rise_end_index - self.experiment.data_window_start) /
-                                   (self.experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz / 1000)],
-                                   [y_data_full[summary_data.rise_start_index],
-                                   y_data_full[summary_data.peak_index],
-                                   y_data_full[summary_data.rise_end_index]
-                                  ])
+                    line.set_data(*self.get_annotation_data(signal, summary_data))
 
                     # after annot plot we are done
                     break
@@ -0,0 +1,144 @@
+import numpy as np
+
+
+class QualityReport:
+    """
+    Data quality metrics of each channel of an experiment and the flags raised from them.
+
+    metrics: dict of channel key to dict of
+        non_finite       samples that are not numbers, e.g. dropped samples
+        saturated_run_ms longest run at the channel extreme value. The reader does not give the
+                         measurement range, so saturation shows as a plateau at the extreme
+        flat_run_ms      longest run without change
+        spikes           isolated single sample spikes outside of the impacts
+        noise_rms        RMS of the baseline above a quarter of the sample rate
+        noise_fraction   noise_rms relative to the channel peak absolute value
+    flags: list of (channel key, check, value) for metrics beyond their limits
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.flags = []
+
+    def is_suspicious(self):
+        return len(self.flags) > 0
+
+    def get_flag_text(self):
+        """
+        One line per flag for display
+        """
+        return [f"{channel}: {check} {value:g}" for channel, check, value in self.flags]
+
+
+def get_longest_runs(mask):
+    """
+    Longest run of True along the last axis of a 2-D boolean array, per row
+    """
+    rows = mask.shape[0]
+    padded = np.zeros((rows, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+
+    # starts and ends come out in row order, and every start in a row has its end in that row
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+
+    longest = np.zeros(rows, dtype=np.int64)
+    np.maximum.at(longest, start_rows, end_cols - start_cols)
+
+    return longest
+
+
+def screen(experiment, flat_run_ms=20.0, saturated_run_ms=2.0, spike_sigma=12.0, noise_fraction_limit=0.05,
+           noise_samples=8192):
+    """
+    Data quality screen of all channels of a loaded experiment in vectorized passes over the
+    (channels, samples) array. Checks saturation, flat lines, dropped (non-finite) samples,
+    single sample spikes away from the impacts and a FFT noise floor of the pre-impact baseline.
+    """
+    report = QualityReport()
+
+    data = np.asarray(experiment.scaled_data, dtype=np.float64)
+    channel_keys = list(experiment.channel_map.keys())
+    sample_rate_hz = experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz
+    samples_per_ms = sample_rate_hz / 1000.0
+
+    # dropped samples
+    finite = np.isfinite(data)
+    non_finite = np.count_nonzero(~finite, axis=1)
+    data = np.where(finite, data, 0.0)
+
+    # saturation, a run at the channel extreme value
+    channel_max = data.max(axis=1, keepdims=True)
+    channel_min = data.min(axis=1, keepdims=True)
+    saturated_run_ms_found = get_longest_runs((data == channel_max) | (data == channel_min)) / samples_per_ms
+
+    # flat line, where consecutive samples do not change
+    first_difference = np.diff(data, axis=1)
+    flat_run = get_longest_runs(first_difference == 0) + 1
+    flat_run_ms_found = flat_run / samples_per_ms
+
+    # single sample spikes, a large second difference between samples that step in opposite directions.
+    # the peaks of impacts have large second differences too, so impacts are left out
+    second_difference = first_difference[:, 1:] - first_difference[:, :-1]
+    # second difference i is centered on sample i + 1
+    outside_impacts = np.ones(data.shape[1], dtype=bool)
+    for start, stop in experiment.get_impact_spans():
+        outside_impacts[start:stop] = False
+    outside_impacts = outside_impacts[1:-1]
+    quiet_difference = second_difference[:, outside_impacts]
+    if quiet_difference.shape[1] == 0:
+        quiet_difference = np.zeros((data.shape[0], 1))
+    median = np.median(quiet_difference, axis=1, keepdims=True)
+    sigma = 1.4826 * np.median(np.abs(quiet_difference - median), axis=1, keepdims=True)
+    # quantized quiet channels can have a median absolute deviation of 0
+    sigma = np.where(sigma > 0, sigma, quiet_difference.std(axis=1, keepdims=True))
+    sigma = np.where(sigma > 0, sigma, np.inf)
+    is_spike = (np.abs(second_difference - median) > spike_sigma * sigma) & \
+               (np.sign(first_difference[:, 1:]) != np.sign(first_difference[:, :-1])) & outside_impacts
+    # a spike shows in the second differences of its neighbours too, count each run of them once
+    spikes = np.count_nonzero(is_spike[:, 1:] & ~is_spike[:, :-1], axis=1) + is_spike[:, 0]
+
+    # noise floor of the quiet pre-impact baseline from one batched FFT over all channels,
+    # a recording without one has no noise floor
+    baseline_start = max(experiment.baseline_stop - noise_samples, experiment.baseline_start)
+    baseline = data[:, baseline_start:experiment.baseline_stop]
+    noise_rms = np.zeros(data.shape[0])
+    if baseline.shape[1] >= 16:
+        # cached baseline mean, unless dropped samples made it undefined
+        baseline_mean = np.array([experiment.get_baseline_stats(channel_key)[0] for channel_key in channel_keys])
+        baseline_mean = np.where(np.isfinite(baseline_mean), baseline_mean, baseline.mean(axis=1))
+        baseline = baseline - baseline_mean[:, np.newaxis]
+        window = np.hanning(baseline.shape[1])
+        spectrum = np.abs(np.fft.rfft(baseline * window, axis=1)) ** 2
+        frequencies = np.fft.rfftfreq(baseline.shape[1], d=1.0 / sample_rate_hz)
+        # Parseval with window power correction, one sided
+        noise_power = 2.0 * spectrum[:, frequencies >= sample_rate_hz / 4].sum(axis=1) / \
+            (baseline.shape[1] * np.sum(window ** 2))
+        noise_rms = np.sqrt(noise_power)
+    peak = np.abs(data).max(axis=1)
+    noise_fraction = np.divide(noise_rms, peak, out=np.zeros_like(noise_rms), where=peak > 0)
+
+    for channel_i, channel_key in enumerate(channel_keys):
+        report.metrics[channel_key] = {
+            'non_finite': int(non_finite[channel_i]),
+            'saturated_run_ms': float(saturated_run_ms_found[channel_i]),
+            'flat_run_ms': float(flat_run_ms_found[channel_i]),
+            'spikes': int(spikes[channel_i]),
+            'noise_rms': float(noise_rms[channel_i]),
+            'noise_fraction': float(noise_fraction[channel_i]),
+        }
+        metrics = report.metrics[channel_key]
+
+        if metrics['non_finite'] > 0:
+            report.flags.append((channel_key, 'dropped samples', metrics['non_finite']))
+        if metrics['saturated_run_ms'] >= saturated_run_ms:
+            report.flags.append((channel_key, 'saturated ms', metrics['saturated_run_ms']))
+        if metrics['flat_run_ms'] >= flat_run_ms:
+            report.flags.append((channel_key, 'flat line ms', metrics['flat_run_ms']))
+        if metrics['spikes'] > 0:
+            report.flags.append((channel_key, 'spikes', metrics['spikes']))
+        if metrics['noise_fraction'] >= noise_fraction_limit:
+            report.flags.append((channel_key, 'noise fraction', metrics['noise_fraction']))
+
+    return report
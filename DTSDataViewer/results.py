@@ -0,0 +1,124 @@
+import datetime
+import os
+import sqlite3
+from DTSDataViewer.experiment import summary_fields, summary_signals
+
+
+def get_sql_value(value):
+    """
+    Plain python value sqlite can store, from numpy scalars and bools
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if hasattr(value, 'item'):
+        return value.item()
+
+    return value
+
+
+def get_summary_rows(experiment):
+    """
+    Summaries of an experiment as result rows, one per summarized signal:
+    (path, subject_id, file_label, channel, *summary_fields). 'path' is the real path of the data file.
+    """
+    if experiment.data_file_path is None:
+        raise ValueError("Experiment has no data file path")
+    data_file_path = os.path.realpath(experiment.data_file_path)
+
+    rows = []
+    for signal in summary_signals.values():
+        values = experiment.get_summary_values(signal)
+        rows.append(
+            (data_file_path, experiment.get_id(), experiment.get_label(), signal) + tuple(
+                get_sql_value(values[field]) for field in summary_fields
+            )
+        )
+
+    return rows
+
+
+class ResultsStore:
+    """
+    SQLite database of experiment summaries with one row per data file and summarized signal.
+    Rows are keyed on the real path of the data file, so files of different studies that share
+    a label are kept apart. Results of a file that is stored again replace the earlier ones.
+    """
+
+    def __init__(self, database_path):
+
+        self.database_path = str(database_path)
+        self.connection = sqlite3.connect(self.database_path)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "path TEXT NOT NULL, "
+                "subject_id TEXT NOT NULL, "
+                "file_label TEXT NOT NULL, "
+                "channel TEXT NOT NULL, "
+                "peak_index INTEGER, "
+                "rise_start_index INTEGER, "
+                "rise_end_index INTEGER, "
+                "peak_vel REAL, "
+                "time_to_peak REAL, "
+                "decel_time REAL, "
+                "fwhm REAL, "
+                "delta_t REAL, "
+                "rise_to_peak_slope REAL, "
+                "is_peak_user_selected INTEGER, "
+                "updated TEXT, "
+                "PRIMARY KEY (path, channel))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS summaries_subject_id ON summaries (subject_id, channel)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS summaries_file_label ON summaries (file_label)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS summaries_channel ON summaries (channel)")
+
+    def add_rows(self, rows):
+        """
+        Insert or replace result rows from get_summary_rows() in a single transaction
+        """
+        columns = ['path', 'subject_id', 'file_label', 'channel'] + summary_fields + ['updated']
+        updated = datetime.datetime.now().isoformat(timespec='seconds')
+
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO summaries ({','.join(columns)}) VALUES ({','.join('?' * len(columns))})",
+                [tuple(row) + (updated,) for row in rows]
+            )
+
+    def add(self, experiments):
+        """
+        Insert or replace summaries of experiments in a single transaction
+        """
+        self.add_rows([row for experiment in experiments for row in get_summary_rows(experiment)])
+
+    def query(self, subject_id=None, file_label=None, channel=None, path=None):
+        """
+        Result rows as dicts, filtered on any of subject id, file label, channel and data file path
+        """
+        if path is not None:
+            path = os.path.realpath(path)
+        conditions = []
+        parameters = []
+        for column, value in [('subject_id', subject_id), ('file_label', file_label), ('channel', channel),
+                              ('path', path)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+
+        sql = "SELECT * FROM summaries"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY file_label, path, channel"
+
+        return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,187 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from DTSDataViewer.cache import ExperimentCache
+
+
+def get_json_value(value):
+    """
+    'value' with NaN and infinite numbers, also inside lists, tuples, dicts and arrays, as None.
+    JSON has no NaN.
+    """
+    if isinstance(value, dict):
+        return {key: get_json_value(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind != 'f':
+            return value.tolist()
+        values = value.astype(object)
+        values[~np.isfinite(value)] = None
+        return values.tolist()
+    if isinstance(value, (list, tuple)):
+        return [get_json_value(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+
+    return value
+
+
+class RequestError(Exception):
+    """
+    Client error with the HTTP status to answer with
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ExperimentRequestHandler(BaseHTTPRequestHandler):
+    """
+    Read only HTTP/JSON access to the DTS files of a data directory.
+
+    GET /files
+        list of data files
+    GET /memory
+        bytes held by cached experiments
+    GET /summary?file=<name>
+        export summary fields of a file
+    GET /trace?file=<name>&signal=<channel key|head_resultant>[&start=&stop=&step=&format=json|binary]
+        filtered data of a signal. Defaults to the display window. 'step' decimates the window
+        by keeping every nth sample. 'binary' answers little endian float32 with the
+        sample rate, start and step in response headers.
+    """
+
+    server_version = 'DTSDataViewer'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            if url.path == '/memory':
+                self.send_json({
+                    'total_bytes': self.server.cache.get_memory_bytes(),
+                    'max_bytes': self.server.cache.max_bytes,
+                    'experiments': self.server.cache.get_memory_usage(),
+                })
+            elif url.path == '/files':
+                self.send_json(self.server.list_files())
+            elif url.path == '/summary':
+                experiment = self.server.get_experiment(self.get_file(query))
+                self.send_json(experiment.get_export_summary())
+            elif url.path == '/trace':
+                self.send_trace(self.server.get_experiment(self.get_file(query)), query)
+            else:
+                raise RequestError(404, f"Unknown endpoint: '{url.path}'")
+
+        except RequestError as e:
+            self.send_json({'error': str(e)}, status=e.status)
+        except Exception as e:
+            self.send_json({'error': str(e)}, status=500)
+
+    @staticmethod
+    def get_file(query):
+        if 'file' not in query:
+            raise RequestError(400, "Missing 'file' parameter")
+
+        return query['file']
+
+    @staticmethod
+    def get_int(query, name, default):
+        try:
+            return int(query[name]) if name in query else default
+        except ValueError:
+            raise RequestError(400, f"'{name}' must be an integer")
+
+    def send_trace(self, experiment, query):
+        """
+        Answer with a windowed and optionally decimated signal
+        """
+        signal = query.get('signal', 'mach_rot_pri')
+        start = max(self.get_int(query, 'start', experiment.data_window_start), 0)
+        stop = self.get_int(query, 'stop', experiment.data_window_end)
+        step = self.get_int(query, 'step', 1)
+        if step < 1:
+            raise RequestError(400, "'step' must be at least 1")
+
+        try:
+            data = experiment.get_series(signal, start=start, stop=stop)[::step]
+        except ValueError as e:
+            raise RequestError(400, str(e))
+
+        sample_rate_hz = experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz
+
+        if query.get('format', 'json') == 'binary':
+            body = np.ascontiguousarray(data, dtype='<f4').tobytes()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-Sample-Rate-Hz', str(sample_rate_hz))
+            self.send_header('X-Start', str(start))
+            self.send_header('X-Step', str(step))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json({
+                'file': experiment.file_name,
+                'signal': signal,
+                'sample_rate_hz': sample_rate_hz,
+                'start': start,
+                'step': step,
+                'data': np.asarray(data, dtype=np.float64),
+            })
+
+    def send_json(self, content, status=200):
+        body = json.dumps(get_json_value(content), default=str, allow_nan=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ExperimentServer(ThreadingHTTPServer):
+    """
+    Serves experiments of a data directory from a shared cache. Requests are handled in threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data_path, port: int = 8765, cache: ExperimentCache = None):
+        # localhost only
+        super().__init__(('127.0.0.1', port), ExperimentRequestHandler)
+        self.data_path = os.path.realpath(data_path)
+        self.cache = cache if cache is not None else ExperimentCache()
+
+    def list_files(self):
+        """
+        DTS files in the data directory
+        """
+        return sorted(f for f in os.listdir(self.data_path) if f.lower().endswith('.dts'))
+
+    def get_experiment(self, file_name):
+        """
+        Retrieve experiment of a data file, refusing paths outside the data directory
+        """
+        data_file_path = os.path.realpath(os.path.join(self.data_path, file_name))
+        if os.path.dirname(data_file_path) != self.data_path or not os.path.isfile(data_file_path):
+            raise RequestError(404, f"Unknown file: '{file_name}'")
+
+        return self.cache.get(data_file_path)
+
+
+def serve(data_path, port: int = 8765, cache_size: int = 8, compact: bool = False, max_bytes: int = None):
+    """
+    Run server until interrupted
+    """
+    server = ExperimentServer(data_path, port=port,
+                              cache=ExperimentCache(max_items=cache_size, compact=compact, max_bytes=max_bytes))
+    print(f"Serving {server.data_path} on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,99 @@
+import numpy as np
+from DTSDataViewer.experiment import summary_signals
+
+# rise thresholds in baseline standard deviations, around the reference threshold rise_threshold_sd
+default_thresholds = np.arange(1.0, 6.5, 0.5)
+
+# columns of a sweep table
+sweep_fields = [
+    'file',
+    'signal',
+    'threshold_sd',
+    'threshold',
+    'peak_index',
+    'rise_start_index',
+    'rise_end_index',
+    'time_to_peak_ms',
+    'decel_time_ms',
+]
+
+
+def sweep_rise(data, peak_index, baseline_mean, baseline_std, thresholds):
+    """
+    Rise start and end of a peak for every threshold, in baseline standard deviations, in one pass.
+    Rise start is the first sample after the last sample at or below the threshold before the peak,
+    rise end the first sample at or below the threshold after the peak.
+    The running minimum away from the peak only decreases, so each threshold is a binary search into it.
+    Returns float arrays of rise start and rise end indices, one per threshold, NaN where the threshold
+    is not below the peak and so there is no rise.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    # peaks below baseline are swept on the inverted series
+    if data[peak_index] < baseline_mean:
+        data = -data
+        baseline_mean = -baseline_mean
+    levels = baseline_mean + np.asarray(thresholds, dtype=np.float64) * baseline_std
+
+    # running minimum from the peak back to the start and from the peak on to the end
+    before_min = np.minimum.accumulate(data[peak_index::-1])
+    after_min = np.minimum.accumulate(data[peak_index:])
+
+    # first offset from the peak where the running minimum reaches a level
+    before_offsets = np.searchsorted(-before_min, -levels, side='left')
+    after_offsets = np.searchsorted(-after_min, -levels, side='left')
+
+    # a rise that never started begins at the first sample, one that never ends at the last
+    rise_start_indices = np.where(before_offsets < before_min.size, peak_index - before_offsets + 1, 0).astype(float)
+    rise_end_indices = np.where(after_offsets < after_min.size, peak_index + after_offsets, data.size - 1).astype(float)
+    no_rise = levels >= data[peak_index]
+    rise_start_indices[no_rise] = np.nan
+    rise_end_indices[no_rise] = np.nan
+
+    return rise_start_indices, rise_end_indices
+
+
+def get_index(index):
+    """
+    Sample index as int, NaN stays NaN
+    """
+    return index if np.isnan(index) else int(index)
+
+
+def sweep(experiment, thresholds=default_thresholds):
+    """
+    Rise start and end, time to peak and deceleration time of the summarized signals of an experiment
+    for a vector of rise thresholds, in baseline standard deviations, around the current summary peaks.
+    Baseline statistics are those cached by the experiment at load. Indices and times are NaN for
+    thresholds at or above the peak. The reader's summaries find their rise against a baseline of their
+    own, so no threshold need reproduce the summary rise start and end.
+    Returns rows of dicts with sweep_fields keys, one per signal and threshold.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    sample_rate_hz = experiment.get_channel('head_rot_cor').meta_data.sample_rate_hz
+    ms_per_sample = 1000.0 / sample_rate_hz
+    rows = []
+
+    for signal in summary_signals.values():
+        summary = experiment.get_summary(signal)
+        if summary.peak_vel.value is None:
+            continue
+
+        data = experiment.get_series(signal)
+        baseline_mean, baseline_std = experiment.get_baseline_stats(signal)
+        rise_start_indices, rise_end_indices = sweep_rise(data, summary.peak_index, baseline_mean, baseline_std,
+                                                          thresholds)
+
+        for threshold, rise_start_index, rise_end_index in zip(thresholds, rise_start_indices, rise_end_indices):
+            rows.append({
+                'file': experiment.data_file_path,
+                'signal': signal,
+                'threshold_sd': float(threshold),
+                'threshold': experiment.get_rise_threshold(signal, float(threshold)),
+                'peak_index': int(summary.peak_index),
+                'rise_start_index': get_index(rise_start_index),
+                'rise_end_index': get_index(rise_end_index),
+                'time_to_peak_ms': (summary.peak_index - rise_start_index) * ms_per_sample,
+                'decel_time_ms': (rise_end_index - summary.peak_index) * ms_per_sample,
+            })
+
+    return rows
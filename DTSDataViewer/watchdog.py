@@ -0,0 +1,145 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+from PyQt5 import QtCore
+
+logger = logging.getLogger(__name__)
+
+
+class Stall:
+    """
+    A period in which the Qt event loop processed no events.
+    'stack' is the main thread stack when the stall was noticed, 'context' the file being worked on.
+    """
+
+    def __init__(self, started, stack, context):
+        self.started = started
+        self.duration_ms = 0.0
+        self.stack = stack
+        self.context = context
+
+    def get_location(self):
+        """
+        Innermost line of the captured stack
+        """
+        lines = [line for line in self.stack.strip().splitlines() if line.strip().startswith('File ')]
+        return lines[-1].strip() if lines else ''
+
+
+class StallWatchdog:
+    """
+    Opt-in monitor of the Qt event loop. A timer on the event loop sends a heartbeat; a watcher
+    thread notices when no heartbeat arrived for more than 'stall_ms', captures the main thread
+    stack and logs it with the stall duration once the event loop is back. The 'max_stalls' worst
+    stalls are kept for a summary.
+    Create and start from the main thread.
+    """
+
+    def __init__(self, stall_ms: int = 500, heartbeat_ms: int = 100, max_stalls: int = 10):
+        self.stall_ms = stall_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.max_stalls = max_stalls
+
+        # what the application is working on, logged with a stall
+        self.context = None
+
+        self.main_thread_id = None
+        self.lock = threading.Lock()
+        self.last_beat = time.monotonic()
+        # stall in progress
+        self.current = None
+        # worst stalls, longest first
+        self.stalls = []
+        self.stall_count = 0
+
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.beat)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+
+        self.main_thread_id = threading.get_ident()
+        with self.lock:
+            self.last_beat = time.monotonic()
+        self.stop_event.clear()
+        self.timer.start(self.heartbeat_ms)
+        self.thread = threading.Thread(target=self.watch, name='stall-watchdog', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        self.timer.stop()
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def set_context(self, context):
+        """
+        Record what the application is working on, e.g. the data file path
+        """
+        self.context = context
+
+    def beat(self):
+        """
+        Heartbeat from the event loop, ends a stall in progress
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.last_beat = now
+            stall = self.current
+            self.current = None
+
+        if stall is not None:
+            stall.duration_ms = (now - stall.started) * 1000.0
+            self.add_stall(stall)
+            logger.warning("event loop stalled for %.0f ms, file: %s\n%s", stall.duration_ms, stall.context, stall.stack)
+
+    def watch(self):
+        """
+        Watcher thread loop
+        """
+        while not self.stop_event.wait(self.heartbeat_ms / 1000.0):
+            with self.lock:
+                if self.current is not None or (time.monotonic() - self.last_beat) * 1000.0 < self.stall_ms:
+                    continue
+                started = self.last_beat
+
+            frame = sys._current_frames().get(self.main_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            stall = Stall(started, stack, self.context)
+
+            with self.lock:
+                # the event loop may have come back while the stack was captured
+                if self.last_beat == started:
+                    self.current = stall
+                    stall = None
+
+            if stall is None:
+                logger.info("event loop not responding for %d ms, file: %s", self.stall_ms, self.context)
+
+    def add_stall(self, stall):
+        with self.lock:
+            self.stall_count += 1
+            self.stalls.append(stall)
+            self.stalls.sort(key=lambda s: s.duration_ms, reverse=True)
+            del self.stalls[self.max_stalls:]
+
+    def get_summary(self):
+        """
+        Summary lines of the worst stalls, longest first
+        """
+        with self.lock:
+            stalls = list(self.stalls)
+            stall_count = self.stall_count
+
+        lines = [f"{stall_count} stall(s) over {self.stall_ms} ms"]
+        lines.extend(f"{stall.duration_ms:0.0f} ms  {stall.context or ''}  {stall.get_location()}" for stall in stalls)
+
+        return lines
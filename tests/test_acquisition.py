@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.acquisition import Acquisition, Capture, RingBuffer, SimulatedDevice, find_trigger
+from DTSDataViewer.experiment import Experiment
+
+
+@pytest.fixture(scope='module')
+def data_file_path():
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+    return data_file_path
+
+
+def test_ring_buffer_wraps_around():
+    stream = np.arange(2 * 23, dtype=np.float64).reshape(2, 23)
+    ring = RingBuffer(2, 10)
+    # blocks that do not divide the capacity, and one longer than it
+    for start, stop in [(0, 4), (4, 8), (8, 12), (12, 23)]:
+        ring.write(stream[:, start:stop])
+        np.testing.assert_array_equal(ring.get_last(10), stream[:, max(stop - 10, 0):stop])
+    np.testing.assert_array_equal(ring.get_last(3), stream[:, 20:23])
+    assert ring.total == 23
+
+
+def test_find_trigger_across_blocks():
+    data = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+    assert find_trigger(data, 2.5) == 3
+    # crossing at the first sample of a block is found with the last sample of the block before
+    assert find_trigger(data[3:], 2.5) is None
+    assert find_trigger(data[3:], 2.5, previous_sample=data[2]) == 0
+    # already above at the end of the block before is not a new crossing
+    assert find_trigger(data[4:], 2.5, previous_sample=data[3]) is None
+
+
+def test_capture_of_replayed_file(data_file_path, tmp_path):
+    device = SimulatedDevice([data_file_path], real_time=False, loop=False)
+    file_data = device.data.copy()
+    trigger_channel = Experiment().channel_map['mach_rot_pri']
+    threshold = 0.5 * file_data[trigger_channel].max()
+    trigger_position = find_trigger(file_data[trigger_channel], threshold)
+
+    acquisition = Acquisition(device, threshold, pre_trigger_ms=20.0, post_trigger_ms=20.0, block_ms=3.0)
+    capture = acquisition.run()
+
+    assert acquisition.trigger_channel == trigger_channel
+    pre_samples = min(acquisition.pre_trigger_samples, trigger_position)
+    assert capture.trigger_index == pre_samples
+    np.testing.assert_array_equal(
+        capture.data,
+        file_data[:, trigger_position - pre_samples:trigger_position + acquisition.post_trigger_samples])
+
+    capture_path = str(tmp_path / 'capture.npz')
+    capture.save(capture_path)
+    loaded = Capture.load(capture_path)
+    np.testing.assert_array_equal(loaded.data, capture.data)
+    assert (loaded.trigger_index, loaded.sample_rate_hz) == (capture.trigger_index, capture.sample_rate_hz)
+    experiment = Experiment.load(capture_path)
+    np.testing.assert_array_equal(experiment.scaled_data, capture.data)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from DTSDataViewer.alignment import get_lag
+
+
+def get_pulse(samples=2000, center=800.0, width=40.0):
+    t = np.arange(samples)
+    return np.exp(-0.5 * ((t - center) / width) ** 2)
+
+
+@pytest.mark.parametrize('sign', [1.0, -1.0])
+@pytest.mark.parametrize('shift', [-37, 0, 25])
+def test_lag_of_shifted_pulse(sign, shift):
+    reference = get_pulse()
+    delayed = sign * get_pulse(center=800.0 + shift)
+    lag, coefficient = get_lag(reference, delayed, max_lag_samples=200)
+
+    # the parabola refinement is good to a fraction of a sample
+    assert lag == pytest.approx(shift, abs=0.25)
+    assert np.sign(coefficient) == sign
+    assert abs(coefficient) > 0.99
+
+
+def test_lag_between_samples():
+    lag, coefficient = get_lag(get_pulse(), get_pulse(center=812.5), max_lag_samples=200)
+
+    assert lag == pytest.approx(12.5, abs=0.25)
+    assert coefficient > 0.99
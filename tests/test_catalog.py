@@ -0,0 +1,46 @@
+import os
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.catalog import Catalog, get_iso_timestamp, parse_timestamp
+
+setup_xml = """<?xml version="1.0" encoding="utf-8"?>
+<TestSetup StartTime="{}">
+  <Module SampleRateHz="10000" NumberOfSamples="20000">
+    <AnalogInputChanel Number="1" Description="head_rot_cor" />
+  </Module>
+</TestSetup>
+"""
+
+
+@pytest.mark.parametrize('value', ['2023-06-03T14:05:09', '2023-06-03 14:05:09', '06/03/2023 2:05:09 PM',
+                                   '6/3/2023 14:05:09', '03-Jun-2023 14:05:09'])
+def test_timestamp_formats(value):
+    assert get_iso_timestamp(value, 0.0) == '2023-06-03T14:05:09'
+
+
+def test_unreadable_timestamp_uses_mtime():
+    assert parse_timestamp('sometime in June') is None
+    assert get_iso_timestamp('sometime in June', 0.0) == get_iso_timestamp(None, 0.0)
+
+
+def test_query_time_range(tmp_path):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    for file_name, timestamp in [('S01_a.dts', '06/02/2023 11:59:59 PM'), ('S01_b.dts', '06/03/2023 9:00:00 AM'),
+                                 ('S01_c.dts', '06/03/2023 11:59:59 PM'), ('S01_d.dts', '06/04/2023 12:00:00 AM')]:
+        (data_path / file_name).write_text(setup_xml.format(timestamp))
+
+    with Catalog(tmp_path / 'catalog.sqlite') as catalog:
+        catalog.update(data_path, workers=1)
+
+        def query_files(**filters):
+            return [row['file_name'] for row in catalog.query(**filters)]
+
+        assert query_files(since='2023-06-03', until='2023-06-03') == ['S01_b.dts', 'S01_c.dts']
+        assert query_files(since='2023-06-03T09:00:00') == ['S01_b.dts', 'S01_c.dts', 'S01_d.dts']
+        assert query_files(until='2023-06-03 09:00:00') == ['S01_a.dts', 'S01_b.dts']
+        row = catalog.query(root_path=data_path)[0]
+        assert (row['timestamp'], row['header_timestamp']) == ('2023-06-02T23:59:59', '06/02/2023 11:59:59 PM')
+        with pytest.raises(ValueError):
+            catalog.query(since='last week')
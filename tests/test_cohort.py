@@ -0,0 +1,37 @@
+import csv
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.cohort import build_cohort
+
+
+@pytest.fixture(scope='module')
+def data_file_path():
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+    return data_file_path
+
+
+def test_first_file_failing_is_a_failed_trial(data_file_path, tmp_path):
+    missing_path = str(tmp_path / 'missing.dts')
+    tensor_path = str(tmp_path / 'cohort.npy')
+
+    failed = build_cohort([missing_path, data_file_path, data_file_path], tensor_path, workers=1)
+
+    assert list(failed) == [missing_path]
+    tensor = np.load(tensor_path, mmap_mode='r')
+    assert tensor.shape[0] == 3
+    assert np.isnan(tensor[0]).all()
+    np.testing.assert_array_equal(tensor[1], tensor[2])
+    assert not np.isnan(tensor[1]).all()
+    with open(str(tmp_path / 'cohort.csv'), newline='') as table_file:
+        rows = list(csv.DictReader(table_file))
+    assert rows[0]['error'] and not rows[1]['error'] and not rows[2]['error']
+
+
+def test_no_file_loading_raises(tmp_path):
+    with pytest.raises(ValueError):
+        build_cohort([str(tmp_path / 'missing.dts')], str(tmp_path / 'cohort.npy'), workers=1)
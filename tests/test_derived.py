@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pytest
+from DTSDataViewer import derived
+
+
+def test_resultant_accel_is_resultant_of_component_accels():
+    # rotation of constant rate about a turning axis: the resultant rate is constant,
+    # the angular acceleration is not zero
+    sample_rate_hz = 10000.0
+    t = np.arange(5000) / sample_rate_hz
+    omega = 2.0 * np.pi * 20.0
+    components = [10.0 * np.cos(omega * t), 10.0 * np.sin(omega * t), np.zeros_like(t)]
+
+    accel = derived.get_derived_resultant(components, sample_rate_hz, 'accel')
+
+    np.testing.assert_allclose(accel[1:-1], 10.0 * omega, rtol=1e-3)
+    resultant = np.sqrt(np.sum(np.square(components), axis=0))
+    assert np.abs(derived.get_derived(resultant, sample_rate_hz, 'accel')).max() < 1e-6
+
+
+def test_resultant_angle_is_resultant_of_component_angles():
+    # rotation back and forth about one axis: the displacement returns to zero, the path length does not
+    sample_rate_hz = 10000.0
+    t = np.arange(10001) / sample_rate_hz
+    rate = 2.0 + np.sin(2.0 * np.pi * t)
+    components = [rate, np.full_like(t, 2.0), np.full_like(t, 2.0)]
+
+    angle = derived.get_derived_resultant(components, sample_rate_hz, 'angle', offsets=[2.0, 2.0, 2.0])
+
+    assert angle[0] == 0.0
+    assert abs(angle[-1]) < 1e-6
+    np.testing.assert_allclose(angle.max(), 1.0 / np.pi, rtol=1e-6)
+
+
+@pytest.fixture(scope='module')
+def experiment():
+    pytest.importorskip('dts_file_reader')
+    from DTSDataViewer.experiment import Experiment
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+    return Experiment.load(data_file_path)
+
+
+def test_derived_summary_of_selected_event(experiment):
+    if len(experiment.detect_events()) < 2:
+        pytest.skip("DTS_TEST_FILE has fewer than two impacts")
+    event = experiment.events[-1]
+    experiment.select_event(len(experiment.events) - 1)
+    experiment.derived_signals = []
+
+    experiment.add_derived('head_resultant_accel')
+
+    summary = experiment.get_summary('head_resultant_accel')
+    assert event.segment_start <= summary.peak_index < event.segment_stop
+    experiment.select_event(None)
@@ -0,0 +1,44 @@
+import numpy as np
+from DTSDataViewer import events
+
+
+def get_recording(impacts, samples=20000, noise=0.2, seed=0):
+    """
+    Gaussian pulses of (center, amplitude) on baseline noise
+    """
+    rng = np.random.default_rng(seed)
+    data = 1.0 + rng.normal(0.0, noise, samples)
+    t = np.arange(samples)
+    for center, amplitude in impacts:
+        data += amplitude * np.exp(-0.5 * ((t - center) / 60.0) ** 2)
+    return data
+
+
+def test_impacts_of_either_sign_and_size():
+    data = get_recording([(4000, 50.0), (10000, -20.0), (16000, 8.0)])
+    detected = events.detect_events(data, 10000.0)
+
+    np.testing.assert_allclose([event.peak_index for event in detected], [4000, 10000, 16000], atol=5)
+    assert detected[1].peak_value < 0
+    for event in detected:
+        assert event.rise_start_index < event.peak_index < event.rise_end_index
+        assert event.segment_start <= event.rise_start_index and event.rise_end_index < event.segment_stop
+
+
+def test_refractory_merges_close_impacts():
+    data = get_recording([(4000, 50.0), (4500, 30.0)])
+    assert len(events.detect_events(data, 10000.0, refractory_ms=125.0)) == 1
+    assert len(events.detect_events(data, 10000.0, refractory_ms=10.0)) == 2
+
+
+def test_quiet_recording_has_no_events():
+    assert events.detect_events(get_recording([]), 10000.0) == []
+
+
+def test_quantized_baseline():
+    # a baseline quiet enough to be a single ADC level has no median absolute deviation
+    data = np.zeros(10000)
+    data[5000:5010] = 1.0
+    data[2000] = 0.005
+    detected = events.detect_events(data, 10000.0)
+    assert [event.peak_index for event in detected] == [5000]
@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pytest
+
+slice = pytest.importorskip('dts_file_reader.slice')
+from DTSDataViewer.experiment import Experiment, summary_fields, summary_signals
+
+
+@pytest.fixture(scope='module')
+def data_file_path():
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+    return data_file_path
+
+
+def get_summary_values(experiment):
+    return {signal: experiment.get_summary_values(signal) for signal in summary_signals.values()}
+
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_parallel_load_matches_sequential(data_file_path, workers):
+    sequential = Experiment.load(data_file_path, workers=1)
+    # repeated so that a race in the reader has more than one chance to show
+    for _ in range(5):
+        parallel = Experiment.load(data_file_path, workers=workers)
+        np.testing.assert_array_equal(parallel.filtered_data, sequential.filtered_data)
+        np.testing.assert_array_equal(parallel.head_resultant, sequential.head_resultant)
+        # assert_equal treats NaN as equal to NaN
+        np.testing.assert_equal(get_summary_values(parallel), get_summary_values(sequential))
+        assert (parallel.data_window_start, parallel.data_window_end) == \
+               (sequential.data_window_start, sequential.data_window_end)
+
+
+def test_summary_fields_are_plain_values(data_file_path):
+    values = get_summary_values(Experiment.load(data_file_path))
+    for signal_values in values.values():
+        assert list(signal_values) == summary_fields
+
+
+def test_baseline_before_first_impact(data_file_path):
+    experiment = Experiment.load(data_file_path)
+    detected = experiment.detect_events()
+    if detected:
+        assert experiment.baseline_stop <= detected[0].rise_start_index
+    # a fast open filters the baseline segment and gets the same statistics
+    fast_opened = Experiment.load(data_file_path, fast_open=True)
+    assert (fast_opened.baseline_start, fast_opened.baseline_stop) == \
+           (experiment.baseline_start, experiment.baseline_stop)
+    for signal in summary_signals.values():
+        np.testing.assert_allclose(fast_opened.get_baseline_stats(signal), experiment.get_baseline_stats(signal))
+
+
+@pytest.mark.parametrize('fast_open', [False, True])
+def test_windows_match_reader(data_file_path, fast_open):
+    experiment = Experiment.load(data_file_path, fast_open=fast_open)
+    channel_data = slice.Reader().parse(data_file_path)
+    peak = max(float(np.max(np.abs(channel.scaled_data))) for channel in channel_data)
+    for start, stop in [(experiment.data_window_start, experiment.data_window_end),
+                        experiment.get_export_window('peak'), experiment.get_export_window('rise_start')]:
+        for channel_map_key, channel_i in experiment.channel_map.items():
+            np.testing.assert_allclose(experiment.get_filtered_data(channel_map_key, start=start, stop=stop),
+                                       channel_data[channel_i].get_filtered_data(start=start, stop=stop),
+                                       rtol=0, atol=1e-6 * peak)
+
+
+def test_compact_keeps_float32_and_summaries_after_summarizing_again(data_file_path):
+    experiment = Experiment.load(data_file_path, compact=True)
+    values = get_summary_values(experiment)
+    experiment.detect_events()
+    if experiment.events:
+        experiment.select_event(0)
+    experiment.select_event(None)
+
+    assert experiment.head_resultant.dtype == np.float32
+    np.testing.assert_equal(get_summary_values(experiment), values)
+
+
+def test_export_writes_complete_marker_last(data_file_path, tmp_path):
+    experiment = Experiment.load(data_file_path)
+    outputs = experiment.export(str(tmp_path))
+
+    assert os.path.basename(outputs[-1]).endswith('_export.complete')
+    with open(outputs[-1]) as marker_file:
+        assert marker_file.read().split() == [os.path.basename(path) for path in outputs[:-1]]
+    assert sorted(os.listdir(str(tmp_path))) == sorted(os.path.basename(path) for path in outputs)
+
+
+def test_snapshot_does_not_follow_changes(data_file_path):
+    experiment = Experiment.load(data_file_path)
+    snapshot = experiment.get_snapshot()
+    peak_index = experiment.get_summary('head_rot_cor').peak_index
+    window = (experiment.data_window_start, experiment.data_window_end)
+
+    experiment.set_user_selected_peak('head_rot_cor', peak_index + 100)
+    experiment.update_data_window()
+
+    assert snapshot.get_summary('head_rot_cor').peak_index == peak_index
+    assert (snapshot.data_window_start, snapshot.data_window_end) == window
+    assert 'head_rot_cor' not in snapshot.user_selected_peaks
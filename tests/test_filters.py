@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import pytest
+from DTSDataViewer import filters
+
+
+def get_test_data(channels=3, samples=5000):
+    rng = np.random.default_rng(0)
+    data = rng.normal(0.0, 1.0, (channels, samples))
+    data[:, samples // 2:samples // 2 + 50] += 100.0
+    return data
+
+
+def test_scipy_matches_sample_loop(monkeypatch):
+    pytest.importorskip('scipy')
+    data = get_test_data()
+    filtered = filters.cfc_filter(data, 10000.0)
+
+    monkeypatch.setattr(filters, 'signal', None)
+    np.testing.assert_allclose(filters.cfc_filter(data, 10000.0), filtered, rtol=1e-9, atol=1e-9)
+
+
+def test_seeded_start():
+    data = get_test_data()
+    b, a = filters.get_cfc_coefficients(10000.0)
+    forward = filters._filter_pass(data, b, a)
+
+    # the first two samples pass through, the third is the first filtered sample
+    np.testing.assert_array_equal(forward[:, 0:2], data[:, 0:2])
+    expected = b[0] * data[:, 2] + b[1] * data[:, 1] + b[2] * data[:, 0] - a[1] * data[:, 1] - a[2] * data[:, 0]
+    np.testing.assert_allclose(forward[:, 2], expected)
+
+
+def test_workers_do_not_change_result():
+    data = get_test_data(channels=8)
+    np.testing.assert_array_equal(filters.cfc_filter(data, 10000.0, workers=4),
+                                  filters.cfc_filter(data, 10000.0, workers=1))
+
+
+def test_matches_reader():
+    """
+    Needs the reader and a DTS file in DTS_TEST_FILE
+    """
+    slice = pytest.importorskip('dts_file_reader.slice')
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+
+    channel_data = slice.Reader().parse(data_file_path)
+    peak = max(float(np.max(np.abs(channel.scaled_data))) for channel in channel_data)
+    assert filters.compare_to_reader(channel_data) <= 1e-6 * peak
+    # a window filtered on its own starts up the same way as in the reader
+    assert filters.compare_to_reader(channel_data, start=1000, stop=3000) <= 1e-6 * peak
@@ -0,0 +1,64 @@
+import os
+import xml.etree.ElementTree as ElementTree
+import pytest
+from DTSDataViewer import header as header_module
+from DTSDataViewer.header import read_header
+
+# XML setup followed by binary sample data, as in a .dts file
+header_file_path = os.path.join(os.path.dirname(__file__), 'data', 'header.dts')
+
+setup_xml = """<?xml version="1.0" encoding="utf-8"?>
+<TestSetup StartTime="2023-06-03T10:15:00">
+  <Modules>
+    <Module SampleRateHz="10000">
+      <AnalogInputChanels>
+        <AnalogInputChanel Number="1" Description="head_rot_cor" />
+        <AnalogInputChanel Number="2" Description="head_rot_sag" />
+      </AnalogInputChanels>
+    </Module>
+  </Modules>
+</TestSetup>
+"""
+
+
+def test_read_header(tmp_path):
+    data_file_path = tmp_path / '001_trial.dts'
+    data_file_path.write_text(setup_xml)
+    header = read_header(data_file_path)
+
+    assert header.root_tag == 'TestSetup'
+    # containers are not modules or channels
+    assert len(header.modules) == 1
+    assert [channel['Description'] for channel in header.channels] == ['head_rot_cor', 'head_rot_sag']
+    assert header.get_sample_rate_hz() == 10000.0
+    assert header.get_timestamp() == '2023-06-03T10:15:00'
+
+
+@pytest.mark.parametrize('block_bytes', [7, 64 * 1024])
+def test_read_header_stops_before_sample_data(monkeypatch, block_bytes):
+    # small blocks split tags and put the end of the setup and sample data in one block
+    monkeypatch.setattr(header_module, 'header_block_bytes', block_bytes)
+    header = read_header(header_file_path)
+
+    assert header.root_tag == 'TestSetup'
+    assert [channel['Number'] for channel in header.channels] == ['1', '2']
+    assert header.get_sample_rate_hz() == 10000.0
+
+
+def test_read_header_of_truncated_setup(tmp_path):
+    data_file_path = tmp_path / '001_trial.dts'
+    data_file_path.write_text(setup_xml[:setup_xml.index('</Modules>')])
+    with pytest.raises(ElementTree.ParseError):
+        read_header(data_file_path)
+
+
+def test_header_matches_reader():
+    """
+    The header values agree with the reader. Needs a DTS file in DTS_TEST_FILE.
+    """
+    slice = pytest.importorskip('dts_file_reader.slice')
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+
+    assert read_header(data_file_path).get_mismatches(slice.Reader().parse(data_file_path)) == []
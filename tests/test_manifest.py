@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+from DTSDataViewer import manifest
+from DTSDataViewer.manifest import Manifest
+
+
+@pytest.fixture
+def data_file_path(tmp_path):
+    data_file_path = tmp_path / 'a.dts'
+    data_file_path.write_bytes(b'data')
+    return str(data_file_path)
+
+
+def test_records_keyed_on_real_path(tmp_path, data_file_path):
+    link_path = str(tmp_path / 'link.dts')
+    os.symlink(data_file_path, link_path)
+    manifest_path = str(tmp_path / 'manifest.jsonl')
+    file_hash = manifest.get_file_hash(data_file_path)
+
+    Manifest(manifest_path).add(link_path, file_hash, 'failed', error='crashed', file_stat=os.stat(link_path))
+
+    reopened = Manifest(manifest_path)
+    assert reopened.get_failed_count(data_file_path, file_hash) == 1
+    assert reopened.get_records(data_file_path, file_hash)[0]['path'] == os.path.realpath(data_file_path)
+
+
+def test_unchanged_file_is_not_hashed_again(tmp_path, data_file_path, monkeypatch):
+    manifest_path = str(tmp_path / 'manifest.jsonl')
+    file_hash = manifest.get_file_hash(data_file_path)
+    Manifest(manifest_path).add(data_file_path, file_hash, 'completed', file_stat=os.stat(data_file_path))
+    reopened = Manifest(manifest_path)
+
+    hashed = []
+    monkeypatch.setattr(manifest, 'get_file_hash', lambda path: hashed.append(path) or 'new')
+    assert reopened.get_file_hash(data_file_path, os.stat(data_file_path)) == file_hash
+    assert hashed == []
+
+    # same size, later modification time
+    file_stat = os.stat(data_file_path)
+    os.utime(data_file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000000))
+    assert reopened.get_file_hash(data_file_path, os.stat(data_file_path)) == 'new'
+    assert hashed == [data_file_path]
+
+
+def test_lines_that_are_not_records_are_ignored(tmp_path, data_file_path):
+    manifest_path = tmp_path / 'manifest.jsonl'
+    Manifest(str(manifest_path)).add(data_file_path, 'hash', 'completed')
+    with open(manifest_path, 'a') as manifest_file:
+        manifest_file.write('{"status": "completed"}\n[1, 2]\n"text"\n{"path": "a.dts", "hash": "h"')
+
+    reopened = Manifest(str(manifest_path))
+
+    assert [record['status'] for record in reopened.get_records(data_file_path, 'hash')] == ['completed']
+    assert sum(len(records) for records in reopened.records.values()) == 1
+
+
+def test_run_isolated(tmp_path):
+    pytest.importorskip('dts_file_reader')
+    from DTSDataViewer.batch import run_isolated
+
+    assert run_isolated(os.getpid) != os.getpid()
+    with pytest.raises(RuntimeError, match='invalid literal'):
+        run_isolated(int, 'x')
+    with pytest.raises(RuntimeError, match='crashed'):
+        run_isolated(os._exit, 3)
+    with pytest.raises(TimeoutError):
+        run_isolated(time.sleep, 60, timeout=1.0)
+
+
+def test_export_goes_on_when_manifest_cannot_be_written(tmp_path):
+    pytest.importorskip('dts_file_reader')
+    from DTSDataViewer.batch import export_files
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+    # a directory in place of the manifest file fails every write
+    manifest_path = tmp_path / 'manifest' / 'manifest.jsonl'
+    manifest_path.mkdir(parents=True)
+
+    failed = export_files([data_file_path], str(tmp_path / 'new' / 'export'), manifest_path=str(manifest_path),
+                          workers=1)
+
+    assert failed == {}
+    assert os.listdir(str(tmp_path / 'new' / 'export'))
@@ -0,0 +1,13 @@
+import numpy as np
+from DTSDataViewer import memory
+
+
+def test_views_are_counted_once():
+    data = np.zeros((9, 1000))
+    usage = memory.get_array_bytes({'data': data, 'channel': data[0], 'other': np.zeros(10), 'none': None})
+    assert usage == {'data': data.nbytes, 'channel': 0, 'other': 80, 'none': 0}
+
+
+def test_physical_memory():
+    physical_memory_bytes = memory.get_physical_memory_bytes()
+    assert physical_memory_bytes is None or physical_memory_bytes > 0
@@ -0,0 +1,29 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.experiment import Experiment
+
+
+def test_spike_away_from_impacts():
+    """
+    Needs a DTS file in DTS_TEST_FILE
+    """
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+
+    experiment = Experiment.load(data_file_path)
+    report = experiment.get_quality_report()
+    assert set(report.metrics) == set(experiment.channel_map)
+
+    # a single sample spike away from the impacts is found
+    channel_i = experiment.channel_map['head_rot_sag']
+    spike_index = experiment.baseline_start + (experiment.baseline_stop - experiment.baseline_start) // 2
+    if experiment.baseline_stop - experiment.baseline_start < 3:
+        pytest.skip("no baseline segment to place a spike in")
+    spikes = report.metrics['head_rot_sag']['spikes']
+    experiment.scaled_data[channel_i, spike_index] += 100.0 * max(np.std(experiment.scaled_data[channel_i]), 1.0)
+    experiment.quality_report = None
+    assert experiment.get_quality_report().metrics['head_rot_sag']['spikes'] == spikes + 1
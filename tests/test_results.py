@@ -0,0 +1,41 @@
+import os
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.experiment import summary_fields
+from DTSDataViewer.results import ResultsStore, get_summary_rows
+
+
+class SummarizedFile:
+    """
+    Experiment summaries as the results store reads them
+    """
+
+    def __init__(self, data_file_path, peak_index):
+        self.data_file_path = data_file_path
+        self.peak_index = peak_index
+
+    def get_id(self):
+        return '001'
+
+    def get_label(self):
+        return '001_trial'
+
+    def get_summary_values(self, signal):
+        values = dict.fromkeys(summary_fields, 0.0)
+        values['peak_index'] = self.peak_index
+        values['is_peak_user_selected'] = False
+        return values
+
+
+def test_same_label_in_two_studies(tmp_path):
+    with ResultsStore(tmp_path / 'results.sqlite') as results:
+        results.add([SummarizedFile(str(tmp_path / 'study_a' / '001_trial.dts'), 100),
+                     SummarizedFile(str(tmp_path / 'study_b' / '001_trial.dts'), 200)])
+        # storing a file again replaces its rows
+        results.add([SummarizedFile(str(tmp_path / 'study_a' / '.' / '001_trial.dts'), 150)])
+
+        rows = results.query(channel='head_rot_cor')
+        assert sorted(row['peak_index'] for row in rows) == [150, 200]
+        assert results.query(path=tmp_path / 'study_b' / '001_trial.dts', channel='head_rot_cor')[0]['peak_index'] == 200
+
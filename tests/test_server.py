@@ -0,0 +1,16 @@
+import json
+import numpy as np
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.server import get_json_value
+
+
+def test_non_finite_values_are_null():
+    content = {'summary': {'peak': np.float32(2.5), 'lag': float('nan'), 'values': (1.0, float('inf'))},
+               'data': np.array([1.0, np.nan, -np.inf, 3.0])}
+
+    value = get_json_value(content)
+
+    assert json.loads(json.dumps(value, allow_nan=False)) == \
+        {'summary': {'peak': 2.5, 'lag': None, 'values': [1.0, None]}, 'data': [1.0, None, None, 3.0]}
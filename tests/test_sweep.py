@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('dts_file_reader')
+from DTSDataViewer.experiment import Experiment, rise_threshold_sd
+from DTSDataViewer.sweep import sweep, sweep_rise
+
+
+def get_pulse(amplitude=10.0, samples=2000):
+    t = np.arange(samples)
+    return amplitude * np.exp(-0.5 * ((t - 1000) / 50.0) ** 2)
+
+
+def test_rise_narrows_as_threshold_rises():
+    rise_start_indices, rise_end_indices = sweep_rise(get_pulse(), 1000, 0.0, 1.0, [1.0, 2.0, 5.0])
+    assert np.all(np.diff(rise_start_indices) > 0)
+    assert np.all(np.diff(rise_end_indices) < 0)
+    assert np.all(rise_start_indices <= 1000) and np.all(rise_end_indices >= 1000)
+
+
+def test_negative_peak_matches_positive():
+    positive = sweep_rise(get_pulse(), 1000, 0.0, 1.0, [1.0, 3.0])
+    negative = sweep_rise(-get_pulse(), 1000, 0.0, 1.0, [1.0, 3.0])
+    np.testing.assert_array_equal(positive, negative)
+
+
+def test_threshold_above_peak_has_no_rise():
+    rise_start_indices, rise_end_indices = sweep_rise(get_pulse(amplitude=10.0), 1000, 0.0, 1.0, [3.0, 10.0, 12.0])
+    assert np.all(np.isfinite(rise_start_indices[:1])) and np.all(np.isfinite(rise_end_indices[:1]))
+    assert np.all(np.isnan(rise_start_indices[1:])) and np.all(np.isnan(rise_end_indices[1:]))
+
+
+def test_rows_of_summary_peaks():
+    """
+    Needs a DTS file in DTS_TEST_FILE
+    """
+    data_file_path = os.environ.get('DTS_TEST_FILE')
+    if not data_file_path:
+        pytest.skip("DTS_TEST_FILE is not set")
+
+    experiment = Experiment.load(data_file_path)
+    rows = sweep(experiment, [rise_threshold_sd])
+    assert rows
+    for row in rows:
+        summary = experiment.get_summary(row['signal'])
+        assert row['file'] == experiment.data_file_path
+        assert row['peak_index'] == summary.peak_index
+        assert row['threshold'] == experiment.get_rise_threshold(row['signal'], rise_threshold_sd)